@@ -0,0 +1,111 @@
+"""
+FilmSumaRAG - /movies/collection query benchmark
+
+Seeds a temp SQLite catalog at several sizes and calls get_collection directly,
+counting the SQL statements issued per call. The count should stay constant as
+the catalog grows; latency is reported alongside.
+
+Usage (from backend_fastapi/):
+    python scripts/benchmark_collection.py --sizes 100,1000,5000 --limit 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Collection endpoint query-count benchmark")
+    parser.add_argument("--sizes", default="100,1000,5000", help="Comma-separated catalog sizes")
+    parser.add_argument("--limit", type=int, default=None, help="Page size (default: whole collection)")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed calls per size")
+    return parser.parse_args()
+
+
+def seed(session, sql_models, size: int, user_id: int) -> None:
+    rng = random.Random(size)
+    movies = [sql_models.Movie(title=f"Film {i}", tmdb_id=100000 + i, status=sql_models.JobStatus.COMPLETED) for i in range(size)]
+    session.add_all(movies)
+    session.flush()
+    for movie in movies:
+        if rng.random() < 0.6:
+            session.add(sql_models.SummaryCache(movie_id=movie.id, summary_type="general", content="..."))
+        for t in range(rng.randint(0, 3)):
+            for role in ("user", "assistant"):
+                session.add(sql_models.ChatHistory(thread_id=f"{movie.id}-{t}", user_id=user_id if t % 2 == 0 else None,
+                                                   movie_id=movie.id, role=role, message="..."))
+        if rng.random() < 0.3:
+            session.add(sql_models.ForumPost(post_number=f"No.{movie.id}", movie_id=movie.id, user_id=user_id, title="t", content="c"))
+        if rng.random() < 0.4:
+            session.add(sql_models.UserMovieEngagement(user_id=user_id, movie_id=movie.id, engagement_type=sql_models.EngagementType.SEEN))
+        if rng.random() < 0.05:
+            session.add(sql_models.UserHiddenMovie(user_id=user_id, movie_id=movie.id))
+    session.commit()
+
+
+def run_size(size: int, limit, repeats: int) -> dict:
+    from fastapi import Response
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from src.db.database import Base
+    from src.models import sql_models
+    from src.api.endpoints.movies import get_collection
+    from src.core.identity_cache import identity_cache
+
+    # Every size starts cold: the process-wide identity cache would otherwise still hold
+    # "bench_user" from the previous catalog and hide its lookup query
+    identity_cache.clear()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="collection_bench_"), "bench.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as session:
+        user = sql_models.User(clerk_id="bench_user", email="bench@example.com", username="bench")
+        session.add(user)
+        session.commit()
+        seed(session, sql_models, size, user.id)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    report = {"size": size}
+    for label, clerk_id in (("global", None), ("user", "bench_user")):
+        timings, counts, items = [], [], 0
+        for _ in range(repeats):
+            with Session() as session:
+                statements.clear()
+                start = time.perf_counter()
+                rows = get_collection(Response(), clerk_id=clerk_id, show_hidden=False, cursor=None, limit=limit, db=session)
+                timings.append((time.perf_counter() - start) * 1000)
+                counts.append(len(statements))
+                items = len(rows)
+        report[label] = {"queries": max(counts), "items": items, "ms_min": round(min(timings), 2), "ms_mean": round(sum(timings) / len(timings), 2)}
+    engine.dispose()
+    return report
+
+
+def main():
+    args = parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    print(f"{'movies':>8} | {'scope':>6} | {'queries':>7} | {'items':>6} | {'min ms':>8} | {'mean ms':>8}")
+    query_counts = set()
+    for size in sizes:
+        report = run_size(size, args.limit, args.repeats)
+        for scope in ("global", "user"):
+            r = report[scope]
+            query_counts.add((scope, r["queries"]))
+            print(f"{size:>8} | {scope:>6} | {r['queries']:>7} | {r['items']:>6} | {r['ms_min']:>8} | {r['ms_mean']:>8}")
+    constant = len(query_counts) == 2
+    print(f"\nQuery count constant across catalog sizes: {'yes' if constant else 'NO'}")
+    sys.exit(0 if constant else 1)
+
+
+if __name__ == "__main__":
+    main()
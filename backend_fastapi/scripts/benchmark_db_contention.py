@@ -0,0 +1,129 @@
+"""
+FilmSumaRAG - SQLite writer contention benchmark
+
+Runs the same mixed workload against a fresh SQLite file under the "default"
+and "tuned" engine profiles (see src/db/database.py): writer threads insert chat
+rows and flip movie status like the embedding workers do, while reader threads
+run the history queries. Reports throughput, p50/p95 transaction latency and
+"database is locked" failures per profile.
+
+Usage (from backend_fastapi/):
+    python scripts/benchmark_db_contention.py --writers 8 --readers 8 --seconds 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SQLite engine profile contention benchmark")
+    parser.add_argument("--writers", type=int, default=8, help="Concurrent writer threads")
+    parser.add_argument("--readers", type=int, default=8, help="Concurrent reader threads")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration per profile")
+    parser.add_argument("--rows-per-txn", type=int, default=5, help="Chat rows inserted per write transaction")
+    parser.add_argument("--driver-timeout", type=float, default=0.5,
+                        help="sqlite3 connect timeout for the default profile (the driver's own busy wait)")
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_profile(profile: str, args) -> dict:
+    from sqlalchemy import create_engine, select, text, update
+    from sqlalchemy.exc import OperationalError
+    from src.db.database import Base, engine_options, install_profile
+    from src.models import sql_models
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix=f'contention_{profile}_'), 'bench.db')}"
+    options = engine_options(url, profile)
+    if profile != "tuned":
+        options["connect_args"] = {**options["connect_args"], "timeout": args.driver_timeout}
+    engine = create_engine(url, **options)
+    install_profile(engine, profile)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(sql_models.Movie.__table__.insert(), [{"title": f"Film {i}", "tmdb_id": i} for i in range(1, 21)])
+
+    stop = time.perf_counter() + args.seconds
+    lock = threading.Lock()
+    results = {"write_latencies": [], "read_latencies": [], "write_errors": 0, "read_errors": 0}
+
+    def writer(worker: int):
+        ch = sql_models.ChatHistory.__table__
+        movies = sql_models.Movie.__table__
+        n = 0
+        while time.perf_counter() < stop:
+            movie_id = (worker + n) % 20 + 1
+            rows = [{"thread_id": f"w{worker}-{n}", "movie_id": movie_id, "role": "user", "message": "x" * 200}
+                    for _ in range(args.rows_per_txn)]
+            start = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(ch.insert(), rows)
+                    conn.execute(update(movies).where(movies.c.id == movie_id).values(status=sql_models.JobStatus.PROCESSING.name))
+                with lock:
+                    results["write_latencies"].append(time.perf_counter() - start)
+            except OperationalError:
+                with lock:
+                    results["write_errors"] += 1
+            n += 1
+
+    def reader(worker: int):
+        ch = sql_models.ChatHistory.__table__
+        n = 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(select(ch).where(ch.c.movie_id == (worker + n) % 20 + 1).order_by(ch.c.id.desc()).limit(50)).all()
+                    conn.execute(text("SELECT COUNT(*) FROM chat_history")).scalar()
+                with lock:
+                    results["read_latencies"].append(time.perf_counter() - start)
+            except OperationalError:
+                with lock:
+                    results["read_errors"] += 1
+            n += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    w, r = results["write_latencies"], results["read_latencies"]
+    return {
+        "profile": profile,
+        "writes_per_sec": round(len(w) / args.seconds, 1),
+        "reads_per_sec": round(len(r) / args.seconds, 1),
+        "write_p50_ms": round(percentile(w, 50) * 1000, 2),
+        "write_p95_ms": round(percentile(w, 95) * 1000, 2),
+        "read_p95_ms": round(percentile(r, 95) * 1000, 2),
+        "write_errors": results["write_errors"],
+        "read_errors": results["read_errors"],
+    }
+
+
+def main():
+    args = parse_args()
+    reports = [run_profile(profile, args) for profile in ("default", "tuned")]
+    columns = list(reports[0])
+    print(" | ".join(f"{c:>14}" for c in columns))
+    for report in reports:
+        print(" | ".join(f"{str(report[c]):>14}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,367 @@
-import os
-import psutil
-import requests
+"""
+FilmSumaRAG - End-to-end load & latency benchmark
+
+Boots the FastAPI app in-process (offline LLM + hash embedder, temp SQLite/Chroma),
+drives concurrent /deep_dive, WebSocket and /summarize workloads with async clients,
+and reports p50/p95/p99 TTFT, inter-token latency, throughput and server RSS.
+
+Usage (from backend_fastapi/):
+    python scripts/benchmark_rag.py --workloads deep_dive,ws,summarize --concurrency 8 --requests 40 --out bench.json
+    python scripts/benchmark_rag.py --out new.json --compare bench.json --max-regression 0.2
+"""
+import argparse
+import asyncio
 import json
-import time
+import os
+import random
+import socket
+import sys
+import tempfile
 import threading
-from concurrent.futures import ThreadPoolExecutor
-
-# Metrics collection
-memory_logs = []
-
-def get_process_memory():
-    process = psutil.Process(os.getpid())
-    # Return memory in MB
-    return process.memory_info().rss / (1024 * 1024)
-
-def log_memory(label: str):
-    mb = get_process_memory()
-    print(f"📊 [MEM] {label}: {mb:.2f} MB")
-    memory_logs.append({"label": label, "mb": mb})
-
-def simulate_chat_session(movie: str, thread_id: str):
-    # Simulate a deep dive chat query
-    url = "http://localhost:8000/api/deep_dive"
-    payload = {
-        "movie": movie,
-        "question": "What are the main themes of this movie?",
-        "thread_id": thread_id,
-        "persona": "critic"
+import time
+import zlib
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+VOCABULARY = (
+    "matrix dream reality memory shadow corridor signal machine city choice identity "
+    "train rain bridge letter photograph mirror storm engine ocean tower key door "
+    "father sister detective pilot soldier doctor stranger thief agent captain"
+).split()
+
+QUESTIONS = [
+    "What are the main themes of this movie?",
+    "How does the protagonist change by the end?",
+    "What role does memory play in the story?",
+    "Which scene best captures the central conflict?",
+    "How is the antagonist characterised through dialogue?",
+    "What does the ending imply about free will?",
+    "How do the side characters reflect the hero's choices?",
+    "What motifs recur across the film?",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FilmSumaRAG end-to-end benchmark")
+    parser.add_argument("--workloads", default="deep_dive,ws,summarize", help="Comma-separated: deep_dive, ws, summarize")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients per workload")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per workload")
+    parser.add_argument("--movies", type=int, default=4, help="Pre-indexed movies for chat workloads")
+    parser.add_argument("--transcript-lines", type=int, default=600, help="Synthetic subtitle lines per movie")
+    parser.add_argument("--ttft-ms", type=float, default=150, help="Fake LLM time-to-first-token")
+    parser.add_argument("--tokens-per-sec", type=float, default=80, help="Fake LLM decode speed")
+    parser.add_argument("--output-tokens", type=int, default=120, help="Fake LLM completion length (words)")
+    parser.add_argument("--question-pool", type=int, default=0, help="Distinct questions to cycle through (0 = every request unique)")
+    parser.add_argument("--caches", choices=["on", "off"], default="off", help="Enable LLM/answer caches")
+    parser.add_argument("--out", default="bench_results.json", help="Where to write JSON results")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to compare p95 latencies against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative p95 regression")
+    return parser.parse_args()
+
+
+def configure_environment(args, workdir: str):
+    # Must run before any src.* import: these settings are read at import time
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["EMBEDDER_BACKEND"] = "hash"
+    os.environ["FAKE_LLM_TTFT_MS"] = str(args.ttft_ms)
+    os.environ["FAKE_LLM_TOKENS_PER_SEC"] = str(args.tokens_per_sec)
+    os.environ["FAKE_LLM_OUTPUT_TOKENS"] = str(args.output_tokens)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["CHROMA_PATH"] = os.path.join(workdir, "chroma")
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(workdir, "checkpoints.db")
+    os.environ["LLM_CACHE_PATH"] = os.path.join(workdir, "llm_cache.db")
+    caches = "true" if args.caches == "on" else "false"
+    os.environ["LLM_CACHE_ENABLED"] = caches
+    os.environ["ANSWER_CACHE_ENABLED"] = caches
+
+
+def synthetic_transcript(seed: int, lines: int) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(6, 14))).capitalize() + "." for _ in range(lines)]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    import numpy as np
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    arr = np.asarray(values)
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+        "mean": round(float(arr.mean()), 3),
     }
-    
+
+
+class RequestTrace:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.token_times: List[float] = []
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def token(self):
+        self.token_times.append(time.perf_counter())
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+
+def summarize_traces(name: str, traces: List[RequestTrace], wall: float) -> dict:
+    ok = [t for t in traces if t.error is None and t.end is not None]
+    ttft = [(t.token_times[0] - t.start) * 1000 for t in ok if t.token_times]
+    gaps = [(b - a) * 1000 for t in ok for a, b in zip(t.token_times, t.token_times[1:])]
+    totals = [(t.end - t.start) * 1000 for t in ok]
+    tokens = sum(len(t.token_times) for t in ok)
+    return {
+        "workload": name,
+        "requests": len(traces),
+        "errors": len(traces) - len(ok),
+        "error_samples": [t.error for t in traces if t.error][:3],
+        "ttft_ms": percentiles(ttft),
+        "inter_token_ms": percentiles(gaps),
+        "total_ms": percentiles(totals),
+        "tokens": tokens,
+        "tokens_per_sec": round(tokens / wall, 2) if wall else 0.0,
+        "requests_per_sec": round(len(ok) / wall, 2) if wall else 0.0,
+        "wall_seconds": round(wall, 3),
+    }
+
+
+async def sse_request(client, path: str, payload: dict) -> RequestTrace:
+    trace = RequestTrace()
+    try:
+        async with client.stream("POST", path, json=payload) as response:
+            if response.status_code != 200:
+                trace.error = f"HTTP {response.status_code}"
+                return trace
+            if response.headers.get("content-type", "").startswith("application/json"):
+                # Cached summary: the whole body is the first (and only) token
+                await response.aread()
+                trace.token()
+            else:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[6:]
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    if "error" in event:
+                        trace.error = str(event["error"])[:200]
+                        break
+                    if event.get("token", "").startswith("⚠️"):
+                        # deep_dive reports pipeline failures in-band as a warning token
+                        trace.error = event["token"][:200]
+                        break
+                    if event.get("token"):
+                        trace.token()
+        trace.finish()
+    except Exception as e:
+        trace.error = repr(e)[:200]
+    return trace
+
+
+async def ws_request(base_ws: str, tmdb_id: int, thread_id: str, question: str) -> RequestTrace:
+    import websockets
+    trace = RequestTrace()
     try:
-        # We start a streaming request
-        start_time = time.time()
-        with requests.post(url, json=payload, stream=True) as r:
-            token_count = 0
-            for line in r.iter_lines():
-                if line:
-                    token_count += 1
-            duration = time.time() - start_time
-            print(f"✅ [CHAT] Thread {thread_id} finished in {duration:.2f}s ({token_count} tokens)")
+        async with websockets.connect(f"{base_ws}/ws/chat/{tmdb_id}/{thread_id}") as ws:
+            await ws.send(json.dumps({"question": question, "persona": "critic", "movies": [tmdb_id]}))
+            while True:
+                msg = json.loads(await ws.recv())
+                if msg["type"] == "token":
+                    trace.token()
+                elif msg["type"] == "done":
+                    break
+                elif msg["type"] == "error":
+                    trace.error = msg.get("message", "error")[:200]
+                    break
+        trace.finish()
     except Exception as e:
-        print(f"❌ [CHAT] Thread {thread_id} failed: {str(e)}")
-
-def benchmark_peak_usage():
-    print("\n" + "="*50)
-    print("🚀 FilmSumaRAG: Memory Target Benchmark (8GB RAM)")
-    print("="*50)
-    
-    log_memory("Starting Environment")
-    
-    # 1. Simulate multiple concurrent users (Deep Dive)
-    print("\n📡 Simulating 5 concurrent Deep Dive sessions...")
-    movies = ["Test Movie 1", "Test Movie 2", "Test Movie 3", "Test Movie 4", "Test Movie 5"]
-    
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        for i in range(5):
-            movie = movies[i % len(movies)]
-            executor.submit(simulate_chat_session, movie, f"bench_thread_{i}")
-    
-    log_memory("After 5 Concurrent Chats")
-    
-    # 2. Simulate heavy embedding load (hypothetically)
-    # Since we can't easily trigger a real ingestion without valid files, 
-    # we just monitor the steady state during the chats.
-
-    print("\n" + "="*50)
-    print("📈 Benchmark Results Summary")
-    average = sum(m["mb"] for m in memory_logs) / len(memory_logs)
-    peak = max(m["mb"] for m in memory_logs)
-    print(f"Average Memory: {average:.2f} MB")
-    print(f"Peak Memory usage logged: {peak:.2f} MB")
-    
-    if peak < 4000: # 4GB threshold (leaving 4GB for OS/other apps)
-        print("🎉 PASS: Well within the 8GB local RAM target!")
-    else:
-        print("⚠️ WARNING: Memory usage is approaching 50% of the target. Optimization recommended.")
-    print("="*50)
+        trace.error = repr(e)[:200]
+    return trace
+
+
+async def run_workload(name: str, args, base_http: str, base_ws: str, movies: List[dict]) -> dict:
+    import httpx
+    semaphore = asyncio.Semaphore(args.concurrency)
+    traces: List[RequestTrace] = []
+
+    async with httpx.AsyncClient(base_url=base_http, timeout=httpx.Timeout(300.0)) as client:
+        async def one(i: int):
+            async with semaphore:
+                movie = movies[i % len(movies)]
+                q = i % args.question_pool if args.question_pool else i
+                question = f"{QUESTIONS[q % len(QUESTIONS)]} (variant {q})"
+                thread_id = f"bench-{name}-{i}"
+                if name == "deep_dive":
+                    trace = await sse_request(client, "/deep_dive", {
+                        "movie": movie["title"], "tmdb_ids": [movie["tmdb_id"]],
+                        "question": question, "thread_id": thread_id, "persona": "critic",
+                    })
+                elif name == "ws":
+                    trace = await ws_request(base_ws, movie["tmdb_id"], thread_id, question)
+                elif name == "summarize":
+                    # Unique film per request so every request streams a fresh summary
+                    trace = await sse_request(client, "/summarize", {
+                        "moviename": f"Benchmark Feature {i}", "tmdb_id": 900000 + i,
+                    })
+                else:
+                    raise ValueError(f"Unknown workload '{name}'")
+                traces.append(trace)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+        wall = time.perf_counter() - start
+
+    return summarize_traces(name, traces, wall)
+
+
+class RSSSampler:
+    def __init__(self, interval: float = 0.1):
+        import psutil
+        self.process = psutil.Process(os.getpid())
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(self.process.memory_info().rss / (1024 * 1024))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self) -> dict:
+        if not self.samples:
+            return {}
+        return {
+            "start": round(self.samples[0], 1),
+            "peak": round(max(self.samples), 1),
+            "mean": round(sum(self.samples) / len(self.samples), 1),
+            "end": round(self.samples[-1], 1),
+        }
+
+
+def start_server(port: int):
+    import uvicorn
+    from src.main import app
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("Server did not start within 30s")
+        time.sleep(0.05)
+    return server, thread
+
+
+def seed_movies(args) -> List[dict]:
+    from src.db.database import SessionLocal
+    from src.models import sql_models
+    from src.core.embeddings import build_embeddings
+
+    movies = []
+    db = SessionLocal()
+    try:
+        for i in range(args.movies):
+            tmdb_id, title = 800000 + i, f"Benchmark Classic {i}"
+            count = build_embeddings(title, tmdb_id, "\n".join(synthetic_transcript(tmdb_id, args.transcript_lines)))
+            db.add(sql_models.Movie(tmdb_id=tmdb_id, title=title, status=sql_models.JobStatus.COMPLETED))
+            movies.append({"tmdb_id": tmdb_id, "title": title, "chunks": count})
+        db.commit()
+    finally:
+        db.close()
+    return movies
+
+
+def patch_subtitle_source(args):
+    # /summarize downloads subtitles over the network; serve synthetic ones instead
+    from src.api.endpoints import summary, embeddings_generation
+
+    def fake_download(moviename: str) -> List[str]:
+        return synthetic_transcript(zlib.crc32(moviename.encode("utf-8")), args.transcript_lines)
+
+    summary.download_subs_lines = fake_download
+    embeddings_generation.download_subs_lines = fake_download
+
+
+def compare(results: dict, baseline_path: str, max_regression: float) -> bool:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    ok = True
+    print("\nRegression check (p95) against", baseline_path)
+    for name, current in results["workloads"].items():
+        base = baseline.get("workloads", {}).get(name)
+        if not base:
+            continue
+        for metric in ("ttft_ms", "inter_token_ms", "total_ms"):
+            new, old = current[metric]["p95"], base[metric]["p95"]
+            if new is None or not old:
+                continue
+            delta = (new - old) / old
+            flag = "REGRESSION" if delta > max_regression else "ok"
+            ok = ok and delta <= max_regression
+            print(f"  {name:<10} {metric:<15} {old:>10.1f} -> {new:>10.1f} ms ({delta:+.1%}) {flag}")
+    return ok
+
+
+def main():
+    args = parse_args()
+    workloads = [w.strip() for w in args.workloads.split(",") if w.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="filmsuma-bench-") as workdir:
+        configure_environment(args, workdir)
+        port = free_port()
+        server, thread = start_server(port)
+        try:
+            print(f"Seeding {args.movies} movies ({args.transcript_lines} lines each)...")
+            movies = seed_movies(args)
+            patch_subtitle_source(args)
+
+            results = {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+                "workloads": {},
+            }
+            with RSSSampler() as rss:
+                for name in workloads:
+                    print(f"Running {name}: {args.requests} requests @ concurrency {args.concurrency}...")
+                    report = asyncio.run(run_workload(name, args, f"http://127.0.0.1:{port}", f"ws://127.0.0.1:{port}", movies))
+                    results["workloads"][name] = report
+                    print(f"  TTFT p50/p95/p99: {report['ttft_ms']['p50']}/{report['ttft_ms']['p95']}/{report['ttft_ms']['p99']} ms"
+                          f" | ITL p95: {report['inter_token_ms']['p95']} ms | {report['tokens_per_sec']} tok/s"
+                          f" | errors: {report['errors']}")
+            results["server_rss_mb"] = rss.report()
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nServer RSS (MB): {results['server_rss_mb']}")
+    print(f"Results written to {args.out}")
+
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        sys.exit(1)
+
 
 if __name__ == "__main__":
-    benchmark_peak_usage()
+    main()
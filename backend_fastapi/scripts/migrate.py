@@ -0,0 +1,27 @@
+"""
+FilmSumaRAG - Apply pending schema migrations
+
+Runs the versioned migrations in src/db/migrations against DATABASE_URL.
+The API also applies them at startup.
+
+Usage (from backend_fastapi/):
+    python scripts/migrate.py
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def main():
+    from src.db.database import Base, engine
+    from src.db.migrations import run_migrations
+    from src.models import sql_models  # noqa: F401
+    Base.metadata.create_all(bind=engine)
+    applied = run_migrations(engine)
+    print(f"Applied migrations: {', '.join(applied) if applied else 'none (up to date)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+FilmSumaRAG - Engagement counter reconciliation
+
+Recomputes movie_stats / user_movie_stats from the source tables and repairs
+any rows that drifted. Safe to run against a live database.
+
+Usage (from backend_fastapi/):
+    python scripts/reconcile_stats.py
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def main():
+    from src.db.database import Base, engine
+    from src.db import stats
+    Base.metadata.create_all(bind=engine)
+    repaired = stats.reconcile_all()
+    print(f"Repaired {repaired} counter rows")
+
+
+if __name__ == "__main__":
+    main()
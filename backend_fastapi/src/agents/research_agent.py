@@ -1,8 +1,20 @@
-from typing import List, Dict
-from src.core.llm_model import llm
+from typing import List, Dict, Optional
+from src.core.llm_model import get_llm
+from src.core.llm_cache import cached_invoke
 from langchain_core.messages import HumanMessage
 import json
 
+def _parse_findings(content: str) -> Optional[List[Dict]]:
+    """The JSON list in an LLM reply (optionally fenced in ```json), or None if it doesn't parse."""
+    content = content.strip()
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    try:
+        findings = json.loads(content)
+    except ValueError:
+        return None
+    return findings if isinstance(findings, list) else None
+
 class ResearchAgent:
     @staticmethod
     def search_video_essays(movie_title: str) -> List[Dict]:
@@ -14,11 +26,10 @@ class ResearchAgent:
         prompt = f"Find 3 authoritative video essays or critical analyses for the movie '{movie_title}'. Return as a JSON list of objects with 'title' and 'description'."
         messages = [HumanMessage(content=prompt)]
         try:
-            response = llm.invoke(messages)
-            content = response.content.strip()
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0]
-            return json.loads(content)
+            # Replies that aren't a JSON list are returned as [] and never cached
+            content = cached_invoke(get_llm(), messages, call_site="research_search",
+                                    validate=lambda c: _parse_findings(c) is not None)
+            return _parse_findings(content) or []
         except:
             return []
 
@@ -1,6 +1,7 @@
 from typing import List, AsyncIterator
 from langchain_core.messages import HumanMessage, SystemMessage
-from src.core.llm_model import llm
+from src.core.llm_model import get_llm
+from src.core.llm_cache import cached_ainvoke, cached_astream
 
 class MovieSummarizer:
     @staticmethod
@@ -23,8 +24,7 @@ PART {i+1} CONTENT:
                 SystemMessage(content="You provide detailed, narrative-style movie summaries."),
                 HumanMessage(content=prompt)
             ]
-            response = await llm.ainvoke(messages)
-            chunk_summaries.append(response.content)
+            chunk_summaries.append(await cached_ainvoke(get_llm(), messages, call_site="movie_summarizer_chunk"))
             
         # Combine summaries
         combined_summaries = "\n\n".join(chunk_summaries)
@@ -46,8 +46,7 @@ PARTIAL SUMMARIES:
             SystemMessage(content="You specialize in synthesizing complex narratives into cohesive summaries."),
             HumanMessage(content=final_prompt)
         ]
-        final_response = await llm.ainvoke(messages)
-        return final_response.content
+        return await cached_ainvoke(get_llm(), messages, call_site="movie_summarizer_combine")
 
     @staticmethod
     async def summarize_stream(transcript: str, movie_name: str) -> AsyncIterator[str]:
@@ -63,6 +62,5 @@ EXCERPT:
 {first_chunk}
 """
         messages = [HumanMessage(content=prompt)]
-        async for token in llm.astream(messages):
-            if hasattr(token, 'content'):
-                yield token.content
+        async for token in cached_astream(get_llm(), messages, call_site="movie_summarizer_stream"):
+            yield token
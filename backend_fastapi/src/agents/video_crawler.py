@@ -2,7 +2,7 @@ import os
 import requests
 from typing import List, Dict, Optional
 from langchain_core.messages import HumanMessage
-from src.core.llm_model import llm
+from src.core.llm_model import get_llm
 
 class VideoEssayAgent:
     def __init__(self, perplexity_key: Optional[str] = None):
@@ -33,7 +33,11 @@ Example:
 Only return the JSON list.
 """
         messages = [HumanMessage(content=prompt)]
+        llm = get_llm()
         response = await llm.ainvoke(messages)
+        from src.db.llm_usage import llm_model_name, record_llm_call
+        record_llm_call("video_essay", messages, response.content, usage=getattr(response, "usage_metadata", None),
+                        model=llm_model_name(llm))
         
         import json
         try:
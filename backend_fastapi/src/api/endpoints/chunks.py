@@ -0,0 +1,64 @@
+import hashlib
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+router = APIRouter()
+
+# Chunk text never changes within an index epoch, so versioned URLs (?epoch=N matching
+# the current epoch) are cached for a year; anything else must revalidate via ETag.
+CHUNK_CACHE_MAX_AGE = int(os.getenv("CHUNK_CACHE_MAX_AGE_SECONDS", "31536000"))
+CHUNK_BATCH_MAX = 100
+
+
+def _etag(chunks: List[dict]) -> str:
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(f"{chunk['id']}\0{chunk['epoch']}\0{chunk['text']}\0".encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _cache_headers(chunks: List[dict], epoch: Optional[int]) -> dict:
+    versioned = epoch is not None and all(chunk["epoch"] == epoch for chunk in chunks)
+    cache_control = f"public, max-age={CHUNK_CACHE_MAX_AGE}, immutable" if versioned else "public, no-cache"
+    return {"ETag": _etag(chunks), "Cache-Control": cache_control}
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    return any(tag.strip().removeprefix("W/") in (etag, "*") for tag in header.split(","))
+
+
+def _respond(request: Request, response: Response, chunks: List[dict], epoch: Optional[int], body):
+    headers = _cache_headers(chunks, epoch)
+    if _not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return body
+
+
+@router.get("/chunks")
+def get_chunks(
+    request: Request,
+    response: Response,
+    ids: List[str] = Query(..., description="Chunk ids, repeated (?ids=a&ids=b)"),
+    epoch: Optional[int] = None,
+):
+    """Full text for a batch of cited chunks, in request order; unknown ids are listed in `missing`."""
+    from src.core import vector_db
+    if len(ids) > CHUNK_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {CHUNK_BATCH_MAX} ids per request")
+    chunks = vector_db.get_chunks_by_ids(ids)
+    found = {chunk["id"] for chunk in chunks}
+    body = {"chunks": chunks, "missing": [cid for cid in ids if cid not in found]}
+    return _respond(request, response, chunks, epoch, body)
+
+
+@router.get("/chunks/{chunk_id}")
+def get_chunk(request: Request, response: Response, chunk_id: str, epoch: Optional[int] = None):
+    from src.core import vector_db
+    chunks = vector_db.get_chunks_by_ids([chunk_id])
+    if not chunks:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    return _respond(request, response, chunks, epoch, chunks[0])
@@ -0,0 +1,73 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from src.utils import memory, tracing
+from src.utils.loop_monitor import loop_monitor
+
+router = APIRouter()
+
+# Operator-only diagnostics. Disabled (404) unless DEBUG_ADMIN_TOKEN is set; requests must
+# then send the token in X-Admin-Token.
+DEBUG_ADMIN_TOKEN = os.getenv("DEBUG_ADMIN_TOKEN", "")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not DEBUG_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, DEBUG_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.get("/traces", dependencies=[Depends(require_admin)])
+def list_traces(limit: int = Query(50, ge=1, le=500)):
+    """Most recent request ids still in the trace ring buffer, newest first."""
+    return {"request_ids": tracing.trace_buffer.recent(limit)}
+
+
+@router.get("/traces/{request_id}", dependencies=[Depends(require_admin)])
+def get_trace(request_id: str, format: str = Query("spans", pattern="^(spans|otlp)$")):
+    """Spans recorded for one request, as a flat list ordered by start time or as OTLP/JSON."""
+    trace = tracing.to_otlp(request_id) if format == "otlp" else tracing.get_trace(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (expired or never recorded)")
+    return trace
+
+
+@router.get("/blockers", dependencies=[Depends(require_admin)])
+def list_blockers(limit: int = Query(20, ge=1, le=200)):
+    """Call sites that blocked the event loop past the threshold, by total blocked time."""
+    return {
+        "monitor_running": loop_monitor.running,
+        "threshold_ms": loop_monitor.threshold * 1000,
+        "max_lag_ms": round(loop_monitor.max_lag * 1000, 2),
+        "blockers": loop_monitor.top_blockers(limit),
+    }
+
+
+@router.get("/memory", dependencies=[Depends(require_admin)])
+def memory_report():
+    """Process RSS next to the estimated size of each registered cache, index and model."""
+    from src.core.memory_governor import get_governor
+    return {**memory.report(), "governor": get_governor().status()}
+
+
+@router.get("/memory/allocations", dependencies=[Depends(require_admin)])
+def memory_allocations(limit: int = Query(20, ge=1, le=200), diff: bool = False,
+                       group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")):
+    """Top tracemalloc allocation sites; diff=true shows growth since the previous call."""
+    try:
+        return memory.top_allocations(limit, group_by, diff)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=f"{e}; enable it with POST /debug/memory/tracemalloc?enabled=true")
+
+
+@router.post("/memory/tracemalloc", dependencies=[Depends(require_admin)])
+def toggle_tracemalloc(enabled: bool, frames: int = Query(memory.TRACEMALLOC_FRAMES, ge=1, le=50)):
+    if enabled:
+        memory.start_tracemalloc(frames)
+    else:
+        memory.stop_tracemalloc()
+    return memory.tracemalloc_status()
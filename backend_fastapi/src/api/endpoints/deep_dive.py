@@ -1,13 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from src.core.rag_chat import answer_question_stream
-from src.db.database import get_db
+from src.db.database import AsyncSessionLocal
+from src.db.write_behind import chat_writer
+from src.core.identity_cache import resolve_movie_async, resolve_user_async
+from src.core.citations import citations_event
 from src.models import sql_models
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+import asyncio
 import json
 import re
-from typing import Optional, List, Union
+from typing import Literal, Optional, List, Union
 
 router = APIRouter()
 
@@ -18,12 +22,12 @@ class ChatQuery(BaseModel):
     persona: str = "critic"
     clerk_id: Optional[str] = None
     tmdb_ids: Optional[List[int]] = None # New optional field for direct ID passing
+    citation_mode: Literal["full", "ids"] = "full" # "ids": previews + /chunks links instead of full text
 
 @router.post("/deep_dive")
 async def deep_dive_chat(
     payload: ChatQuery, 
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks
 ):
     from src.utils.logger import logger
     try:
@@ -33,70 +37,82 @@ async def deep_dive_chat(
 
         logger.log("INPUT", f"Question: {payload.question[:50]}...")
         
-        # Resolve or create movie records
-        for i, title in enumerate(movie_titles):
-            passed_id = payload.tmdb_ids[i] if payload.tmdb_ids and i < len(payload.tmdb_ids) else None
-            
-            db_movie = None
-            if passed_id:
-                db_movie = db.query(sql_models.Movie).filter(sql_models.Movie.tmdb_id == passed_id).first()
-            
-            if not db_movie:
-                db_movie = db.query(sql_models.Movie).filter(sql_models.Movie.title == title).first()
-
-            if not db_movie:
-                if not passed_id:
-                     logger.error(f"Movie resolve failed for '{title}' (No ID)")
-                     raise HTTPException(status_code=400, detail=f"No ID for {title}")
-                
-                logger.db(f"Auto-initializing record for {title}")
-                db_movie = sql_models.Movie(title=title, tmdb_id=passed_id, status=sql_models.JobStatus.PROCESSING)
-                db.add(db_movie)
-                db.commit()
-                db.refresh(db_movie)
-
-            # Trigger embeddings if needed
-            from src.core import vector_db
-            current_tid = db_movie.tmdb_id
-            if not vector_db.has_movie(current_tid):
-                logger.worker(f"Triggering background workers for {title}...")
-                def task_wrapper(m_name, t_id):
-                    from src.db.database import SessionLocal
-                    from src.utils.logger import logger
-                    db_task = SessionLocal()
-                    try:
-                        from src.api.endpoints.summary import generate_embeddings_task
-                        generate_embeddings_task(m_name, t_id, db_task)
-                    finally:
-                        db_task.close()
-                background_tasks.add_task(task_wrapper, title, current_tid)
-
-            resolved_tmdb_ids.append(current_tid)
-            if first_movie_db_id is None: first_movie_db_id = db_movie.id
-
-        # 2. Resolve User & Migration
-        db_user = None
         if payload.clerk_id:
-            db_user = db.query(sql_models.User).filter(sql_models.User.clerk_id == payload.clerk_id).first()
-            if db_user:
-                logger.db(f"Claiming guest thread {payload.thread_id} for user {db_user.id}")
-                db.query(sql_models.ChatHistory).filter(
-                    sql_models.ChatHistory.thread_id == payload.thread_id,
-                    sql_models.ChatHistory.user_id == None
-                ).update({"user_id": db_user.id})
-                db.commit()
-
-        # 3. Save User Message
-        user_msg = sql_models.ChatHistory(
+            # Guest messages may still be queued; write them first so the thread claim covers them
+            await chat_writer.flush()
+
+        # Short-lived session: released before streaming starts
+        async with AsyncSessionLocal() as db:
+            # Resolve or create movie records
+            for i, title in enumerate(movie_titles):
+                passed_id = payload.tmdb_ids[i] if payload.tmdb_ids and i < len(payload.tmdb_ids) else None
+                
+                db_movie = None
+                if passed_id:
+                    db_movie = await resolve_movie_async(db, tmdb_id=passed_id)
+                
+                if not db_movie:
+                    db_movie = await resolve_movie_async(db, title=title)
+
+                if not db_movie:
+                    if not passed_id:
+                         logger.error(f"Movie resolve failed for '{title}' (No ID)")
+                         raise HTTPException(status_code=400, detail=f"No ID for {title}")
+                    
+                    logger.db(f"Auto-initializing record for {title}")
+                    db_movie = sql_models.Movie(title=title, tmdb_id=passed_id, status=sql_models.JobStatus.PROCESSING)
+                    db.add(db_movie)
+                    await db.commit()
+                    await db.refresh(db_movie)
+
+                # Trigger embeddings if needed
+                from src.core import vector_db
+                current_tid = db_movie.tmdb_id
+                # Chroma lookups are blocking; keep them off the event loop
+                if not await asyncio.to_thread(vector_db.has_movie, current_tid):
+                    logger.worker(f"Triggering background workers for {title}...")
+                    def task_wrapper(m_name, t_id):
+                        from src.db.database import SessionLocal
+                        from src.utils.logger import logger
+                        db_task = SessionLocal()
+                        try:
+                            from src.api.endpoints.summary import generate_embeddings_task
+                            generate_embeddings_task(m_name, t_id, db_task)
+                        finally:
+                            db_task.close()
+                    background_tasks.add_task(task_wrapper, title, current_tid)
+
+                resolved_tmdb_ids.append(current_tid)
+                if first_movie_db_id is None: first_movie_db_id = db_movie.id
+
+            # 2. Resolve User & Migration
+            db_user = None
+            if payload.clerk_id:
+                db_user = await resolve_user_async(db, payload.clerk_id)
+                if db_user:
+                    logger.db(f"Claiming guest thread {payload.thread_id} for user {db_user.id}")
+                    claimed = await db.execute(update(sql_models.ChatHistory).where(
+                        sql_models.ChatHistory.thread_id == payload.thread_id,
+                        sql_models.ChatHistory.user_id == None
+                    ).values(user_id=db_user.id).returning(sql_models.ChatHistory.movie_id))
+                    claimed_movie_ids = {row[0] for row in claimed}
+                    if claimed_movie_ids:
+                        # Claimed messages now count towards the user's per-movie stats
+                        from src.db import stats
+                        user_id = db_user.id
+                        await db.run_sync(lambda s: stats.reconcile(s.connection(), claimed_movie_ids, user_id))
+                    await db.commit()
+
+        # 3. Save User Message (write-behind, no connection held)
+        user_id = db_user.id if db_user else None
+        chat_writer.enqueue(
             thread_id=payload.thread_id,
-            user_id=db_user.id if db_user else None,
+            user_id=user_id,
             movie_id=first_movie_db_id,
             role="user",
             message=payload.question,
             persona=payload.persona
         )
-        db.add(user_msg)
-        db.commit()
 
         # 4. Stream response using SSE
         async def event_generator():
@@ -114,7 +130,6 @@ async def deep_dive_chat(
                 for i in range(0, len(words), 10):
                     chunk = " ".join(words[i:i+10]) + " "
                     yield f"data: {json.dumps({'token': chunk})}\n\n"
-                    import asyncio
                     await asyncio.sleep(delay)
 
             try:
@@ -122,15 +137,19 @@ async def deep_dive_chat(
                     tmdb_id=resolved_tmdb_ids,
                     question=payload.question,
                     persona=payload.persona,
-                    thread_id=payload.thread_id
+                    thread_id=payload.thread_id,
+                    user_id=user_id
                 ):
                     if item["type"] == "status":
                         status_text = f"💡 _{item['message']}_ \n\n"
                         yield f"data: {json.dumps({'token': status_text})}\n\n"
                         continue
+                    if item["type"] == "meta":
+                        yield f"data: {json.dumps({'type': 'meta', 'degradations': item['degradations']})}\n\n"
+                        continue
                     if item["type"] == "citations":
                         citations = item["sources"]
-                        yield f"data: {json.dumps(item)}\n\n"
+                        yield f"data: {json.dumps(citations_event(citations, payload.citation_mode))}\n\n"
                         continue
                     
                     if item["type"] == "token":
@@ -198,17 +217,15 @@ async def deep_dive_chat(
             answer_match = full_raw.split(ANSWER_MARKER)
             clean_answer = answer_match[-1].strip() if len(answer_match) > 1 else full_raw
 
-            assistant_msg = sql_models.ChatHistory(
+            chat_writer.enqueue(
                 thread_id=payload.thread_id,
-                user_id=db_user.id if db_user else None,
+                user_id=user_id,
                 movie_id=first_movie_db_id,
                 role="assistant",
                 message=clean_answer,
-                citations=json.dumps(citations),
+                citation_ids=[c["id"] for c in citations],
                 persona=payload.persona
             )
-            db.add(assistant_msg)
-            db.commit()
             yield "data: [DONE]\n\n"
 
         return StreamingResponse(
@@ -219,4 +236,10 @@ async def deep_dive_chat(
 
     except Exception as e:
         logger.error(f"Deep Dive Fatal: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/deep_dive/cache/stats")
+async def deep_dive_cache_stats():
+    """Hit rate and generation time saved by the semantic answer cache."""
+    from src.core.answer_cache import answer_cache
+    return answer_cache.stats()
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from src.db.database import get_db
 from src.models import sql_models, schemas
+from src.core.identity_cache import resolve_user
+from src.utils.pagination import keyset_page
 import uuid
 import random
 
@@ -17,12 +18,12 @@ def list_active_boards(db: Session = Depends(get_db)):
     """Return all movies that have at least one discussion post, with counts."""
     results = (
         db.query(
-            sql_models.ForumPost.movie_id,
+            sql_models.MovieStats.movie_id,
             sql_models.Movie.title,
-            func.count(sql_models.ForumPost.id).label("post_count")
+            sql_models.MovieStats.post_count
         )
-        .join(sql_models.Movie, sql_models.ForumPost.movie_id == sql_models.Movie.id)
-        .group_by(sql_models.ForumPost.movie_id, sql_models.Movie.title)
+        .join(sql_models.Movie, sql_models.MovieStats.movie_id == sql_models.Movie.id)
+        .filter(sql_models.MovieStats.post_count > 0)
         .all()
     )
     return [
@@ -31,8 +32,19 @@ def list_active_boards(db: Session = Depends(get_db)):
     ]
 
 @router.get("/boards/{movie_id}/posts", response_model=List[schemas.ForumPostResponse])
-def get_movie_posts(movie_id: int, db: Session = Depends(get_db)):
-    return db.query(sql_models.ForumPost).filter(sql_models.ForumPost.movie_id == movie_id).all()
+def get_movie_posts(
+    movie_id: int,
+    response: Response,
+    cursor: Optional[int] = Query(None, description="Last post id from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    query = (
+        db.query(sql_models.ForumPost)
+        .options(selectinload(sql_models.ForumPost.replies))
+        .filter(sql_models.ForumPost.movie_id == movie_id)
+    )
+    return keyset_page(query, sql_models.ForumPost.id, cursor, limit, response)
 
 @router.post("/boards/{movie_id}/posts", response_model=schemas.ForumPostResponse)
 def create_post(movie_id: int, post: schemas.ForumPostCreate, db: Session = Depends(get_db)):
@@ -58,7 +70,7 @@ def create_post(movie_id: int, post: schemas.ForumPostCreate, db: Session = Depe
         
     db_user = None
     if post.clerk_id:
-        db_user = db.query(sql_models.User).filter(sql_models.User.clerk_id == post.clerk_id).first()
+        db_user = resolve_user(db, post.clerk_id)
         
     new_post = sql_models.ForumPost(
         post_number = generate_post_number(),
@@ -77,7 +89,7 @@ def create_post(movie_id: int, post: schemas.ForumPostCreate, db: Session = Depe
 def create_reply(post_id: int, reply: schemas.ForumReplyCreate, db: Session = Depends(get_db)):
     db_user = None
     if reply.clerk_id:
-        db_user = db.query(sql_models.User).filter(sql_models.User.clerk_id == reply.clerk_id).first()
+        db_user = resolve_user(db, reply.clerk_id)
 
     new_reply = sql_models.ForumReply(
         reply_number = generate_post_number(),
@@ -22,6 +22,8 @@ def generate_embeddings_task(movie_name: str, tmdb_id: int, db: Session):
     if not movie_record:
         return # Should not happen
 
+    from src.utils import metrics
+    metrics.QUEUE_DEPTH.inc(queue="ingestion")
     try:
         print(f"Starting embeddings generation for {movie_name} (ID: {tmdb_id})...")
         movie_record.status = JobStatus.PROCESSING
@@ -39,6 +41,14 @@ def generate_embeddings_task(movie_name: str, tmdb_id: int, db: Session):
         # Create full text from subtitles
         full_text = "\n".join(dialogue_lines)
         
+        # Embedding is the memory-heavy step; hold it while the governor reports pressure
+        from src.core.memory_governor import get_governor
+        if not get_governor().wait_for_ingestion():
+            movie_record.status = JobStatus.FAILED
+            movie_record.error_message = "Paused too long under memory pressure"
+            db.commit()
+            return
+
         # Build and save embeddings (passing tmdb_id)
         count = build_embeddings(movie_name, tmdb_id, full_text)
         
@@ -57,6 +67,8 @@ def generate_embeddings_task(movie_name: str, tmdb_id: int, db: Session):
             movie_record.status = JobStatus.FAILED
             movie_record.error_message = str(e)
             db.commit()
+    finally:
+        metrics.QUEUE_DEPTH.dec(queue="ingestion")
 
 @router.post("/generate_embeddings")
 async def generate_embeddings(
@@ -68,6 +80,10 @@ async def generate_embeddings(
     Endpoint to trigger embeddings generation for a movie.
     Returns immediately and processes in background.
     """
+    from src.core.memory_governor import get_governor
+    if not get_governor().accepting_ingestion():
+        raise HTTPException(status_code=503, detail="Server is under memory pressure; retry later",
+                            headers={"Retry-After": "30"})
     try:
         # Check DB status
         movie_record = db.query(Movie).filter(Movie.tmdb_id == request.tmdb_id).first()
@@ -1,28 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from src.db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.db.database import get_async_db
+from src.core.identity_cache import resolve_movie_async, resolve_user_async
 from src.models import sql_models, schemas
 from src.utils.logger import logger
 
 router = APIRouter()
 
 @router.post("/feedback/rate")
-async def submit_feedback(payload: schemas.FeedbackRate, db: Session = Depends(get_db)):
+async def submit_feedback(payload: schemas.FeedbackRate, db: AsyncSession = Depends(get_async_db)):
     """
     Submit a thumbs up/down for a summary or deep dive response.
     Requires a signed-in user (identified by clerk_id).
     """
     # 1. Resolve user — must be logged in
-    user = db.query(sql_models.User).filter(
-        sql_models.User.clerk_id == payload.clerk_id
-    ).first()
+    user = await resolve_user_async(db, payload.clerk_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found. Please sign in to submit feedback.")
 
     # 2. Resolve movie by tmdb_id (reliable, no string matching)
-    movie = db.query(sql_models.Movie).filter(
-        sql_models.Movie.tmdb_id == payload.tmdb_id
-    ).first()
+    movie = await resolve_movie_async(db, tmdb_id=payload.tmdb_id)
     if not movie:
         raise HTTPException(status_code=404, detail=f"Movie with TMDB ID {payload.tmdb_id} not found in archive.")
 
@@ -37,8 +34,15 @@ async def submit_feedback(payload: schemas.FeedbackRate, db: Session = Depends(g
         persona=payload.context,            # Store context ("summary" or "deep_dive")
     )
     db.add(feedback)
-    db.commit()
-    db.refresh(feedback)
+    await db.commit()
+    await db.refresh(feedback)
+
+    if not payload.upvote:
+        # Downvotes change chunk penalties, so cached deep-dive answers for this film are stale
+        from src.core.answer_cache import invalidate_movie
+        from src.core.retrieval_cache import invalidate_penalties
+        invalidate_movie(movie.tmdb_id)
+        invalidate_penalties(movie.id)
 
     arrow = "👍" if payload.upvote else "👎"
     logger.db(f"Feedback [{arrow}] for {movie.title} ({payload.context}) from user {user.id}")
@@ -1,41 +1,120 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func
 from typing import List, Optional
 from src.db.database import get_db
 from src.models import sql_models, schemas
+from src.core.identity_cache import resolve_user
+from src.utils.pagination import keyset_page
 
 router = APIRouter()
 
+# Without a limit the legacy listings return every row, as they did before pagination
+PAGE_LIMIT = Query(None, ge=1, le=500)
+
+@router.get("/threads/summary", response_model=List[schemas.ThreadSummaryResponse])
+def get_thread_summaries(
+    response: Response,
+    clerk_id: Optional[str] = None,
+    cursor: Optional[int] = Query(None, description="last_message_id of the previous page"),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """One row per thread (latest message, message count, movie), most recent first, computed in SQL."""
+    ch = sql_models.ChatHistory
+    threads = db.query(
+        ch.thread_id.label("thread_id"),
+        func.max(ch.id).label("last_id"),
+        func.count(ch.id).label("message_count"),
+        func.min(ch.created_at).label("started_at"),
+    )
+    if clerk_id:
+        user = resolve_user(db, clerk_id)
+        if not user:
+            return []
+        threads = threads.filter(ch.user_id == user.id)
+    threads = threads.group_by(ch.thread_id).subquery()
+
+    query = (
+        db.query(threads.c.message_count, threads.c.started_at, ch, sql_models.Movie.tmdb_id, sql_models.Movie.title)
+        .join(ch, ch.id == threads.c.last_id)
+        .outerjoin(sql_models.Movie, sql_models.Movie.id == ch.movie_id)
+    )
+    rows = keyset_page(query, threads.c.last_id, cursor, limit, response, descending=True, key=lambda r: r[2].id)
+    return [
+        {
+            "thread_id": last.thread_id,
+            "message_count": count,
+            "started_at": started_at,
+            "last_message_id": last.id,
+            "last_message": last.message,
+            "last_role": last.role,
+            "last_message_at": last.created_at,
+            "persona": last.persona,
+            "movie_id": last.movie_id,
+            "tmdb_id": tmdb_id,
+            "movie_title": title,
+        }
+        for count, started_at, last, tmdb_id, title in rows
+    ]
+
 @router.get("/{clerk_id}", response_model=List[schemas.ChatHistoryResponse])
-def get_user_chat_history(clerk_id: str, db: Session = Depends(get_db)):
-    db_user = db.query(sql_models.User).filter(sql_models.User.clerk_id == clerk_id).first()
+def get_user_chat_history(
+    clerk_id: str,
+    response: Response,
+    cursor: Optional[int] = Query(None, description="Last message id from the previous page"),
+    limit: Optional[int] = PAGE_LIMIT,
+    db: Session = Depends(get_db)
+):
+    db_user = resolve_user(db, clerk_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return db.query(sql_models.ChatHistory).filter(sql_models.ChatHistory.user_id == db_user.id).order_by(sql_models.ChatHistory.created_at.desc()).all()
+    query = (
+        db.query(sql_models.ChatHistory)
+        .options(selectinload(sql_models.ChatHistory.movie), selectinload(sql_models.ChatHistory.citation_links))
+        .filter(sql_models.ChatHistory.user_id == db_user.id)
+    )
+    return keyset_page(query, sql_models.ChatHistory.id, cursor, limit, response, descending=True)
 
 @router.get("/thread/all", response_model=List[schemas.ChatHistoryResponse])
-def get_all_threads(clerk_id: Optional[str] = None, db: Session = Depends(get_db)):
-    """Return all chat messages across all threads, ordered by most recent first.
-    The frontend groups these by thread_id to build the session list."""
-    query = db.query(sql_models.ChatHistory)
+def get_all_threads(
+    response: Response,
+    clerk_id: Optional[str] = None,
+    cursor: Optional[int] = Query(None, description="Last message id from the previous page"),
+    limit: int = Query(500, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Return chat messages across all threads, ordered by most recent first.
+    Prefer /history/threads/summary for building the session list."""
+    query = db.query(sql_models.ChatHistory).options(selectinload(sql_models.ChatHistory.movie), selectinload(sql_models.ChatHistory.citation_links))
     
     if clerk_id:
-        user = db.query(sql_models.User).filter(sql_models.User.clerk_id == clerk_id).first()
+        user = resolve_user(db, clerk_id)
         if not user:
             return []
         query = query.filter(sql_models.ChatHistory.user_id == user.id)
         
-    return query.order_by(sql_models.ChatHistory.created_at.desc()).limit(500).all()
+    return keyset_page(query, sql_models.ChatHistory.id, cursor, limit, response, descending=True)
 
 @router.get("/thread/{thread_id}", response_model=List[schemas.ChatHistoryResponse])
-def get_thread_history(thread_id: str, clerk_id: Optional[str] = None, db: Session = Depends(get_db)):
-    query = db.query(sql_models.ChatHistory).filter(sql_models.ChatHistory.thread_id == thread_id)
+def get_thread_history(
+    thread_id: str,
+    response: Response,
+    clerk_id: Optional[str] = None,
+    cursor: Optional[int] = Query(None, description="Last message id from the previous page"),
+    limit: Optional[int] = PAGE_LIMIT,
+    db: Session = Depends(get_db)
+):
+    query = (
+        db.query(sql_models.ChatHistory)
+        .options(selectinload(sql_models.ChatHistory.movie), selectinload(sql_models.ChatHistory.citation_links))
+        .filter(sql_models.ChatHistory.thread_id == thread_id)
+    )
     
     # Simple Auth check
     if clerk_id:
-        user = db.query(sql_models.User).filter(sql_models.User.clerk_id == clerk_id).first()
+        user = resolve_user(db, clerk_id)
         if user:
             query = query.filter(sql_models.ChatHistory.user_id == user.id)
         else:
@@ -44,9 +123,7 @@ def get_thread_history(thread_id: str, clerk_id: Optional[str] = None, db: Sessi
         # Strictly enforce that if no clerk_id is given, you can ONLY read guest threads
         query = query.filter(sql_models.ChatHistory.user_id == None)
             
-    history = query.order_by(sql_models.ChatHistory.created_at.asc()).all()
-    if not history: return []
-    return history
+    return keyset_page(query, sql_models.ChatHistory.id, cursor, limit, response)
 
 @router.post("/chat-history", response_model=schemas.ChatHistoryResponse)
 def save_chat_message(message: schemas.ChatHistoryCreate, db: Session = Depends(get_db)):
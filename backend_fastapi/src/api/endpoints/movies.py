@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
+from sqlalchemy import func, and_, or_
 from typing import List, Optional
 from pydantic import BaseModel
 from src.db.database import get_db
 from src.models import sql_models, schemas
+from src.core.identity_cache import resolve_movie, resolve_user
+from src.utils.pagination import keyset_page
 
 router = APIRouter()
 
@@ -26,64 +28,65 @@ class EngageRequest(BaseModel):
 
 @router.get("/collection")
 def get_collection(
+    response: Response,
     clerk_id: Optional[str] = None, 
     show_hidden: bool = False, 
+    cursor: Optional[int] = Query(None, description="Last movie id from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
     db: Session = Depends(get_db)
 ):
     """Return collection items (summaries, chats, forum posts) scoped to the user if clerk_id is provided."""
     
     # 1. Resolve User
     user = None
-    hidden_movie_ids = set()
     if clerk_id:
-        user = db.query(sql_models.User).filter(sql_models.User.clerk_id == clerk_id).first()
-        if user:
-            hidden_records = db.query(sql_models.UserHiddenMovie).filter(sql_models.UserHiddenMovie.user_id == user.id).all()
-            hidden_movie_ids = {r.movie_id for r in hidden_records}
-
-    movies = db.query(sql_models.Movie).all()
-    result = []
-    for movie in movies:
-        # If scoped to user, filter counts by user.id
-        summary_q = db.query(func.count(sql_models.SummaryCache.id)).filter(sql_models.SummaryCache.movie_id == movie.id)
-        deep_dive_q = db.query(func.count(distinct(sql_models.ChatHistory.thread_id))).filter(sql_models.ChatHistory.movie_id == movie.id)
-        discussion_q = db.query(func.count(sql_models.ForumPost.id)).filter(sql_models.ForumPost.movie_id == movie.id)
-
-        if user:
-            deep_dive_q = deep_dive_q.filter(sql_models.ChatHistory.user_id == user.id)
-            discussion_q = discussion_q.filter(sql_models.ForumPost.user_id == user.id)
+        user = resolve_user(db, clerk_id)
+
+    # 2. Counters come from the denormalized stats tables (index-only reads, see src.db.stats)
+    ms = sql_models.MovieStats
+    if user:
+        ums = sql_models.UserMovieStats
+        hidden_ids = db.query(sql_models.UserHiddenMovie.movie_id).filter(sql_models.UserHiddenMovie.user_id == user.id)
+        query = (
+            db.query(
+                sql_models.Movie,
+                func.coalesce(ms.summary_count, 0),
+                ums.chat_thread_count,
+                ums.post_count,
+                ums.engagement_count,
+                ums.summary_engagements,
+                ums.deep_dive_engagements,
+            )
+            .join(ums, and_(ums.movie_id == sql_models.Movie.id, ums.user_id == user.id))
+            .outerjoin(ms, ms.movie_id == sql_models.Movie.id)
+            .filter(or_(ums.engagement_count > 0, ums.chat_thread_count > 0, ums.post_count > 0))
+        )
+        is_hidden_filter = sql_models.Movie.id.in_(hidden_ids)
+        query = query.filter(is_hidden_filter if show_hidden else ~is_hidden_filter)
+    else:
+        if show_hidden:
+            # Nothing is hidden without a user
+            return []
+        query = (
+            db.query(sql_models.Movie, ms.summary_count, ms.chat_thread_count, ms.post_count)
+            .join(ms, ms.movie_id == sql_models.Movie.id)
+            .filter(or_(ms.summary_count > 0, ms.chat_thread_count > 0, ms.post_count > 0))
+        )
 
-        summary_count = summary_q.scalar()
-        deep_dive_count = deep_dive_q.scalar()
-        discussion_count = discussion_q.scalar()
+    # 3. Keyset pagination on movie id
+    rows = keyset_page(query, sql_models.Movie.id, cursor, limit, response, key=lambda r: r[0].id)
 
-        # Check Data Presence First
+    result = []
+    for row in rows:
+        movie, n_summaries, n_threads, n_posts = row[:4]
         if user:
-            engagement_q = db.query(sql_models.UserMovieEngagement).filter(sql_models.UserMovieEngagement.user_id == user.id, sql_models.UserMovieEngagement.movie_id == movie.id)
-            user_engagements = {e.engagement_type for e in engagement_q.all()}
-            
-            if not user_engagements and deep_dive_count == 0 and discussion_count == 0:
-                continue
-            
+            _, eng_summary, eng_deep_dive = row[4:]
             # The "Green Tick" status should respond to verified user actions only
-            has_summary = sql_models.EngagementType.SUMMARY in user_engagements
-            has_deep_dive = deep_dive_count > 0 or sql_models.EngagementType.DEEP_DIVE in user_engagements
-            has_discussions = discussion_count > 0
-            
-            # If the only engagement is 'seen', it stays in collection but without ticks
+            has_summary = bool(eng_summary)
+            has_deep_dive = n_threads > 0 or bool(eng_deep_dive)
         else:
-            if summary_count == 0 and deep_dive_count == 0 and discussion_count == 0:
-                continue
-            has_summary = summary_count > 0
-            has_deep_dive = deep_dive_count > 0
-            has_discussions = discussion_count > 0
-
-        # Check if movie is explicitly hidden
-        is_hidden = movie.id in hidden_movie_ids
-        if is_hidden and not show_hidden:
-             continue
-        if not is_hidden and show_hidden:
-             continue
+            has_summary = n_summaries > 0
+            has_deep_dive = n_threads > 0
 
         result.append({
             "id": movie.id,
@@ -92,24 +95,24 @@ def get_collection(
             "created_at": movie.created_at.isoformat() if movie.created_at else None,
             "has_summary": has_summary,
             "has_deep_dive": has_deep_dive,
-            "has_discussions": has_discussions,
-            "summary_count": summary_count,
-            "deep_dive_threads": deep_dive_count,
-            "discussion_posts": discussion_count,
-            "is_hidden": is_hidden,
+            "has_discussions": n_posts > 0,
+            "summary_count": n_summaries,
+            "deep_dive_threads": n_threads,
+            "discussion_posts": n_posts,
+            "is_hidden": bool(user) and show_hidden,
             "tmdb_id": movie.tmdb_id
         })
     return result
 
 @router.post("/collection/engage")
 def engage_movie(payload: EngageRequest, db: Session = Depends(get_db)):
-    user = db.query(sql_models.User).filter(sql_models.User.clerk_id == payload.clerk_id).first()
+    user = resolve_user(db, payload.clerk_id)
     if not user:
         return {"status": "error", "message": "User not found"}
         
     db_movie = None
     if payload.tmdb_id:
-        db_movie = db.query(sql_models.Movie).filter(sql_models.Movie.tmdb_id == payload.tmdb_id).first()
+        db_movie = resolve_movie(db, tmdb_id=payload.tmdb_id)
     elif payload.movie_id:
         db_movie = db.query(sql_models.Movie).filter(sql_models.Movie.id == payload.movie_id).first()
         
@@ -145,7 +148,7 @@ def engage_movie(payload: EngageRequest, db: Session = Depends(get_db)):
 
 @router.post("/collection/hide")
 def hide_movies(payload: HideCollectionRequest, db: Session = Depends(get_db)):
-    user = db.query(sql_models.User).filter(sql_models.User.clerk_id == payload.clerk_id).first()
+    user = resolve_user(db, payload.clerk_id)
     if not user:
         return {"status": "error", "message": "User not found"}
         
@@ -166,12 +169,19 @@ def hide_movies(payload: HideCollectionRequest, db: Session = Depends(get_db)):
 
 @router.post("/collection/delete")
 def delete_movie_data(payload: HideCollectionRequest, db: Session = Depends(get_db)):
-    user = db.query(sql_models.User).filter(sql_models.User.clerk_id == payload.clerk_id).first()
+    user = resolve_user(db, payload.clerk_id)
     if not user:
         return {"status": "error", "message": "User not found"}
         
     for mid in payload.movie_ids:
-        # 1. Delete Chat History
+        # 1. Delete Chat History (and its citation rows; bulk deletes don't cascade)
+        chat_ids = db.query(sql_models.ChatHistory.id).filter(
+            sql_models.ChatHistory.user_id == user.id,
+            sql_models.ChatHistory.movie_id == mid
+        )
+        db.query(sql_models.MessageCitation).filter(
+            sql_models.MessageCitation.chat_id.in_(chat_ids.scalar_subquery())
+        ).delete(synchronize_session=False)
         db.query(sql_models.ChatHistory).filter(
             sql_models.ChatHistory.user_id == user.id,
             sql_models.ChatHistory.movie_id == mid
@@ -186,6 +196,9 @@ def delete_movie_data(payload: HideCollectionRequest, db: Session = Depends(get_
         # Note: We are leaving ForumPosts intact for community history, 
         # but wiping personal generative history.
 
+    # Bulk deletes skip mapper events; recount the affected movies in the same transaction
+    from src.db import stats
+    stats.reconcile(db.connection(), payload.movie_ids)
     db.commit()
     return {"status": "success", "deleted": payload.movie_ids}
 
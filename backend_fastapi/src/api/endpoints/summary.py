@@ -1,22 +1,51 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from fastapi.responses import StreamingResponse, JSONResponse
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
 
 from src.models.movie import MovieName
 from src.core.llm_model import generate_summary_stream
+from src.db.llm_usage import scoped_stream
 from src.utils.subliminalsubsdl import download_subs_lines
-from src.db.database import get_db
+from src.db.database import get_db, get_async_db
 from src.models import sql_models
 from src.api.endpoints.embeddings_generation import generate_embeddings_task
 
 router = APIRouter()
 
+async def _save_summary(db: AsyncSession, movie_id: int, summary_type: str, content: str) -> None:
+    """Upsert on (movie_id, summary_type): a concurrent or repeated run updates the cached row."""
+    from src.db.database import dialect_insert
+    from src.db.stats import bump_movie
+    where = (sql_models.SummaryCache.movie_id == movie_id, sql_models.SummaryCache.summary_type == summary_type)
+    insert = dialect_insert(await db.connection())
+    if insert is None:
+        # Generic fallback for other dialects; the ORM insert bumps summary_count itself
+        existing = (await db.execute(select(sql_models.SummaryCache).where(*where))).scalars().first()
+        if existing:
+            existing.content = content
+        else:
+            db.add(sql_models.SummaryCache(movie_id=movie_id, summary_type=summary_type, content=content))
+        return
+    result = await db.execute(
+        insert(sql_models.SummaryCache.__table__)
+        .values(movie_id=movie_id, summary_type=summary_type, content=content)
+        .on_conflict_do_nothing(index_elements=["movie_id", "summary_type"])
+    )
+    if result.rowcount:
+        # Core inserts skip the ORM after_insert hook that maintains movie_stats
+        await db.run_sync(lambda session: bump_movie(session.connection(), movie_id, summary_count=1))
+        return
+    # A previous or concurrent run already cached this type
+    await db.execute(update(sql_models.SummaryCache).where(*where).values(content=content))
+
 @router.post('/summarize')
 async def summarize_movie_endpoint(
     movie: MovieName, 
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     from src.utils.logger import logger
     try:
@@ -26,13 +55,13 @@ async def summarize_movie_endpoint(
         
         # 1. Resolve movie (Intelligent Get-or-Merge)
         logger.db(f"Resolving identity for '{moviename}'...")
-        db_movie = db.query(sql_models.Movie).filter(sql_models.Movie.tmdb_id == tmdb_id).first()
+        db_movie = (await db.execute(select(sql_models.Movie).where(sql_models.Movie.tmdb_id == tmdb_id))).scalars().first()
         if not db_movie:
-            db_movie = db.query(sql_models.Movie).filter(sql_models.Movie.title == moviename).first()
+            db_movie = (await db.execute(select(sql_models.Movie).where(sql_models.Movie.title == moviename))).scalars().first()
             if db_movie:
                 logger.db(f"Merging legacy title '{moviename}' to TMDB ID: {tmdb_id}")
                 db_movie.tmdb_id = tmdb_id
-                db.commit()
+                await db.commit()
             else:
                 try:
                     logger.db(f"Creating fresh archive record for '{moviename}'")
@@ -42,13 +71,13 @@ async def summarize_movie_endpoint(
                         status=sql_models.JobStatus.PROCESSING
                     )
                     db.add(db_movie)
-                    db.commit()
-                    db.refresh(db_movie)
+                    await db.commit()
+                    await db.refresh(db_movie)
                 except Exception:
-                    db.rollback()
-                    db_movie = db.query(sql_models.Movie).filter(
+                    await db.rollback()
+                    db_movie = (await db.execute(select(sql_models.Movie).where(
                         (sql_models.Movie.tmdb_id == tmdb_id) | (sql_models.Movie.title == moviename)
-                    ).first()
+                    ))).scalars().first()
                     if not db_movie:
                         raise HTTPException(status_code=500, detail="Failed to initialize movie record")
         
@@ -75,10 +104,10 @@ async def summarize_movie_endpoint(
             background_tasks.add_task(task_wrapper, moviename, tmdb_id)
 
         # Check if summary exists in DB
-        existing_summary = db.query(sql_models.SummaryCache).filter(
+        existing_summary = (await db.execute(select(sql_models.SummaryCache).where(
             sql_models.SummaryCache.movie_id == db_movie.id,
             sql_models.SummaryCache.summary_type == "general"
-        ).first()
+        ))).scalars().first()
         
         if existing_summary:
             logger.db(f"Cache HIT for {moviename} summary.")
@@ -95,9 +124,9 @@ async def summarize_movie_endpoint(
         
         # 4. Stream response using SSE
         async def event_generator():
-            from src.db.database import SessionLocal
+            from src.db.database import AsyncSessionLocal
             from src.utils.logger import logger
-            gen_db = SessionLocal()
+            gen_db = AsyncSessionLocal()
             full_summary = []
             
             try:
@@ -107,26 +136,21 @@ async def summarize_movie_endpoint(
                     yield f"data: {json.dumps({'token': token})}\n\n"
                 
                 complete_summary = "".join(full_summary)
-                inner_movie = gen_db.query(sql_models.Movie).filter(sql_models.Movie.tmdb_id == tmdb_id).first()
+                inner_movie = (await gen_db.execute(select(sql_models.Movie).where(sql_models.Movie.tmdb_id == tmdb_id))).scalars().first()
                 if not inner_movie:
                     inner_movie = sql_models.Movie(tmdb_id=tmdb_id, title=moviename)
                     gen_db.add(inner_movie)
-                    gen_db.commit()
-                    gen_db.refresh(inner_movie)
+                    await gen_db.commit()
+                    await gen_db.refresh(inner_movie)
 
-                new_summary = sql_models.SummaryCache(
-                    movie_id=inner_movie.id,
-                    summary_type="general",
-                    content=complete_summary
-                )
-                gen_db.add(new_summary)
+                await _save_summary(gen_db, inner_movie.id, "general", complete_summary)
                 
                 # Recommendation Indexing
                 try:
-                    from src.core.embeddings import embedder
+                    from src.core.embeddings import get_embedder
                     from src.core import vector_db
                     logger.rag(f"Updating recommendation index for {moviename}...")
-                    summary_vec = embedder.encode(complete_summary)
+                    summary_vec = get_embedder().encode(complete_summary)
                     vector_db.add_movie_summary_vector(tmdb_id, moviename, complete_summary, summary_vec)
                 except Exception as e:
                     logger.error(f"Recommendation indexing failed: {e}")
@@ -140,29 +164,25 @@ async def summarize_movie_endpoint(
                     essays = await crawler.find_video_essays(moviename)
                     research_summary_text = ResearchAgent.generate_research_summary(moviename, essays)
                     
-                    research_cache = sql_models.SummaryCache(
-                        movie_id=inner_movie.id, 
-                        summary_type="video_essay",
-                        content=research_summary_text
-                    )
-                    gen_db.add(research_cache)
+                    await _save_summary(gen_db, inner_movie.id, "video_essay", research_summary_text)
                     logger.agent(f"Research synthesis complete for {moviename}")
                 except Exception as e:
                     logger.error(f"Research agent failed: {e}")
 
                 inner_movie.status = sql_models.JobStatus.COMPLETED
-                gen_db.commit()
+                await gen_db.commit()
                 yield "data: [DONE]\n\n"
 
             except Exception as e:
-                gen_db.rollback()
+                await gen_db.rollback()
                 logger.error(f"Stream crash: {e}")
                 yield f"data: {json.dumps({'error': str(e)})}\n\n"
             finally:
-                gen_db.close()
+                await gen_db.close()
         
         return StreamingResponse(
-            event_generator(),
+            # LLM calls in the stream (summary, research) are accounted to this film
+            scoped_stream(event_generator(), tmdb_id=tmdb_id),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
@@ -174,14 +194,14 @@ async def summarize_movie_endpoint(
         if 'db_movie' in locals():
             db_movie.error_message = f"File not found: {e.filename}"
             db_movie.status = sql_models.JobStatus.FAILED
-            db.commit()
+            await db.commit()
         raise HTTPException(status_code=404, detail=f"File not found: {e.filename}")
     except Exception as e:
         print(f"Error: {e}")
         if 'db_movie' in locals():
             db_movie.error_message = str(e)
             db_movie.status = sql_models.JobStatus.FAILED
-            db.commit()
+            await db.commit()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post('/video_essays')
@@ -0,0 +1,42 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from src.api.endpoints.debug import require_admin
+from src.db import llm_usage
+from src.db.database import get_db
+
+# Token/cost aggregates can reveal per-user activity, so they share the debug admin token
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/summary")
+def usage_summary(
+    group_by: List[str] = Query(["call_site"], description=f"Any of {', '.join(llm_usage.GROUP_COLUMNS)}"),
+    since_hours: float = Query(24 * 7, gt=0),
+    include_cached: bool = False,
+    order_by: str = Query("total_tokens", description=f"One of {', '.join(llm_usage.ORDER_COLUMNS)}"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """Prompt/completion tokens and cost per group, e.g. group_by=call_site&group_by=persona&order_by=avg_prompt_tokens."""
+    unknown = [g for g in group_by if g not in llm_usage.GROUP_COLUMNS]
+    if unknown or order_by not in llm_usage.ORDER_COLUMNS:
+        raise HTTPException(status_code=422, detail=f"Unsupported group_by {unknown} or order_by '{order_by}'")
+    llm_usage.usage_recorder.flush()  # include calls still buffered in this worker
+    return {
+        "since_hours": since_hours,
+        "group_by": group_by,
+        "rows": llm_usage.summarize(db, group_by, since_hours, include_cached, order_by, limit),
+    }
+
+
+@router.get("/requests/{request_id}")
+def usage_for_request(request_id: str, db: Session = Depends(get_db)):
+    """Every LLM call made while serving one request (the X-Request-ID / trace id)."""
+    llm_usage.usage_recorder.flush()
+    rows = llm_usage.request_usage(db, request_id)
+    if not rows:
+        raise HTTPException(status_code=404, detail="No LLM usage recorded for this request")
+    return {"request_id": request_id, "calls": rows}
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from src.core.rag_chat import answer_question_stream
-from src.db.database import get_db
+from src.db.database import AsyncSessionLocal
+from src.db.write_behind import chat_writer
 from src.models import sql_models
-from sqlalchemy.orm import Session
+from src.core.identity_cache import resolve_movie_async, resolve_user_async
+from src.core.citations import CITATION_MODES, citations_event
+from src.utils import metrics, tracing
 import json
 
 router = APIRouter()
@@ -11,24 +14,29 @@ router = APIRouter()
 async def websocket_chat(websocket: WebSocket, tmdb_id: int, thread_id: str, clerk_id: str = None):
     # websocket endpoint for streaming rag chat
     await websocket.accept()
-    
-    # Get DB session (hand-managed for websocket)
-    db = next(get_db())
+    metrics.endpoint_label.set("ws_chat")
     
     try:
-        # Link user if clerk_id provided
-        db_user = None
-        if clerk_id:
-            db_user = db.query(sql_models.User).filter(sql_models.User.clerk_id == clerk_id).first()
-        
-        # Ensure movie exists
-        db_movie = db.query(sql_models.Movie).filter(sql_models.Movie.tmdb_id == tmdb_id).first()
-        if not db_movie:
-            # Fallback title if we don't have it (summarizer usually builds this first)
-            db_movie = sql_models.Movie(tmdb_id=tmdb_id, title=f"Archival_ID_{tmdb_id}", status=sql_models.JobStatus.PENDING)
-            db.add(db_movie)
-            db.commit()
-            db.refresh(db_movie)
+        # Resolve ids with a short-lived session; the socket itself holds no connection
+        async with AsyncSessionLocal() as db:
+            # Link user if clerk_id provided
+            db_user = None
+            if clerk_id:
+                db_user = await resolve_user_async(db, clerk_id)
+
+            # Ensure movie exists
+            db_movie = await resolve_movie_async(db, tmdb_id=tmdb_id)
+            if not db_movie:
+                # Fallback title if we don't have it (summarizer usually builds this first)
+                db_movie = sql_models.Movie(tmdb_id=tmdb_id, title=f"Archival_ID_{tmdb_id}", status=sql_models.JobStatus.PENDING)
+                db.add(db_movie)
+                await db.commit()
+                await db.refresh(db_movie)
+
+        user_id = db_user.id if db_user else None
+        movie_id = db_movie.id
+        # Chunk ids already sent in full on this socket ("delta" citation mode)
+        sent_chunks = set()
 
         while True:
             # receive message from client
@@ -44,75 +52,80 @@ async def websocket_chat(websocket: WebSocket, tmdb_id: int, thread_id: str, cle
                 continue
             
             persona = message_data.get("persona", "critic")
+            citation_mode = message_data.get("citation_mode", "full")
+            if citation_mode not in CITATION_MODES:
+                citation_mode = "full"
             
             # Use current segment or list of ids for comparative
             raw_movies = message_data.get("movies", [tmdb_id])
             ids_list = [int(m) for m in raw_movies]
             
             # Save user message to history
-            user_msg = sql_models.ChatHistory(
+            chat_writer.enqueue(
                 thread_id=thread_id,
-                user_id=db_user.id if db_user else None,
-                movie_id=db_movie.id,
+                user_id=user_id,
+                movie_id=movie_id,
                 role="user",
                 message=question,
                 persona=persona
             )
-            db.add(user_msg)
-            db.commit()
             
-            try:
-                # stream answer tokens via websocket
-                full_answer = []
-                citations = []
-                async for item in answer_question_stream(ids_list, question, persona=persona, thread_id=thread_id):
-                    if item["type"] == "citations":
-                        citations.extend(item["sources"])
-                        await websocket.send_json(item)
-                        continue
+            # One trace per question; the id is echoed in the "done" event for /debug/traces
+            request_id = tracing.new_request_id(message_data.get("request_id"))
+            with tracing.request_trace(request_id, "ws.message", tmdb_id=tmdb_id, persona=persona):
+                try:
+                    # stream answer tokens via websocket
+                    full_answer = []
+                    citations = []
+                    async for item in answer_question_stream(ids_list, question, persona=persona, thread_id=thread_id, user_id=user_id):
+                        if item["type"] == "citations":
+                            citations.extend(item["sources"])
+                            await websocket.send_json(citations_event(item["sources"], citation_mode, sent_chunks))
+                            continue
                     
-                    if item["type"] == "token":
-                        token = item["token"]
-                        full_answer.append(token)
-                        await websocket.send_json({
-                            "type": "token",
-                            "token": token
-                        })
+                        if item["type"] == "meta":
+                            # Retrieval stages skipped for time; the answer is built from partial context
+                            await websocket.send_json({"type": "meta", "degradations": item["degradations"]})
+                            continue
                     
-                    if item["type"] == "done":
-                        break
+                        if item["type"] == "token":
+                            token = item["token"]
+                            full_answer.append(token)
+                            await websocket.send_json({
+                                "type": "token",
+                                "token": token
+                            })
+                    
+                        if item["type"] == "done":
+                            break
                 
-                # signal completion
-                await websocket.send_json({"type": "done"})
+                    # signal completion
+                    await websocket.send_json({"type": "done", "request_id": request_id})
                 
-                # Save assistant message to history
-                assistant_msg = sql_models.ChatHistory(
-                    thread_id=thread_id,
-                    user_id=db_user.id if db_user else None,
-                    movie_id=db_movie.id,
-                    role="assistant",
-                    message="".join(full_answer),
-                    citations=json.dumps(citations),
-                    persona=persona
-                )
-                db.add(assistant_msg)
-                db.commit()
+                    # Save assistant message to history
+                    chat_writer.enqueue(
+                        thread_id=thread_id,
+                        user_id=user_id,
+                        movie_id=movie_id,
+                        role="assistant",
+                        message="".join(full_answer),
+                        citation_ids=[c["id"] for c in citations],
+                        persona=persona
+                    )
                 
-            except FileNotFoundError as e:
-                await websocket.send_json({
-                    "type": "error",
-                    "message": str(e)
-                })
-            except Exception as e:
-                await websocket.send_json({
-                    "type": "error",
-                    "message": f"Error processing question: {str(e)}"
-                })
+                except FileNotFoundError as e:
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": str(e)
+                    })
+                except Exception as e:
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": f"Error processing question: {str(e)}"
+                    })
                 
     except WebSocketDisconnect:
         print(f"Client disconnected from chat for movie ID: {tmdb_id}, thread: {thread_id}")
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
-        await websocket.close()
-    finally:
-        db.close()
\ No newline at end of file
+        await websocket.close()
\ No newline at end of file
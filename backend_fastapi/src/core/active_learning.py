@@ -1,36 +1,28 @@
-from sqlalchemy.orm import Session
-from src.models.sql_models import Feedback, ChatHistory
-import json
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.sql_models import Feedback, MessageCitation
 from typing import Dict, List
 
-def get_discredited_chunks(db: Session, movie_id: int) -> Dict[str, float]:
+# Aggressive penalty: -0.2 per downvote
+PENALTY_PER_DOWNVOTE = 0.2
+
+async def get_discredited_chunks(db: AsyncSession, movie_id: int) -> Dict[str, float]:
     """
     Returns a dictionary of chunk_id -> penalty_score.
     A penalty_score is incremented for every downvote or low rating.
     """
-    penalties = {}
-    
-    # 1. Fetch all low ratings or explicit downvotes for this movie
+    # Count, per cited chunk, the low-rated or explicitly downvoted messages for this movie
     # We prioritize downvote=True or rating <= 2
-    bad_feedback = db.query(Feedback).filter(
-        Feedback.movie_id == movie_id,
-        (Feedback.downvote == True) | (Feedback.rating <= 2)
-    ).all()
-    
-    for fb in bad_feedback:
-        if fb.chat_id:
-            # Find the message associated with this feedback to get the citations
-            chat = db.query(ChatHistory).filter(ChatHistory.id == fb.chat_id).first()
-            if chat and chat.citations:
-                try:
-                    citation_ids = json.loads(chat.citations)
-                    for cid in citation_ids:
-                        # Aggressive penalty: -0.2 per downvote
-                        penalties[cid] = penalties.get(cid, 0) + 0.2
-                except json.JSONDecodeError:
-                    continue
-                    
-    return penalties
+    result = await db.execute(
+        select(MessageCitation.chunk_id, func.count())
+        .join(Feedback, Feedback.chat_id == MessageCitation.chat_id)
+        .where(
+            Feedback.movie_id == movie_id,
+            (Feedback.downvote == True) | (Feedback.rating <= 2)
+        )
+        .group_by(MessageCitation.chunk_id)
+    )
+    return {chunk_id: PENALTY_PER_DOWNVOTE * n for chunk_id, n in result.all()}
 
 def apply_penalties(ranks: Dict[str, float], penalties: Dict[str, float]) -> Dict[str, float]:
     """
@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils import memory
+
+# Semantic cache of deep-dive answers, keyed by (sorted tmdb_ids, persona).
+# Each key owns a small in-memory matrix of question vectors; a lookup is a single
+# matrix-vector product against that matrix.
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "200"))  # per (movies, persona)
+ANSWER_CACHE_MAX_KEYS = int(os.getenv("ANSWER_CACHE_MAX_KEYS", "500"))
+
+# Rough per-citation overhead on top of its text: the dict and its id string (estimate)
+_CITATION_OVERHEAD_BYTES = 64
+
+CacheKey = Tuple[Tuple[int, ...], str]
+
+
+class _AnswerIndex:
+    def __init__(self, epochs: Dict[int, int]):
+        self.epochs = epochs
+        self.vectors: Optional[np.ndarray] = None
+        self.entries: List[dict] = []
+
+    def add(self, vector: np.ndarray, entry: dict, max_entries: int) -> None:
+        row = vector.reshape(1, -1)
+        self.vectors = row if self.vectors is None else np.vstack([self.vectors, row])
+        self.entries.append(entry)
+        if len(self.entries) > max_entries:
+            self.vectors = self.vectors[-max_entries:]
+            self.entries = self.entries[-max_entries:]
+
+    def expire(self, cutoff: float) -> None:
+        """Drops entries created before cutoff; entries are kept in creation order."""
+        stale = 0
+        while stale < len(self.entries) and self.entries[stale]["created_at"] < cutoff:
+            stale += 1
+        if stale:
+            self.entries = self.entries[stale:]
+            self.vectors = self.vectors[stale:] if self.entries else None
+
+
+class SemanticAnswerCache:
+    def __init__(self, threshold: float, ttl_seconds: int, max_entries: int, max_keys: int):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_keys = max_keys
+        self._indexes: "OrderedDict[CacheKey, _AnswerIndex]" = OrderedDict()
+        self._epochs: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0, "latency_saved_seconds": 0.0}
+
+    @staticmethod
+    def make_key(tmdb_ids: Iterable[int], persona: str) -> CacheKey:
+        return tuple(sorted(int(t) for t in tmdb_ids)), (persona or "critic").lower()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def _current_epochs(self, tmdb_ids: Tuple[int, ...]) -> Dict[int, int]:
+        return {tid: self._epochs.get(tid, 0) for tid in tmdb_ids}
+
+    def lookup(self, tmdb_ids: Iterable[int], persona: str, query_vector) -> Optional[dict]:
+        """Returns the closest cached entry above the similarity threshold, or None."""
+        key = self.make_key(tmdb_ids, persona)
+        query = self._normalize(query_vector)
+        now = time.time()
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None and index.epochs != self._current_epochs(key[0]):
+                # Penalties or the vector index changed since these answers were generated
+                del self._indexes[key]
+                index = None
+            if index is not None:
+                index.expire(now - self.ttl_seconds)
+            if index is None or index.vectors is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._indexes.move_to_end(key)
+            scores = index.vectors @ query
+            best = int(np.argmax(scores))
+            entry = index.entries[best]
+            if scores[best] < self.threshold:
+                self._stats["misses"] += 1
+                return None
+
+            self._stats["hits"] += 1
+            self._stats["latency_saved_seconds"] += entry["generation_seconds"]
+            return {**entry, "similarity": float(scores[best])}
+
+    def store(self, tmdb_ids: Iterable[int], persona: str, question: str, query_vector,
+              answer: str, citations: List[dict], generation_seconds: float) -> None:
+        key = self.make_key(tmdb_ids, persona)
+        entry = {
+            "question": question,
+            "answer": answer,
+            "citations": citations,
+            "generation_seconds": generation_seconds,
+            "created_at": time.time(),
+        }
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None or index.epochs != self._current_epochs(key[0]):
+                index = _AnswerIndex(self._current_epochs(key[0]))
+                self._indexes[key] = index
+            index.add(self._normalize(query_vector), entry, self.max_entries)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_keys:
+                self._indexes.popitem(last=False)
+            self._stats["stores"] += 1
+
+    def invalidate(self, tmdb_id: int) -> None:
+        """Drops every cached answer that involves this movie (re-index or new penalties)."""
+        tid = int(tmdb_id)
+        with self._lock:
+            self._epochs[tid] = self._epochs.get(tid, 0) + 1
+            for key in [k for k in self._indexes if tid in k[0]]:
+                del self._indexes[key]
+            self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+    def shrink(self, fraction: float) -> None:
+        """Drops the least recently used (movies, persona) indexes, fraction of them (rounded up)."""
+        with self._lock:
+            for _ in range(int(len(self._indexes) * fraction + 0.999)):
+                self._indexes.popitem(last=False)
+
+    def nbytes(self) -> int:
+        """Question matrices plus the cached answer and citation text."""
+        with self._lock:
+            total = 0
+            for index in self._indexes.values():
+                total += index.vectors.nbytes if index.vectors is not None else 0
+                for entry in index.entries:
+                    total += len(entry["question"]) + len(entry["answer"])
+                    total += sum(len(c.get("text", "")) + _CITATION_OVERHEAD_BYTES for c in entry["citations"])
+            return total
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "lookups": lookups,
+                "hit_rate": (self._stats["hits"] / lookups) if lookups else 0.0,
+                "keys": len(self._indexes),
+                "entries": sum(len(i.entries) for i in self._indexes.values()),
+            }
+
+
+answer_cache = SemanticAnswerCache(
+    ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_MAX_KEYS
+)
+memory.register("answer_cache", answer_cache.nbytes, answer_cache.stats, shrink=answer_cache.shrink, priority=30)
+
+
+def invalidate_movie(tmdb_id: int) -> None:
+    answer_cache.invalidate(tmdb_id)
@@ -1,23 +1,36 @@
 import chromadb
 import numpy as np
 import os
+import time
 from typing import List, Dict, Optional, Union
 from src.core.vector_store_base import BaseVectorStore
 
+# Rough HNSW costs per element (estimates, not measured): each float32 vector is held in
+# memory with ~M*2 neighbour links (Chroma's default M=16) plus bookkeeping
+_HNSW_LINKS_PER_ELEMENT = 16 * 2
+_HNSW_ELEMENT_OVERHEAD_BYTES = 64
+
 class ChromaVectorStore(BaseVectorStore):
     def __init__(self, collection_name: str = "movie_dialogues"):
         # Initialize persistent client
-        self.chroma_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "chroma_db")
+        default_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "chroma_db")
+        self.chroma_path = os.getenv("CHROMA_PATH", default_path)
         self.client = chromadb.PersistentClient(path=self.chroma_path)
         self.collection = self.client.get_or_create_collection(name=collection_name)
         
         # New collection for full movie summaries (for recommendations)
         self.summary_collection = self.client.get_or_create_collection(name="movie_summaries")
+        # Index size for memory_bytes(), kept current by the write methods so /metrics scrapes never query Chroma
+        self._dimension: Optional[int] = None
+        self._elements = 0
+        self._refresh_size()
 
     def add_vectors(self, tmdb_id: Union[int, str], movie_name: str, chunks: List[str], vectors: np.ndarray) -> None:
         count = len(chunks)
         ids = [f"{tmdb_id}_{i}" for i in range(count)]
-        metadatas = [{"movie_name": movie_name, "tmdb_id": int(tmdb_id), "chunk_index": i} for i in range(count)]
+        # Chunk ids are reused on re-index; the epoch tells clients when their cached text went stale
+        epoch = int(time.time() * 1000)
+        metadatas = [{"movie_name": movie_name, "tmdb_id": int(tmdb_id), "chunk_index": i, "index_epoch": epoch} for i in range(count)]
         
         self.collection.upsert(
             ids=ids,
@@ -25,6 +38,7 @@ class ChromaVectorStore(BaseVectorStore):
             documents=chunks,
             metadatas=metadatas
         )
+        self._refresh_size(vectors.shape[1] if count else None)
         print(f"[STORE] ChromaStore: Upserted {count} chunks for {movie_name} (ID: {tmdb_id})")
         
     def add_movie_summary_vector(self, tmdb_id: Union[int, str], movie_name: str, summary_text: str, vector: np.ndarray) -> None:
@@ -35,6 +49,7 @@ class ChromaVectorStore(BaseVectorStore):
             documents=[summary_text],
             metadatas=[{"movie_name": movie_name, "tmdb_id": int(tmdb_id)}]
         )
+        self._refresh_size(len(vector))
         print(f"[STORE] ChromaStore: Saved summary vector for {movie_name} (ID: {tmdb_id})")
 
     def get_similar_movies(self, tmdb_id: Union[int, str], n_results: int = 5) -> List[Dict]:
@@ -84,13 +99,47 @@ class ChromaVectorStore(BaseVectorStore):
         )
         return [{"id": id, "text": doc} for id, doc in zip(results['ids'], results['documents'])]
 
+    def get_chunks_by_ids(self, chunk_ids: List[str]) -> List[Dict]:
+        if not chunk_ids:
+            return []
+        results = self.collection.get(ids=list(dict.fromkeys(chunk_ids)), include=['documents', 'metadatas'])
+        found = {
+            id: {"id": id, "text": doc, "tmdb_id": meta.get("tmdb_id"), "epoch": meta.get("index_epoch", 0)}
+            for id, doc, meta in zip(results['ids'], results['documents'], results['metadatas'])
+        }
+        return [found[cid] for cid in chunk_ids if cid in found]
+
+    def get_index_epoch(self, tmdb_id: Union[int, str]) -> int:
+        result = self.collection.get(
+            where={"tmdb_id": {"$eq": int(tmdb_id)}},
+            limit=1,
+            include=['metadatas']
+        )
+        return result['metadatas'][0].get("index_epoch", 0) if result['ids'] else 0
+
     def get_movie_documents(self, tmdb_id: Union[int, str]) -> List[str]:
         # Backwards compatibility helper
         data = self.get_movie_data(tmdb_id)
         return [d["text"] for d in data]
 
+    def _refresh_size(self, dimension: Optional[int] = None) -> None:
+        # Called from the (already blocking) constructor and write paths; upserts may replace ids, so recount
+        self._elements = self.collection.count() + self.summary_collection.count()
+        if dimension:
+            self._dimension = dimension
+        elif self._dimension is None and self._elements:
+            sample = self.collection.get(limit=1, include=['embeddings'])
+            if len(sample['ids']) > 0:
+                self._dimension = len(sample['embeddings'][0])
+
+    def memory_bytes(self) -> int:
+        if not self._dimension:
+            return 0
+        return self._elements * (self._dimension * 4 + _HNSW_LINKS_PER_ELEMENT * 4 + _HNSW_ELEMENT_OVERHEAD_BYTES)
+
     def delete_movie(self, tmdb_id: Union[int, str]) -> None:
         self.collection.delete(
             where={"tmdb_id": {"$eq": int(tmdb_id)}}
         )
         self.summary_collection.delete(ids=[str(tmdb_id)])
+        self._refresh_size()
@@ -0,0 +1,49 @@
+import os
+from typing import Dict, List, Optional
+
+# Shapes the {"type": "citations"} stream event. Chunk text is immutable per index
+# epoch, so clients can fetch it once from GET /chunks/{id}?epoch=N and cache it.
+#   full  - every source with its full text (default, original payload)
+#   ids   - ids plus short previews and a versioned /chunks link
+#   delta - full text only for chunks not yet sent on this stream (WebSocket), previews otherwise
+CITATION_MODES = ("full", "ids", "delta")
+CITATION_PREVIEW_CHARS = int(os.getenv("CITATION_PREVIEW_CHARS", "160"))
+
+
+def chunk_tmdb_id(chunk_id: str) -> Optional[int]:
+    """Chunk ids are "<tmdb_id>_<chunk_index>"."""
+    head, _, _ = str(chunk_id).partition("_")
+    return int(head) if head.isdigit() else None
+
+
+def preview(text: str, limit: int = CITATION_PREVIEW_CHARS) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def chunk_ref(source: Dict) -> Dict:
+    """Id-only reference to a source: preview, index epoch and a cacheable link to the full text."""
+    from src.core import vector_db
+    tmdb_id = chunk_tmdb_id(source["id"])
+    epoch = vector_db.index_epoch(tmdb_id) if tmdb_id is not None else 0
+    return {
+        "id": source["id"],
+        "preview": preview(source.get("text", "")),
+        "epoch": epoch,
+        "href": f"/chunks/{source['id']}?epoch={epoch}",
+    }
+
+
+def citations_event(sources: List[Dict], mode: str = "full", seen: Optional[set] = None) -> Dict:
+    """Builds the citations event; `seen` is the set of chunk ids already sent in full on this stream."""
+    if mode not in ("ids", "delta"):
+        return {"type": "citations", "sources": sources}
+    seen = seen if seen is not None else set()
+    shaped = []
+    for source in sources:
+        if mode == "delta" and source["id"] not in seen:
+            shaped.append(source)
+            seen.add(source["id"])
+        else:
+            shaped.append(chunk_ref(source))
+    return {"type": "citations", "mode": mode, "ids": [s["id"] for s in sources], "sources": shaped}
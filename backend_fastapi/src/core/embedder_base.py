@@ -0,0 +1,16 @@
+from abc import ABC, abstractmethod
+from typing import List, Union
+import numpy as np
+
+class BaseEmbedder(ABC):
+    dimension: int
+
+    @abstractmethod
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               show_progress_bar: bool = False, convert_to_tensor: bool = False) -> np.ndarray:
+        """Embed one sentence (1-D result) or a list of sentences (2-D result)."""
+        pass
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size of the model and its caches."""
+        return 0
@@ -1,11 +1,77 @@
 import os
-from sentence_transformers import SentenceTransformer
+import threading
+import time
+from collections import OrderedDict
 from typing import TypedDict, List
 import numpy as np
 from src.core import vector_db
+from src.core.embedder_base import BaseEmbedder
+from src.utils import memory
+from src.utils.tracing import traced
 
-# Keep the global embedder instance
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+# Backend selection: "sentence-transformers" (default) or "hash" (deterministic, no model files)
+EMBEDDER_BACKEND = os.getenv("EMBEDDER_BACKEND", "sentence-transformers").lower()
+
+def create_embedder() -> BaseEmbedder:
+    if EMBEDDER_BACKEND == "hash":
+        from src.core.hash_embedder import HashEmbedder
+        return HashEmbedder(dimension=384)
+    if EMBEDDER_BACKEND in ("sentence-transformers", "sentence_transformers"):
+        from src.core.sentence_embedder import SentenceTransformerEmbedder
+        return SentenceTransformerEmbedder("all-MiniLM-L6-v2")
+    raise ValueError(f"Unknown EMBEDDER_BACKEND '{EMBEDDER_BACKEND}' (expected 'sentence-transformers' or 'hash')")
+
+# Global embedder, loaded on first use (or by the startup warm-up) rather than at import
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def get_embedder() -> BaseEmbedder:
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = create_embedder()
+    return _embedder
+
+def __getattr__(name):
+    # Backwards compatibility for `embeddings.embedder`
+    if name == "embedder":
+        return get_embedder()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Small LRU of question vectors: the answer cache lookup and retrieval embed the same question
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+_query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+def _query_cache_bytes() -> int:
+    with _query_cache_lock:
+        return sum(len(q) + v.nbytes for q, v in _query_cache.items())
+
+def _shrink_query_cache(fraction: float) -> None:
+    with _query_cache_lock:
+        for _ in range(int(len(_query_cache) * fraction + 0.999)):
+            _query_cache.popitem(last=False)
+
+memory.register("embedder", lambda: _embedder.memory_bytes() if _embedder is not None else 0,
+                lambda: {"backend": EMBEDDER_BACKEND, "loaded": _embedder is not None})
+memory.register("query_embedding_cache", _query_cache_bytes, lambda: {"entries": len(_query_cache), "max_entries": QUERY_CACHE_SIZE},
+                shrink=_shrink_query_cache, priority=20)
+
+@traced("embed.query")
+def embed_query(text: str) -> np.ndarray:
+    """Embed a single question, reusing recent vectors for identical text."""
+    with _query_cache_lock:
+        cached = _query_cache.get(text)
+        if cached is not None:
+            _query_cache.move_to_end(text)
+            return cached
+    vector = get_embedder().encode([text], convert_to_tensor=False)[0]
+    with _query_cache_lock:
+        _query_cache[text] = vector
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+    return vector
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
@@ -40,10 +106,17 @@ def build_embeddings(movie_name: str, tmdb_id: int, text: str) -> int:
         return 0
 
     # Create embeddings
+    from src.utils import metrics
+    start = time.perf_counter()
     print(f"Generating vectors for {len(chunks)} chunks in high-throughput mode...")
-    vectors = embedder.encode(chunks, batch_size=256, show_progress_bar=False, convert_to_tensor=False)
+    vectors = get_embedder().encode(chunks, batch_size=256, show_progress_bar=False, convert_to_tensor=False)
     
     # Save to ChromaDB
     vector_db.add_movie_vectors(tmdb_id, movie_name, chunks, vectors)
+
+    elapsed = time.perf_counter() - start
+    metrics.INGESTED_CHUNKS.inc(len(chunks))
+    metrics.INGESTION_SECONDS.observe(elapsed)
+    metrics.INGESTION_CHUNKS_PER_SECOND.set(len(chunks) / elapsed if elapsed > 0 else 0)
     
     return len(chunks)
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Deterministic offline chat model used when LLM_PROVIDER=fake.
+# Output depends only on the prompt, so benchmarks and tests are reproducible,
+# and latency is shaped by a configurable time-to-first-token and tokens/sec.
+_VOCABULARY = (
+    "the archive frame shadow protagonist reality dream memory light corridor signal "
+    "narrative subtext camera silence city machine choice identity time motif tension "
+    "reveals echoes fractures mirrors resolves frames suggests returns collapses"
+).split()
+
+
+class FakeChatModel(BaseChatModel):
+    model_name: str = "fake-chat"
+    temperature: float = 0.0
+    ttft_ms: float = 150.0
+    tokens_per_sec: float = 80.0
+    output_tokens: int = 120
+    template: str = "auto"  # auto | answer | summary | json | literal text with {words}
+
+    @classmethod
+    def from_env(cls) -> "FakeChatModel":
+        return cls(
+            ttft_ms=float(os.getenv("FAKE_LLM_TTFT_MS", "150")),
+            tokens_per_sec=float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", "80")),
+            output_tokens=int(os.getenv("FAKE_LLM_OUTPUT_TOKENS", "120")),
+            template=os.getenv("FAKE_LLM_TEMPLATE", "auto"),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name, "template": self.template}
+
+    # --- Output synthesis ---
+
+    @staticmethod
+    def _prompt_text(messages: List[BaseMessage]) -> str:
+        return "\n".join(str(m.content) for m in messages)
+
+    def _words(self, prompt: str, count: int) -> List[str]:
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16], 16)
+        rng = random.Random(seed)
+        return [rng.choice(_VOCABULARY) for _ in range(max(1, count))]
+
+    def _render(self, prompt: str) -> str:
+        template = self.template
+        if template == "auto":
+            if "ANSWER:" in prompt:
+                template = "answer"
+            elif "JSON" in prompt:
+                template = "json"
+            else:
+                template = "summary"
+
+        if template == "answer":
+            # Mirrors the two-phase protocol requested by PersonaManager
+            thought_words = self._words("thoughts:" + prompt, max(4, self.output_tokens // 4))
+            answer_words = self._words(prompt, self.output_tokens)
+            half = len(thought_words) // 2
+            return (
+                f"[INCIDENT_LOG]: {' '.join(thought_words[:half])}\n"
+                f"[FILM_SUBTEXT_OBSERVED]: {' '.join(thought_words[half:])}\n"
+                f"ANSWER: {' '.join(answer_words).capitalize()}."
+            )
+        if template == "json":
+            words = self._words(prompt, 9)
+            return json.dumps([
+                {"title": " ".join(words[i:i + 3]).title(), "description": f"An analysis of {' '.join(words[i:i + 3])}."}
+                for i in range(0, 9, 3)
+            ])
+        if template == "summary":
+            return " ".join(self._words(prompt, self.output_tokens)).capitalize() + "."
+        return template.replace("{words}", " ".join(self._words(prompt, self.output_tokens)))
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        # One token per word, keeping the trailing whitespace so chunks re-join exactly
+        tokens, current = [], ""
+        for ch in text:
+            current += ch
+            if ch.isspace():
+                tokens.append(current)
+                current = ""
+        if current:
+            tokens.append(current)
+        return tokens
+
+    def _usage(self, prompt: str, completion: str) -> dict:
+        input_tokens = len(prompt.split())
+        output_tokens = len(completion.split())
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _delays(self, count: int) -> Iterator[float]:
+        yield self.ttft_ms / 1000
+        gap = 1 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0
+        for _ in range(count - 1):
+            yield gap
+
+    # --- BaseChatModel hooks ---
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        prompt = self._prompt_text(messages)
+        text = self._render(prompt)
+        time.sleep(sum(self._delays(len(self._tokens(text)))))
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        prompt = self._prompt_text(messages)
+        text = self._render(prompt)
+        await asyncio.sleep(sum(self._delays(len(self._tokens(text)))))
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        prompt = self._prompt_text(messages)
+        text = self._render(prompt)
+        tokens = self._tokens(text)
+        for i, (token, delay) in enumerate(zip(tokens, self._delays(len(tokens)))):
+            time.sleep(delay)
+            usage = self._usage(prompt, text) if i == len(tokens) - 1 else None
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        prompt = self._prompt_text(messages)
+        text = self._render(prompt)
+        tokens = self._tokens(text)
+        for i, (token, delay) in enumerate(zip(tokens, self._delays(len(tokens)))):
+            await asyncio.sleep(delay)
+            usage = self._usage(prompt, text) if i == len(tokens) - 1 else None
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
@@ -0,0 +1,57 @@
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Tuple, Union
+import numpy as np
+from src.core.embedder_base import BaseEmbedder
+
+_WORD_RE = re.compile(r"\w+")
+# Rough CPython cost of one memoized word: the key plus two small numpy arrays (estimate)
+_FEATURE_ENTRY_BYTES = 400
+
+class HashEmbedder(BaseEmbedder):
+    """
+    Deterministic stand-in for the sentence-transformer: hashed word unigrams and
+    character trigrams folded into a fixed-size, L2-normalized vector.
+    Texts sharing vocabulary land close together, which is enough to exercise
+    ingestion, retrieval and ranking without model files.
+    """
+
+    def __init__(self, dimension: int = 384, ngram: int = 3):
+        self.dimension = dimension
+        self.ngram = ngram
+        # Per-instance memo: subtitle vocabularies are small and highly repetitive
+        self._word_features = lru_cache(maxsize=65536)(self._compute_word_features)
+
+    def _compute_word_features(self, word: str) -> Tuple[np.ndarray, np.ndarray]:
+        # Buckets and signs for one word (unigram + character n-grams)
+        padded = f"#{word}#"
+        features = [f"w:{word}"] + [f"c:{padded[i:i + self.ngram]}" for i in range(max(1, len(padded) - self.ngram + 1))]
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint64, count=len(features))
+        # Low bits pick the bucket, one high bit picks the sign (signed feature hashing)
+        buckets = (hashes % self.dimension).astype(np.intp)
+        signs = np.where((hashes >> np.uint64(31)) & np.uint64(1), -1.0, 1.0).astype(np.float32)
+        return buckets, signs
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        words = _WORD_RE.findall(text.lower())
+        if not words:
+            return vector
+        parts = [self._word_features(w) for w in words]
+        buckets = np.concatenate([p[0] for p in parts])
+        signs = np.concatenate([p[1] for p in parts])
+        np.add.at(vector, buckets, signs)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               show_progress_bar: bool = False, convert_to_tensor: bool = False) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self._embed_one(sentences)
+        if not sentences:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.vstack([self._embed_one(s) for s in sentences])
+
+    def memory_bytes(self) -> int:
+        return self._word_features.cache_info().currsize * _FEATURE_ENTRY_BYTES
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from sqlalchemy import func, select, union_all
+
+from src.models import sql_models
+
+# Startup hot-set preloading: ranks movies by recent chat/summary activity and loads the
+# top ones' corpus + BM25 index, vector segments and penalty maps before /readyz turns
+# green, so the first questions after a deploy cost the same as steady-state ones.
+WARMUP_HOT_SET_SIZE = int(os.getenv("WARMUP_HOT_SET_SIZE", "20"))
+WARMUP_LOOKBACK_HOURS = float(os.getenv("WARMUP_LOOKBACK_HOURS", "72"))
+WARMUP_MEMORY_BUDGET_MB = float(os.getenv("WARMUP_MEMORY_BUDGET_MB", "256"))
+
+_progress: Dict[str, object] = {"planned": 0, "loaded": 0, "skipped": 0, "bytes": 0, "budget_bytes": 0, "movies": []}
+
+
+def progress() -> dict:
+    return {**_progress, "movies": list(_progress["movies"])}
+
+
+async def plan_hot_set(db, limit: int = WARMUP_HOT_SET_SIZE, lookback_hours: float = WARMUP_LOOKBACK_HOURS) -> List[dict]:
+    """Top movies by chat messages + summaries in the lookback window, most active first."""
+    since = datetime.now(timezone.utc) - timedelta(hours=lookback_hours)
+    ch, sc, movie = sql_models.ChatHistory, sql_models.SummaryCache, sql_models.Movie
+    activity = union_all(
+        select(ch.movie_id.label("movie_id")).where(ch.created_at >= since),
+        select(sc.movie_id.label("movie_id")).where(sc.created_at >= since),
+    ).subquery()
+    score = func.count().label("score")
+    rows = (await db.execute(
+        select(movie.id, movie.tmdb_id, movie.title, score)
+        .join(activity, activity.c.movie_id == movie.id)
+        .where(movie.tmdb_id.is_not(None))
+        .group_by(movie.id, movie.tmdb_id, movie.title)
+        .order_by(score.desc(), movie.id)
+        .limit(limit)
+    )).all()
+    return [{"movie_id": r[0], "tmdb_id": r[1], "title": r[2], "score": r[3]} for r in rows]
+
+
+def _warm_vectors(tmdb_id: int, title: str) -> None:
+    from src.core import vector_db
+    from src.core.embeddings import embed_query
+    # One query pages in the collection's HNSW segments for this movie's filter path
+    vector_db.search_movie(tmdb_id, embed_query(title), n_results=1)
+
+
+async def preload(session_factory=None, limit: int = WARMUP_HOT_SET_SIZE,
+                  budget_mb: float = WARMUP_MEMORY_BUDGET_MB) -> dict:
+    """Plans and preloads the hot set. Stops once the BM25 cache reaches the memory budget."""
+    from src.core.retrieval_cache import bm25_cache, get_penalties, load_corpus
+    from src.utils.logger import logger
+    if session_factory is None:
+        from src.db.database import AsyncSessionLocal as session_factory
+
+    budget = int(budget_mb * 1024 * 1024)
+    async with session_factory() as db:
+        plan = await plan_hot_set(db, limit)
+        _progress.update(planned=len(plan), loaded=0, skipped=0, bytes=bm25_cache.total_bytes(), budget_bytes=budget, movies=[])
+        start = time.perf_counter()
+        for item in plan:
+            if bm25_cache.total_bytes() >= budget:
+                _progress["skipped"] = len(plan) - _progress["loaded"]
+                logger.worker(f"Hot-set preload stopped at the {budget_mb:.0f}MB budget")
+                break
+            try:
+                corpus = await asyncio.to_thread(load_corpus, item["tmdb_id"])
+                if corpus is None:
+                    _progress["skipped"] += 1
+                    continue
+                await asyncio.to_thread(_warm_vectors, item["tmdb_id"], item["title"])
+                await get_penalties(db, item["movie_id"])
+            except Exception as e:
+                _progress["skipped"] += 1
+                logger.error(f"Hot-set preload failed for {item['title']}: {e}")
+                continue
+            _progress["loaded"] += 1
+            _progress["bytes"] = bm25_cache.total_bytes()
+            _progress["movies"].append(item["tmdb_id"])
+    logger.worker(f"Hot-set preloaded {_progress['loaded']}/{len(plan)} movies "
+                  f"({_progress['bytes'] / 1e6:.1f}MB) in {time.perf_counter() - start:.2f}s")
+    return progress()
@@ -0,0 +1,202 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from src.models import sql_models
+from src.utils import memory
+
+# Read-through cache of Movie (tmdb_id / title) and User (clerk_id) identities.
+# Holds small immutable snapshots rather than ORM objects, so entries can be shared
+# across sessions, RAG nodes and routers. Any ORM write to a Movie or User row
+# invalidates its entries (mapper events + after_commit); TTL bounds staleness otherwise.
+IDENTITY_CACHE_ENABLED = os.getenv("IDENTITY_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+IDENTITY_CACHE_TTL_SECONDS = float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "300"))
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "4096"))
+# Rough CPython cost of one entry (estimate): key tuple, expiry tuple and a small frozen dataclass
+_ENTRY_BYTES = 350
+
+
+@dataclass(frozen=True)
+class MovieIdentity:
+    id: int
+    tmdb_id: Optional[int]
+    title: str
+    status: Optional[str]
+
+    @classmethod
+    def from_row(cls, movie: "sql_models.Movie") -> "MovieIdentity":
+        status = movie.status.value if hasattr(movie.status, "value") else movie.status
+        return cls(id=movie.id, tmdb_id=movie.tmdb_id, title=movie.title, status=status)
+
+
+@dataclass(frozen=True)
+class UserIdentity:
+    id: int
+    clerk_id: str
+
+
+class IdentityCache:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (expires_at, identity)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, key: tuple):
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._entries[key]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return item[1]
+
+    def put(self, key: tuple, identity) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, identity)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put_movie(self, identity: MovieIdentity) -> None:
+        if identity.tmdb_id is not None:
+            self.put(("movie_tmdb", identity.tmdb_id), identity)
+        self.put(("movie_title", identity.title), identity)
+
+    def invalidate(self, kind: str, row_id: int) -> None:
+        """Drops every entry of this kind ("movie" / "user") that points at row_id."""
+        with self._lock:
+            stale = [k for k, (_, ident) in self._entries.items() if k[0].startswith(kind) and ident.id == row_id]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def shrink(self, fraction: float) -> None:
+        with self._lock:
+            for _ in range(int(len(self._entries) * fraction + 0.999)):
+                self._entries.popitem(last=False)
+
+    def nbytes(self) -> int:
+        return len(self._entries) * _ENTRY_BYTES
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {**self._stats, "entries": len(self._entries), "hit_rate": (self._stats["hits"] / lookups) if lookups else 0.0}
+
+
+identity_cache = IdentityCache(IDENTITY_CACHE_TTL_SECONDS, IDENTITY_CACHE_MAX_ENTRIES)
+memory.register("identity_cache", identity_cache.nbytes, identity_cache.stats, shrink=identity_cache.shrink, priority=50)
+
+
+# --- Resolvers (sync Session / AsyncSession) ---
+
+def _movie_query(tmdb_id: Optional[int], title: Optional[str]):
+    Movie = sql_models.Movie
+    if tmdb_id is not None:
+        return select(Movie).where(Movie.tmdb_id == tmdb_id)
+    return select(Movie).where(Movie.title == title)
+
+
+def _cached_movie(tmdb_id: Optional[int], title: Optional[str]) -> Optional[MovieIdentity]:
+    if not IDENTITY_CACHE_ENABLED:
+        return None
+    return identity_cache.get(("movie_tmdb", tmdb_id) if tmdb_id is not None else ("movie_title", title))
+
+
+def resolve_movie(db: Session, tmdb_id: Optional[int] = None, title: Optional[str] = None) -> Optional[MovieIdentity]:
+    """Movie identity by tmdb_id (preferred) or title; None when no such row exists."""
+    if tmdb_id is None and title is None:
+        return None
+    cached = _cached_movie(tmdb_id, title)
+    if cached is not None:
+        return cached
+    movie = db.execute(_movie_query(tmdb_id, title)).scalars().first()
+    return _remember_movie(movie)
+
+
+async def resolve_movie_async(db, tmdb_id: Optional[int] = None, title: Optional[str] = None) -> Optional[MovieIdentity]:
+    if tmdb_id is None and title is None:
+        return None
+    cached = _cached_movie(tmdb_id, title)
+    if cached is not None:
+        return cached
+    movie = (await db.execute(_movie_query(tmdb_id, title))).scalars().first()
+    return _remember_movie(movie)
+
+
+def _remember_movie(movie) -> Optional[MovieIdentity]:
+    if movie is None:
+        return None
+    identity = MovieIdentity.from_row(movie)
+    if IDENTITY_CACHE_ENABLED:
+        identity_cache.put_movie(identity)
+    return identity
+
+
+def resolve_user(db: Session, clerk_id: Optional[str]) -> Optional[UserIdentity]:
+    """User identity by clerk_id; None when not signed in or unknown."""
+    if not clerk_id:
+        return None
+    cached = identity_cache.get(("user_clerk", clerk_id)) if IDENTITY_CACHE_ENABLED else None
+    if cached is not None:
+        return cached
+    user = db.execute(select(sql_models.User).where(sql_models.User.clerk_id == clerk_id)).scalars().first()
+    return _remember_user(user)
+
+
+async def resolve_user_async(db, clerk_id: Optional[str]) -> Optional[UserIdentity]:
+    if not clerk_id:
+        return None
+    cached = identity_cache.get(("user_clerk", clerk_id)) if IDENTITY_CACHE_ENABLED else None
+    if cached is not None:
+        return cached
+    user = (await db.execute(select(sql_models.User).where(sql_models.User.clerk_id == clerk_id))).scalars().first()
+    return _remember_user(user)
+
+
+def _remember_user(user) -> Optional[UserIdentity]:
+    if user is None:
+        return None
+    identity = UserIdentity(id=user.id, clerk_id=user.clerk_id)
+    if IDENTITY_CACHE_ENABLED:
+        identity_cache.put(("user_clerk", identity.clerk_id), identity)
+    return identity
+
+
+# --- Invalidation on ORM writes ---
+
+def _on_write(kind: str):
+    def handler(mapper, connection, target):
+        identity_cache.invalidate(kind, target.id)
+        # Invalidate again once the transaction commits, in case a reader re-cached the old row meanwhile
+        session = Session.object_session(target)
+        if session is not None:
+            session.info.setdefault("identity_invalidations", set()).add((kind, target.id))
+    return handler
+
+
+for _model, _kind in ((sql_models.Movie, "movie"), (sql_models.User, "user")):
+    event.listen(_model, "after_update", _on_write(_kind))
+    event.listen(_model, "after_delete", _on_write(_kind))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for kind, row_id in session.info.pop("identity_invalidations", ()):
+        identity_cache.invalidate(kind, row_id)
@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import AsyncIterator, Callable, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+
+from src.utils import metrics, tracing
+
+# Content-addressed cache for deterministic LLM prompts (summary chunks, research lookups).
+# Completions are stored as the list of streamed tokens so a hit can be replayed as a stream.
+# Empty completions, and ones the caller's validate() rejects, are returned but never stored.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CACHE_PATH = os.path.join(BASE_DIR, "data", "llm_cache.db")
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+
+class CompletionCache:
+    def __init__(self, path: str, ttl_seconds: int, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use so importing the module never touches the disk
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_completions (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    temperature REAL,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_completions_last_access ON llm_completions (last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(messages: Sequence[BaseMessage], model: Optional[str], temperature: Optional[float]) -> str:
+        """Hash of the prompt plus the sampling parameters that affect the completion."""
+        material = json.dumps({
+            "model": model,
+            "temperature": temperature,
+            "messages": [[m.type, m.content] for m in messages],
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Returns the cached token list, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT payload, created_at FROM llm_completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            payload, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_completions WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE llm_completions SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            conn.commit()
+        return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+    def put(self, key: str, model: Optional[str], temperature: Optional[float], tokens: List[str]) -> None:
+        payload = zlib.compress(json.dumps(tokens, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_completions (key, model, temperature, payload, size, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, model, temperature, payload, len(payload), now, now)
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        # 1. Drop expired entries, 2. trim least-recently-used entries until under the size cap
+        conn.execute("DELETE FROM llm_completions WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_completions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in conn.execute("SELECT key, size FROM llm_completions ORDER BY last_access ASC"):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM llm_completions WHERE key = ?", stale_keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM llm_completions")
+            conn.commit()
+
+
+completion_cache = CompletionCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES)
+
+
+def _llm_identity(llm) -> tuple:
+    from src.db.llm_usage import llm_model_name
+    return llm_model_name(llm), getattr(llm, "temperature", None)
+
+
+def _record_usage(call_site: str, llm, messages: Sequence[BaseMessage], completion: str, usage=None, cached: bool = False) -> None:
+    """Token counters and an llm_usage row; provider usage when reported, local counts otherwise."""
+    from src.db.llm_usage import record_llm_call
+    record_llm_call(call_site, messages, completion, usage=usage, model=_llm_identity(llm)[0], cached=cached)
+
+
+def _record_lookup(hit: bool) -> None:
+    metrics.CACHE_REQUESTS.inc(cache="llm_completion", result="hit" if hit else "miss")
+
+
+def _cacheable(completion: str, validate: Optional[Callable[[str], bool]]) -> bool:
+    if not completion.strip():
+        return False
+    try:
+        return validate is None or bool(validate(completion))
+    except Exception:
+        return False
+
+
+async def cached_ainvoke(llm, messages: Sequence[BaseMessage], call_site: str = "llm",
+                         validate: Optional[Callable[[str], bool]] = None) -> str:
+    """ainvoke() through the completion cache. Returns the completion text."""
+    if not LLM_CACHE_ENABLED:
+        with tracing.span("llm.invoke", call_site=call_site):
+            response = await llm.ainvoke(messages)
+        _record_usage(call_site, llm, messages, response.content, getattr(response, "usage_metadata", None))
+        return response.content
+
+    model, temperature = _llm_identity(llm)
+    key = CompletionCache.make_key(messages, model, temperature)
+    tokens = await asyncio.to_thread(completion_cache.get, key)
+    _record_lookup(tokens is not None)
+    if tokens is not None:
+        _record_usage(call_site, llm, messages, "".join(tokens), cached=True)
+        return "".join(tokens)
+
+    with tracing.span("llm.invoke", call_site=call_site):
+        response = await llm.ainvoke(messages)
+    _record_usage(call_site, llm, messages, response.content, getattr(response, "usage_metadata", None))
+    if _cacheable(response.content, validate):
+        await asyncio.to_thread(completion_cache.put, key, model, temperature, [response.content])
+    return response.content
+
+
+def cached_invoke(llm, messages: Sequence[BaseMessage], call_site: str = "llm",
+                  validate: Optional[Callable[[str], bool]] = None) -> str:
+    """Blocking invoke() through the completion cache, for sync call sites."""
+    if not LLM_CACHE_ENABLED:
+        with tracing.span("llm.invoke", call_site=call_site):
+            response = llm.invoke(messages)
+        _record_usage(call_site, llm, messages, response.content, getattr(response, "usage_metadata", None))
+        return response.content
+
+    model, temperature = _llm_identity(llm)
+    key = CompletionCache.make_key(messages, model, temperature)
+    tokens = completion_cache.get(key)
+    _record_lookup(tokens is not None)
+    if tokens is not None:
+        _record_usage(call_site, llm, messages, "".join(tokens), cached=True)
+        return "".join(tokens)
+
+    with tracing.span("llm.invoke", call_site=call_site):
+        response = llm.invoke(messages)
+    _record_usage(call_site, llm, messages, response.content, getattr(response, "usage_metadata", None))
+    if _cacheable(response.content, validate):
+        completion_cache.put(key, model, temperature, [response.content])
+    return response.content
+
+
+async def cached_astream(llm, messages: Sequence[BaseMessage], call_site: str = "llm",
+                         validate: Optional[Callable[[str], bool]] = None) -> AsyncIterator[str]:
+    """
+    astream() through the completion cache.
+    A hit replays the recorded tokens immediately; a miss streams from the LLM
+    and records the tokens once the stream completes.
+    """
+    # Spans in an async generator are opened/closed manually: its context may change between yields
+    if not LLM_CACHE_ENABLED:
+        streamed = []
+        usage = None
+        span = tracing.start_span("llm.stream", call_site=call_site)
+        try:
+            async for chunk in llm.astream(messages):
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                if chunk.content:
+                    streamed.append(chunk.content)
+                    yield chunk.content
+        except BaseException as e:
+            # Provider errors and early closes (client disconnect) still end the span
+            tracing.end_span(span, error=e)
+            raise
+        else:
+            tracing.end_span(span)
+        _record_usage(call_site, llm, messages, "".join(streamed), usage)
+        return
+
+    model, temperature = _llm_identity(llm)
+    key = CompletionCache.make_key(messages, model, temperature)
+    tokens = await asyncio.to_thread(completion_cache.get, key)
+    _record_lookup(tokens is not None)
+    if tokens is not None:
+        _record_usage(call_site, llm, messages, "".join(tokens), cached=True)
+        for token in tokens:
+            yield token
+        return
+
+    recorded = []
+    usage = None
+    span = tracing.start_span("llm.stream", call_site=call_site)
+    try:
+        async for chunk in llm.astream(messages):
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if chunk.content:
+                recorded.append(chunk.content)
+                yield chunk.content
+    except BaseException as e:
+        tracing.end_span(span, error=e)
+        raise
+    else:
+        tracing.end_span(span)
+    # Only reached when the stream ran to completion, so partial answers are never cached
+    _record_usage(call_site, llm, messages, "".join(recorded), usage)
+    if _cacheable("".join(recorded), validate):
+        await asyncio.to_thread(completion_cache.put, key, model, temperature, recorded)
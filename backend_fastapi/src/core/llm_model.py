@@ -1,18 +1,47 @@
 import os
+import threading
 from typing import TypedDict, List, AsyncIterator
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage
+from src.core.llm_cache import cached_ainvoke, cached_astream
 
 load_dotenv()
 
-llm = ChatGroq(
-    model='llama-3.1-8b-instant',
-    api_key=os.getenv('GROQ_KEY'),
-    temperature=0.6,
-    streaming=True,
-)
+# Provider selection: "groq" (default) or "fake" (deterministic offline model for tests/benchmarks)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq").lower()
+
+def create_llm():
+    if LLM_PROVIDER == "fake":
+        from src.core.fake_llm import FakeChatModel
+        return FakeChatModel.from_env()
+    if LLM_PROVIDER == "groq":
+        from langchain_groq import ChatGroq
+        return ChatGroq(
+            model='llama-3.1-8b-instant',
+            api_key=os.getenv('GROQ_KEY'),
+            temperature=0.6,
+            streaming=True,
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}' (expected 'groq' or 'fake')")
+
+# Built on first use (or by the startup warm-up) so importing the app never constructs a client
+_llm = None
+_llm_lock = threading.Lock()
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = create_llm()
+    return _llm
+
+def __getattr__(name):
+    # Backwards compatibility for `llm_model.llm`
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class SummaryState(TypedDict):
     text: str
@@ -65,9 +94,9 @@ async def summarize_chunk(state: SummaryState) -> SummaryState:
 {chunk}"""
     
     messages = [HumanMessage(content=prompt)]
-    response = await llm.ainvoke(messages)
+    content = await cached_ainvoke(get_llm(), messages, call_site="summary_chunk")
     
-    summaries = state["summaries"] + [response.content]
+    summaries = state["summaries"] + [content]
     
     return {
         **state,
@@ -127,10 +156,9 @@ async def generate_summary_stream(text: str) -> AsyncIterator[str]:
         
         messages = [HumanMessage(content=prompt)]
         
-        # stream tokens from llm
-        async for token in llm.astream(messages):
-            if hasattr(token, 'content'):
-                yield token.content
+        # stream tokens from llm (replayed from the completion cache on re-ingestion)
+        async for token in cached_astream(get_llm(), messages, call_site="summary_stream"):
+            yield token
         
         # space between chunks
         if i < len(chunks) - 1:
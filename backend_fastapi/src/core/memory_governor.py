@@ -0,0 +1,217 @@
+import asyncio
+import gc
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from src.utils import memory, metrics
+
+# Memory-pressure governor. Samples process RSS every MEMORY_GOVERNOR_INTERVAL_SECONDS and
+# compares it with watermarks of the memory limit (container cgroup limit or physical RAM
+# unless MEMORY_LIMIT_MB is set):
+#   soft: shrink one registered cache at a time, in priority order (BM25/corpus first), at
+#         most every MEMORY_SHED_COOLDOWN_SECONDS, and pause ingestion workers before they
+#         download or embed;
+#   hard: clear every shrinkable cache and reject new ingestion jobs with 503.
+# A pressure episode lasts until RSS drops below the (lower) resume watermark, and each cache
+# is shrunk at most once per episode: CPython rarely hands freed memory back to the OS, so
+# RSS alone can't tell whether shedding worked. Once nothing is left to shed, soft pressure
+# stops holding ingestion back; only the hard watermark still rejects it.
+MEMORY_GOVERNOR_ENABLED = os.getenv("MEMORY_GOVERNOR_ENABLED", "true").lower() not in ("0", "false", "no")
+MEMORY_LIMIT_MB = float(os.getenv("MEMORY_LIMIT_MB", "0"))
+MEMORY_SOFT_WATERMARK = float(os.getenv("MEMORY_SOFT_WATERMARK", "0.75"))
+MEMORY_HARD_WATERMARK = float(os.getenv("MEMORY_HARD_WATERMARK", "0.9"))
+MEMORY_RESUME_WATERMARK = float(os.getenv("MEMORY_RESUME_WATERMARK", "0.65"))
+MEMORY_SHED_COOLDOWN_SECONDS = float(os.getenv("MEMORY_SHED_COOLDOWN_SECONDS", "30"))
+MEMORY_GOVERNOR_INTERVAL_SECONDS = float(os.getenv("MEMORY_GOVERNOR_INTERVAL_SECONDS", "2"))
+MEMORY_SOFT_SHRINK_FRACTION = float(os.getenv("MEMORY_SOFT_SHRINK_FRACTION", "0.5"))
+INGESTION_PAUSE_MAX_SECONDS = float(os.getenv("INGESTION_PAUSE_MAX_SECONDS", "600"))
+
+LEVELS = {"ok": 0, "soft": 1, "hard": 2}
+
+MEMORY_PRESSURE_LEVEL = metrics.registry.register(metrics.Gauge(
+    "filmsuma_memory_pressure_level", "Memory governor level: 0 ok, 1 soft watermark, 2 hard watermark."))
+MEMORY_SHED_EVENTS = metrics.registry.register(metrics.Counter(
+    "filmsuma_memory_shed_events_total", "Cache shrink operations triggered by memory pressure.", ("component", "level")))
+MEMORY_SHED_BYTES = metrics.registry.register(metrics.Counter(
+    "filmsuma_memory_shed_bytes_total", "Estimated bytes released by memory-pressure shedding.", ("component",)))
+INGESTION_REJECTED = metrics.registry.register(metrics.Counter(
+    "filmsuma_ingestion_rejected_total", "Ingestion jobs rejected above the hard memory watermark."))
+INGESTION_PAUSED_SECONDS = metrics.registry.register(metrics.Counter(
+    "filmsuma_ingestion_paused_seconds_total", "Time ingestion workers spent waiting for memory pressure to clear."))
+
+
+def detect_memory_limit() -> int:
+    """MEMORY_LIMIT_MB, else the cgroup (v2, then v1) limit, capped by physical RAM."""
+    if MEMORY_LIMIT_MB > 0:
+        return int(MEMORY_LIMIT_MB * 1024 * 1024)
+    import psutil
+    limit = psutil.virtual_memory().total
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit():
+            limit = min(limit, int(value))  # "max" or a huge v1 sentinel mean unlimited
+        break
+    return limit
+
+
+class MemoryGovernor:
+    def __init__(self, limit_bytes: int, soft: float = MEMORY_SOFT_WATERMARK, hard: float = MEMORY_HARD_WATERMARK,
+                 resume: float = MEMORY_RESUME_WATERMARK, cooldown_seconds: float = MEMORY_SHED_COOLDOWN_SECONDS,
+                 rss: Callable[[], int] = memory.rss_bytes):
+        self.limit_bytes = limit_bytes
+        self.soft_bytes = int(limit_bytes * soft)
+        self.hard_bytes = int(limit_bytes * hard)
+        self.resume_bytes = int(limit_bytes * min(resume, soft))
+        self.cooldown_seconds = cooldown_seconds
+        self._rss = rss
+        self.level = "ok"
+        self.last_rss = 0
+        # Per pressure episode: caches already shrunk / cleared, and when the last soft shrink ran
+        self._shrunk = set()
+        self._cleared = set()
+        self._last_shed = float("-inf")
+        self._ingestion_open = threading.Event()
+        self._ingestion_open.set()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"soft_events": 0, "hard_events": 0, "rejected_ingestions": 0}
+
+    def check(self) -> str:
+        """One governor tick: sample RSS, shed caches and gate ingestion. Blocking."""
+        rss = self.last_rss = self._rss()
+        if rss >= self.hard_bytes:
+            level = "hard"
+        elif rss >= self.soft_bytes or (self.level != "ok" and rss >= self.resume_bytes):
+            level = "soft"
+        else:
+            level = "ok"
+        if level != self.level:
+            from src.utils.logger import logger
+            logger.worker(f"Memory pressure {self.level} -> {level}", rss_mb=round(rss / 2**20, 1),
+                          soft_mb=round(self.soft_bytes / 2**20, 1), hard_mb=round(self.hard_bytes / 2**20, 1))
+            # Events count entries into pressure, not ticks spent there; easing hard -> soft isn't a new one
+            if level == "hard" or (level == "soft" and self.level == "ok"):
+                self._stats[f"{level}_events"] += 1
+        self.level = level
+        MEMORY_PRESSURE_LEVEL.set(LEVELS[level])
+
+        if level == "ok":
+            self._shrunk.clear()
+            self._cleared.clear()
+            self._last_shed = float("-inf")
+            self._ingestion_open.set()
+            return level
+        shed = False
+        if level == "hard":
+            self._ingestion_open.clear()
+            for component in memory.shrinkable():
+                if component.name not in self._cleared:
+                    self._shed(component, 1.0, level)
+                    self._cleared.add(component.name)
+                    self._shrunk.add(component.name)
+                    shed = True
+        else:
+            pending = [c for c in memory.shrinkable() if c.name not in self._shrunk]
+            now = time.monotonic()
+            if pending and now - self._last_shed >= self.cooldown_seconds:
+                # One cache per cooldown so the cheapest-to-rebuild ones go first
+                component = pending.pop(0)
+                self._shed(component, MEMORY_SOFT_SHRINK_FRACTION, level)
+                self._shrunk.add(component.name)
+                self._last_shed = now
+                shed = True
+            if pending:
+                self._ingestion_open.clear()
+            else:
+                self._ingestion_open.set()
+        if shed:
+            gc.collect()
+        return level
+
+    def _shed(self, component, fraction: float, level: str) -> None:
+        before = component.estimate()
+        try:
+            component.shrink(fraction)
+        except Exception as e:
+            from src.utils.logger import logger
+            logger.error(f"Shrinking {component.name} failed: {e}")
+            return
+        freed = max(0, before - component.estimate())
+        MEMORY_SHED_EVENTS.inc(component=component.name, level=level)
+        MEMORY_SHED_BYTES.inc(freed, component=component.name)
+
+    # --- Ingestion gate ---
+
+    def accepting_ingestion(self) -> bool:
+        """False above the hard watermark; callers reject new jobs (and count them)."""
+        if self.level == "hard":
+            self._stats["rejected_ingestions"] += 1
+            INGESTION_REJECTED.inc()
+            return False
+        return True
+
+    def wait_for_ingestion(self, timeout: float = INGESTION_PAUSE_MAX_SECONDS) -> bool:
+        """Blocks an ingestion worker while memory pressure lasts; False if it never cleared."""
+        if self._ingestion_open.is_set():
+            return True
+        start = time.perf_counter()
+        cleared = self._ingestion_open.wait(timeout)
+        INGESTION_PAUSED_SECONDS.inc(time.perf_counter() - start)
+        return cleared
+
+    # --- Background loop ---
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.check)
+            except Exception as e:
+                from src.utils.logger import logger
+                logger.error(f"Memory governor tick failed: {e}")
+            await asyncio.sleep(MEMORY_GOVERNOR_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._ingestion_open.set()
+
+    def status(self) -> dict:
+        return {
+            "enabled": MEMORY_GOVERNOR_ENABLED,
+            "level": self.level,
+            "rss_bytes": self.last_rss,
+            "limit_bytes": self.limit_bytes,
+            "soft_bytes": self.soft_bytes,
+            "hard_bytes": self.hard_bytes,
+            "resume_bytes": self.resume_bytes,
+            "shrunk_this_episode": sorted(self._shrunk),
+            "ingestion_paused": not self._ingestion_open.is_set(),
+            **self._stats,
+        }
+
+
+_governor: Optional[MemoryGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> MemoryGovernor:
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = MemoryGovernor(detect_memory_limit())
+    return _governor
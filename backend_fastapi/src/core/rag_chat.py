@@ -1,3 +1,4 @@
+import logging
 import numpy as np
 import os
 import time
@@ -5,24 +6,45 @@ from typing import TypedDict, List, AsyncIterator, Annotated, Sequence, Dict, Op
 from langgraph.graph import StateGraph, END, MessagesState
 from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from src.core.embeddings import embedder
+from src.core.embeddings import embed_query
 from src.core import vector_db
-from src.core.llm_model import llm
-from rank_bm25 import BM25Okapi
-import nltk
+from src.core.llm_model import get_llm
+from src.core.answer_cache import answer_cache, ANSWER_CACHE_ENABLED
+from src.core.retrieval_cache import bm25_cache, get_penalties, load_corpus
+from src.core.retrieval_budget import record_degradation, stage_pool, within_budget
+from src.utils import metrics, tracing
 import re
 import json
 
-# Download punkt for tokenization
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
+_FALLBACK_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_word_tokenize = None # Set by load_punkt(); None means "not loaded yet"
 
-from nltk.tokenize import word_tokenize
+def load_punkt(download: bool = True) -> bool:
+    """Loads NLTK punkt (NLTK >= 3.9 resolves word_tokenize through punkt_tab), downloading it
+    if allowed. Run by the startup warm-up so requests never wait on the network."""
+    global _word_tokenize
+    import nltk
+    for resource in ('punkt', 'punkt_tab'):
+        try:
+            nltk.data.find(f'tokenizers/{resource}')
+        except LookupError:
+            if download:
+                nltk.download(resource, quiet=True)
+    from nltk.tokenize import word_tokenize
+    _word_tokenize = word_tokenize
+    return True
 
-# Global cache for pre-tokenized corpora (Keyed by tmdb_id)
-BM25_CACHE = {}
+def tokenize(text: str) -> List[str]:
+    """word_tokenize, or a regex equivalent when the punkt data could not be downloaded (offline hosts)."""
+    if _word_tokenize is None:
+        load_punkt(download=False)
+    try:
+        return _word_tokenize(text)
+    except LookupError:
+        return _FALLBACK_TOKEN_RE.findall(text)
+
+# Global cache of corpora + BM25 indexes (keyed by tmdb_id, bounded by BM25_CACHE_MAX_MB)
+BM25_CACHE = bm25_cache
 
 # Define RAG State
 class RAGState(MessagesState):
@@ -32,16 +54,26 @@ class RAGState(MessagesState):
     relevant_ids: List[str]
     relevant_sources: List[Dict[str, str]] # List of {"id": cid, "text": text}
     context: str
+    degradations: List[Dict[str, Any]] # Stages dropped for missing their time budget this turn
 
 # Persistent Checkpointer Path
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "checkpoints.db")
+DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "checkpoints.db"))
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
 async def retrieve_context_node(state: RAGState) -> dict:
+    with tracing.span("rag.retrieve", tmdb_ids=",".join(str(t) for t in state["tmdb_ids"])) as span:
+        result = await _retrieve_context(state)
+        if span is not None and result["degradations"]:
+            span.attributes["degradations"] = ",".join(f"{d['stage']}:{d['tmdb_id']}" for d in result["degradations"])
+        return result
+
+async def _retrieve_context(state: RAGState) -> dict:
     tmdb_ids = state["tmdb_ids"]
     question = state.get("question") or state["messages"][-1].content
+    labels = {"endpoint": metrics.endpoint_label.get(), "persona": state.get("persona", "critic")}
     
-    query_vector = embedder.encode([question], convert_to_tensor=False)[0]
+    with metrics.RAG_STAGE_SECONDS.time(stage="embed", **labels):
+        query_vector = embed_query(question)
     k_per_movie = 10 if len(tmdb_ids) == 1 else 6 
     
     all_relevant_chunks = []
@@ -49,52 +81,60 @@ async def retrieve_context_node(state: RAGState) -> dict:
     # Explicitly reset sources for the current turn to avoid accumulation from state memory
     current_sources = []
     
-    from src.db.database import SessionLocal
-    from src.models.sql_models import Feedback, ChatHistory, SummaryCache, SummaryType, Movie
-    db = SessionLocal()
+    from src.db.database import AsyncSessionLocal
+    from src.core.identity_cache import resolve_movie_async
     
     from src.utils.logger import logger
     start_time = time.time()
+    degradations = []
     
-    try:
+    async with AsyncSessionLocal() as db:
         for tid in tmdb_ids:
             # 1. Fetch movie details for titles and active learning
-            movie_record = db.query(Movie).filter(Movie.tmdb_id == tid).first()
+            movie_record = await resolve_movie_async(db, tmdb_id=tid)
             movie_name = movie_record.title if movie_record else f"ID:{tid}"
             
-            logger.rag(f"Starting lookup for '{movie_name}' (TMDB:{tid})")
+            logger.rag(f"Starting lookup for '{movie_name}'", level=logging.DEBUG, tmdb_id=tid)
             
-            # 2. Vector Search
-            v_start = time.time()
-            vector_results = vector_db.search_movie(tid, query_vector, n_results=k_per_movie * 2)
-            logger.rag(f"Vector search found {len(vector_results)} chunks (Time: {time.time() - v_start:.3f}s)")
-            
-            # 3. Hybrid / BM25
-            bm_start = time.time()
-            all_docs_data = vector_db.get_movie_data(tid)
-            
-            if not all_docs_data:
+            # 2./3. Vector search and BM25 run side by side off the event loop, each against its own budget
+            if tid not in BM25_CACHE:
+                logger.rag(f"Tokenizing corpus for {movie_name} (first-time optimization)...", level=logging.DEBUG, tmdb_id=tid)
+            stages_start = time.perf_counter()
+            vector_job = stage_pool.submit(_vector_search, tid, query_vector, k_per_movie * 2, labels)
+            bm25_job = stage_pool.submit(_bm25_search, tid, question, k_per_movie * 2, labels)
+            vector_ok, vector_results = await within_budget("vector_search", vector_job, started=stages_start)
+            bm25_ok, bm25_results = await within_budget("bm25", bm25_job, started=stages_start)
+            # Neither ranker delivered (or a late vector search had no corpus to fall back on)
+            stranded = not vector_ok and (not bm25_ok or bm25_results is None)
+            fallback = "no_context" if stranded else None
+            if not vector_ok:
+                record_degradation(degradations, "vector_search", tid, reason="saturated" if vector_job is None else "timeout",
+                                   fallback=fallback)
+                vector_results = []
+            if not bm25_ok:
+                record_degradation(degradations, "bm25", tid, reason="saturated" if bm25_job is None else "timeout",
+                                   fallback=fallback)
+                bm25_results = []
+            if stranded:
+                logger.rag(f"No retrieval results in time for '{movie_name}'; it adds no context to this answer",
+                           level=logging.WARNING, tmdb_id=tid)
+                continue
+            if bm25_results is None:
+                # No corpus on disk: vector hits only
                 all_relevant_chunks.extend([v["text"] for v in vector_results[:k_per_movie]])
                 all_relevant_ids.extend([v["id"] for v in vector_results[:k_per_movie]])
                 continue
-
-            # Check cache for tokenized corpus (Keyed by tmdb_id)
-            tid_key = str(tid)
-            if tid_key not in BM25_CACHE:
-                logger.rag(f"Tokenizing corpus for {movie_name} (first-time optimization)...")
-                BM25_CACHE[tid_key] = [word_tokenize(doc["text"].lower()) for doc in all_docs_data]
-            
-            tokenized_corpus = BM25_CACHE[tid_key]
-            bm25 = BM25Okapi(tokenized_corpus)
-            tokenized_query = word_tokenize(question.lower())
-            bm25_indices = bm25.get_top_n(tokenized_query, range(len(all_docs_data)), n=k_per_movie * 2)
-            bm25_results = [all_docs_data[i] for i in bm25_indices]
-            logger.rag(f"BM25 ranker finished in {time.time() - bm_start:.3f}s")
             
-            from src.core.active_learning import get_discredited_chunks, apply_penalties
-            penalties = get_discredited_chunks(db, movie_record.id) if movie_record else {}
+            from src.core.active_learning import apply_penalties
+            penalties = {}
+            if movie_record:
+                penalties_ok, penalties = await within_budget("penalties", _load_penalties(movie_record.id, labels))
+                if not penalties_ok:
+                    record_degradation(degradations, "penalties", tid)
+                    penalties = {}
             if penalties:
-                logger.active_learning(f"Applying penalties to {len(penalties)} discredited fragments.")
+                logger.active_learning(f"Applying penalties to {len(penalties)} discredited fragments.", level=logging.DEBUG,
+                                       tmdb_id=tid, penalized=len(penalties))
 
             ranks = {}
             id_to_text = {}
@@ -123,40 +163,85 @@ async def retrieve_context_node(state: RAGState) -> dict:
                 })
 
             if movie_record:
-                research_summary = db.query(SummaryCache).filter(
-                    SummaryCache.movie_id == movie_record.id,
-                    SummaryCache.summary_type == "video_essay"
-                ).first()
-                if research_summary:
-                    logger.rag(f"Injecting external research dossier for {movie_name}")
+                research_ok, research_summary = await within_budget("research", _load_research(movie_record.id, labels))
+                if not research_ok:
+                    record_degradation(degradations, "research", tid)
+                elif research_summary:
+                    logger.rag(f"Injecting external research dossier for {movie_name}", level=logging.DEBUG, tmdb_id=tid)
                     all_relevant_chunks.append(f"\n--- EXTERNAL RESEARCH: {movie_name} ---\n{research_summary.content}")
-    finally:
-        db.close()
 
-    logger.rag(f"Context assembly complete. Total retrieval time: {time.time() - start_time:.3f}s")
+    metrics.RAG_STAGE_SECONDS.observe(time.time() - start_time, stage="context", **labels)
+    logger.rag("Context assembly complete", tmdb_ids=tmdb_ids, chunks=len(all_relevant_chunks),
+               duration_ms=round((time.time() - start_time) * 1000, 2))
     return {
         "context": "\n\n".join(all_relevant_chunks),
         "relevant_ids": all_relevant_ids,
-        "relevant_sources": current_sources
+        "relevant_sources": current_sources,
+        "degradations": degradations
     }
 
+def _vector_search(tid: int, query_vector, n_results: int, labels: dict) -> List[Dict]:
+    from src.utils.logger import logger
+    v_start = time.time()
+    results = vector_db.search_movie(tid, query_vector, n_results=n_results)
+    metrics.RAG_STAGE_SECONDS.observe(time.time() - v_start, stage="vector_search", **labels)
+    logger.rag("Vector search finished", level=logging.DEBUG, tmdb_id=tid, chunks=len(results),
+               duration_ms=round((time.time() - v_start) * 1000, 2))
+    return results
+
+def _bm25_search(tid: int, question: str, n_results: int, labels: dict) -> Optional[List[Dict]]:
+    """Top BM25 chunks, or None when the film has no corpus. Loads (and caches) the corpus on a miss."""
+    from src.utils.logger import logger
+    bm_start = time.time()
+    corpus = load_corpus(tid)
+    if not corpus:
+        return None
+    tokenized_query = tokenize(question.lower())
+    bm25_indices = corpus.bm25.get_top_n(tokenized_query, range(len(corpus.docs)), n=n_results)
+    metrics.RAG_STAGE_SECONDS.observe(time.time() - bm_start, stage="bm25", **labels)
+    logger.rag("BM25 ranker finished", level=logging.DEBUG, tmdb_id=tid, duration_ms=round((time.time() - bm_start) * 1000, 2))
+    return [corpus.docs[i] for i in bm25_indices]
+
+# Budgeted DB lookups use their own session: a late one finishes in the background after
+# the request's session has closed.
+async def _load_penalties(movie_id: int, labels: dict) -> Dict[str, float]:
+    from src.db.database import AsyncSessionLocal
+    with metrics.RAG_STAGE_SECONDS.time(stage="penalties", **labels):
+        async with AsyncSessionLocal() as db:
+            return await get_penalties(db, movie_id)
+
+async def _load_research(movie_id: int, labels: dict):
+    from sqlalchemy import select
+    from src.db.database import AsyncSessionLocal
+    from src.models.sql_models import SummaryCache
+    with metrics.RAG_STAGE_SECONDS.time(stage="research", **labels):
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(select(SummaryCache).where(
+                SummaryCache.movie_id == movie_id,
+                SummaryCache.summary_type == "video_essay"
+            ))).scalars().first()
+
 from langchain_core.runnables import RunnableConfig
 
 async def generate_answer_node(state: RAGState, config: RunnableConfig) -> dict:
+    with tracing.span("rag.generate", persona=state.get("persona", "critic")):
+        return await _generate_answer(state, config)
+
+async def _generate_answer(state: RAGState, config: RunnableConfig) -> dict:
     from src.utils.logger import logger
     persona = state.get("persona", "critic")
     tmdb_ids = state["tmdb_ids"]
     context = state["context"]
     question = state.get("question") or state["messages"][-1].content
     
-    from src.db.database import SessionLocal
-    from src.models.sql_models import Movie
-    db = SessionLocal()
+    from src.db.database import AsyncSessionLocal
+    from src.core.identity_cache import resolve_movie_async
     titles = []
-    for tid in tmdb_ids:
-        m = db.query(Movie).filter(Movie.tmdb_id == tid).first()
-        titles.append(m.title if m else str(tid))
-    db.close()
+    # Served from the identity cache filled by retrieve; the session only connects on a miss
+    async with AsyncSessionLocal() as db:
+        for tid in tmdb_ids:
+            m = await resolve_movie_async(db, tmdb_id=tid)
+            titles.append(m.title if m else str(tid))
     
     display_title = " vs ".join(titles)
     from src.agents.persona_agents import PersonaManager
@@ -168,13 +253,21 @@ async def generate_answer_node(state: RAGState, config: RunnableConfig) -> dict:
     ]
     
     gen_start = time.time()
-    logger.agent(f"Generating {persona.upper()} response for '{display_title}'...")
+    logger.agent(f"Generating {persona.upper()} response for '{display_title}'...", level=logging.DEBUG, persona=persona)
     # Use astream so each token fires on_chat_model_stream in astream_events
     full_content = ""
-    async for chunk in llm.astream(messages, config):
-        if chunk.content:
-            full_content += chunk.content
-    logger.agent(f"Generation finished in {time.time() - gen_start:.3f}s")
+    usage = None
+    with tracing.span("llm.stream", persona=persona):
+        async for chunk in get_llm().astream(messages, config):
+            if chunk.content:
+                full_content += chunk.content
+            usage = getattr(chunk, "usage_metadata", None) or usage
+    logger.agent("Generation finished", persona=persona, duration_ms=round((time.time() - gen_start) * 1000, 2))
+    from src.db.llm_usage import llm_model_name, record_llm_call
+    configurable = config.get("configurable", {}) if config else {}
+    record_llm_call("rag_generate", messages, full_content, usage=usage, model=llm_model_name(get_llm()),
+                    persona=persona, tmdb_id=tmdb_ids[0] if tmdb_ids else None,
+                    user_id=configurable.get("user_id"), thread_id=configurable.get("thread_id"))
     return {"messages": [AIMessage(content=full_content)]}
 
 def create_rag_graph(checkpointer=None):
@@ -186,16 +279,77 @@ def create_rag_graph(checkpointer=None):
     workflow.add_edge("generate", END)
     return workflow.compile(checkpointer=checkpointer)
 
-async def answer_question_stream(tmdb_id: Union[int, List[int]], question: str, persona: str = "critic", thread_id: str = "default") -> AsyncIterator[dict]:
+def _replay_tokens(text: str) -> List[str]:
+    # Split on whitespace boundaries so cached answers stream like model output
+    return re.findall(r"\S+\s*|\s+", text)
+
+async def answer_question_stream(tmdb_id: Union[int, List[int]], question: str, persona: str = "critic", thread_id: str = "default",
+                                 user_id: Optional[int] = None) -> AsyncIterator[dict]:
+    """Streams citations/token/done events for a question; records TTFT, total time and active streams."""
+    labels = {"endpoint": metrics.endpoint_label.get(), "persona": persona}
+    start = time.perf_counter()
+    first_token = True
+    metrics.ACTIVE_STREAMS.inc(endpoint=labels["endpoint"])
+    try:
+        async for item in _answer_question_stream(tmdb_id, question, persona, thread_id, user_id):
+            if first_token and item["type"] == "token":
+                metrics.TTFT_SECONDS.observe(time.perf_counter() - start, **labels)
+                first_token = False
+            yield item
+        metrics.GENERATION_SECONDS.observe(time.perf_counter() - start, **labels)
+    finally:
+        metrics.ACTIVE_STREAMS.dec(endpoint=labels["endpoint"])
+
+async def _thread_has_turns(graph, config) -> bool:
+    with tracing.span("checkpointer.get"):
+        snapshot = await graph.aget_state(config)
+    return bool((snapshot.values or {}).get("messages"))
+
+async def _answer_question_stream(tmdb_id: Union[int, List[int]], question: str, persona: str, thread_id: str,
+                                  user_id: Optional[int] = None) -> AsyncIterator[dict]:
+    from src.utils.logger import logger
     tmdb_ids = [tmdb_id] if isinstance(tmdb_id, int) else tmdb_id
     for tid in tmdb_ids:
         if not vector_db.has_movie(tid):
             raise FileNotFoundError(f"Embeddings not ready for Movie (ID: {tid}). Please navigate to its page and generate a summary first.")
     
     async with AsyncSqliteSaver.from_conn_string(DB_PATH) as memory:
-        await memory.setup()
+        with tracing.span("checkpointer.setup"):
+            await memory.setup()
         graph = create_rag_graph(memory)
-        config = {"configurable": {"thread_id": thread_id}}
+        # user_id rides along for LLM usage accounting in the generate node
+        config = {"configurable": {"thread_id": thread_id, "user_id": user_id}}
+
+        query_vector = None
+        cached = None
+        # Only opening questions are shared: a follow-up ("why did he do that?") depends on its thread's history
+        cacheable = ANSWER_CACHE_ENABLED and not await _thread_has_turns(graph, config)
+        if cacheable:
+            with metrics.RAG_STAGE_SECONDS.time(stage="embed", endpoint=metrics.endpoint_label.get(), persona=persona):
+                query_vector = embed_query(question)
+            with tracing.span("answer_cache.lookup"):
+                cached = answer_cache.lookup(tmdb_ids, persona, query_vector)
+            metrics.CACHE_REQUESTS.inc(cache="answer", result="hit" if cached else "miss")
+        if cached:
+            logger.rag("Answer cache HIT — skipping retrieval and generation.", similarity=round(cached["similarity"], 3))
+            yield {"type": "citations", "sources": cached["citations"]}
+            for token in _replay_tokens(cached["answer"]):
+                yield {"type": "token", "token": token}
+            from src.db.llm_usage import llm_model_name, record_llm_call
+            record_llm_call("rag_generate", [HumanMessage(content=question)], cached["answer"],
+                            model=llm_model_name(get_llm()), cached=True, persona=persona,
+                            tmdb_id=tmdb_ids[0], user_id=user_id, thread_id=thread_id)
+            # Keep the thread memory consistent with what the user saw
+            with tracing.span("checkpointer.update"):
+                await graph.aupdate_state(config, {
+                    "tmdb_ids": tmdb_ids,
+                    "question": question,
+                    "persona": persona,
+                    "relevant_sources": cached["citations"],
+                    "messages": [HumanMessage(content=question), AIMessage(content=cached["answer"])]
+                }, as_node="generate")
+            yield {"type": "done"}
+            return
         
         initial_input = {
             "tmdb_ids": tmdb_ids,
@@ -204,17 +358,30 @@ async def answer_question_stream(tmdb_id: Union[int, List[int]], question: str,
             "messages": [HumanMessage(content=question)]
         }
 
+        gen_start = time.time()
+        citations = []
+        degradations = []
+        full_answer = []
         async for event in graph.astream_events(initial_input, config=config, version="v2"):
             kind = event["event"]
             
             if kind == "on_chain_end" and event.get("name") == "retrieve":
                 output = event["data"].get("output")
                 if output and "relevant_sources" in output:
+                    citations = output["relevant_sources"]
                     yield {"type": "citations", "sources": output["relevant_sources"]}
+                if output and output.get("degradations"):
+                    degradations = output["degradations"]
+                    yield {"type": "meta", "degradations": degradations}
             
             if kind == "on_chat_model_stream":
                 token = event["data"]["chunk"].content
                 if token:
+                    full_answer.append(token)
                     yield {"type": "token", "token": token}
+
+        # Answers built from partial retrieval are not reused
+        if cacheable and full_answer and not degradations:
+            answer_cache.store(tmdb_ids, persona, question, query_vector, "".join(full_answer), citations, time.time() - gen_start)
                     
     yield {"type": "done"}
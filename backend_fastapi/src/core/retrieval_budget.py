@@ -0,0 +1,117 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.utils import metrics
+
+# Per-stage deadlines for retrieve_context_node, in milliseconds (0 = wait as long as it
+# takes). A stage that misses its budget is dropped for that film and the answer is built
+# from what did arrive: lexical-only when vector search is late, vector-only when BM25 (or
+# its corpus load) is late, no penalties, or no research dossier. Late work is not
+# cancelled, so a cold BM25 corpus or penalty map still lands in its cache for next time.
+# Blocking stages run on their own pool of RAG_STAGE_WORKERS threads, so abandoned work
+# can't starve the default executor; while every worker is busy, stages are skipped.
+RAG_BUDGETS_ENABLED = os.getenv("RAG_BUDGETS_ENABLED", "true").lower() not in ("0", "false", "no")
+RAG_BUDGET_VECTOR_MS = float(os.getenv("RAG_BUDGET_VECTOR_MS", "1500"))
+RAG_BUDGET_BM25_MS = float(os.getenv("RAG_BUDGET_BM25_MS", "1000"))
+RAG_BUDGET_PENALTIES_MS = float(os.getenv("RAG_BUDGET_PENALTIES_MS", "250"))
+RAG_BUDGET_RESEARCH_MS = float(os.getenv("RAG_BUDGET_RESEARCH_MS", "250"))
+RAG_STAGE_WORKERS = int(os.getenv("RAG_STAGE_WORKERS", "8"))
+
+BUDGETS_MS = {
+    "vector_search": RAG_BUDGET_VECTOR_MS,
+    "bm25": RAG_BUDGET_BM25_MS,
+    "penalties": RAG_BUDGET_PENALTIES_MS,
+    "research": RAG_BUDGET_RESEARCH_MS,
+}
+FALLBACKS = {
+    "vector_search": "lexical_only",
+    "bm25": "vector_only",
+    "penalties": "no_penalties",
+    "research": "no_research",
+}
+
+RAG_DEGRADATIONS = metrics.registry.register(metrics.Counter(
+    "filmsuma_rag_degradations_total", "Retrieval stages dropped for missing their time budget or a free worker.",
+    ("stage", "reason", "endpoint")))
+
+
+class StagePool:
+    """Bounded thread pool for blocking retrieval stages; submit() refuses work once every
+    worker is taken, counting abandoned (still running) jobs until they actually finish."""
+
+    def __init__(self, workers: int = RAG_STAGE_WORKERS):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-stage")
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def submit(self, fn: Callable, *args) -> Optional[asyncio.Future]:
+        with self._lock:
+            if self._in_flight >= self.workers:
+                return None
+            self._in_flight += 1
+        ctx = contextvars.copy_context()  # keep request id, endpoint label and span like to_thread
+        return asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(self._run, ctx, fn, *args))
+
+    def _run(self, ctx: contextvars.Context, fn: Callable, *args):
+        try:
+            return ctx.run(fn, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+stage_pool = StagePool()
+metrics.QUEUE_DEPTH.set_function(stage_pool.in_flight, queue="rag_stage_pool")
+
+
+def _discard(task: asyncio.Future) -> None:
+    # Late results are unused; retrieve the exception so asyncio doesn't log it as unhandled
+    if not task.cancelled():
+        task.exception()
+
+
+async def within_budget(stage: str, work: Optional[Awaitable], started: Optional[float] = None,
+                        budget_ms: Optional[float] = None) -> Tuple[bool, Any]:
+    """(True, result) if work finishes within the stage budget counted from started (default
+    now), else (False, None) while the work carries on in the background. Errors propagate.
+    work=None (a refused stage_pool submit) counts as missed."""
+    if work is None:
+        return False, None
+    task = asyncio.ensure_future(work)
+    budget_ms = BUDGETS_MS[stage] if budget_ms is None else budget_ms
+    if not RAG_BUDGETS_ENABLED or budget_ms <= 0:
+        return True, await task
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    done, _ = await asyncio.wait({task}, timeout=max(0.0, budget_ms / 1000 - elapsed))
+    if task in done:
+        return True, task.result()
+    task.add_done_callback(_discard)
+    return False, None
+
+
+def record_degradation(degradations: List[Dict[str, Any]], stage: str, tmdb_id: int, reason: str = "timeout",
+                       fallback: Optional[str] = None, budget_ms: Optional[float] = None) -> None:
+    """reason: "timeout" or "saturated" (no free stage worker); fallback overrides the stage default,
+    e.g. "no_context" when the film has nothing else to fall back on."""
+    item = {
+        "stage": stage,
+        "tmdb_id": tmdb_id,
+        "reason": reason,
+        "budget_ms": BUDGETS_MS[stage] if budget_ms is None else budget_ms,
+        "fallback": fallback or FALLBACKS[stage],
+    }
+    degradations.append(item)
+    RAG_DEGRADATIONS.inc(stage=stage, reason=reason, endpoint=metrics.endpoint_label.get())
+    from src.utils.logger import logger
+    logger.rag(f"{stage} skipped ({reason}), continuing with {item['fallback']}", tmdb_id=tmdb_id,
+               stage=stage, reason=reason, budget_ms=item["budget_ms"])
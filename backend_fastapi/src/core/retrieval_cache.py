@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.utils import memory, metrics
+
+# Per-movie retrieval state that used to be rebuilt on every question: the chunk corpus
+# (from the vector store), its tokenized BM25 index, and the active-learning penalty map.
+# The corpus cache is an LRU bounded by an estimated byte budget; re-indexing a movie
+# drops its entry (vector_db), and downvotes drop the movie's penalties (feedback).
+BM25_CACHE_MAX_MB = float(os.getenv("BM25_CACHE_MAX_MB", "512"))
+PENALTY_CACHE_TTL_SECONDS = float(os.getenv("PENALTY_CACHE_TTL_SECONDS", "300"))
+
+# Rough CPython costs: a short str in a token list, and one term in a BM25 doc_freqs dict
+_TOKEN_BYTES = 56
+_TERM_BYTES = 100
+
+
+@dataclass
+class CorpusIndex:
+    docs: List[Dict]  # [{"id", "text"}] in vector-store order
+    bm25: object      # rank_bm25.BM25Okapi over the tokenized docs
+    nbytes: int       # estimated memory footprint
+
+
+def estimate_bytes(docs: List[Dict], tokenized: List[List[str]]) -> int:
+    text = sum(len(d["text"]) for d in docs)
+    tokens = sum(len(t) for t in tokenized)
+    terms = sum(len(set(t)) for t in tokenized)
+    return text + tokens * _TOKEN_BYTES + terms * _TERM_BYTES
+
+
+class BM25Cache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[int, CorpusIndex]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __contains__(self, tmdb_id) -> bool:
+        with self._lock:
+            return int(tmdb_id) in self._entries
+
+    def get(self, tmdb_id) -> Optional[CorpusIndex]:
+        with self._lock:
+            entry = self._entries.get(int(tmdb_id))
+            if entry is None:
+                self._stats["misses"] += 1
+                metrics.CACHE_REQUESTS.inc(cache="bm25", result="miss")
+                return None
+            self._entries.move_to_end(int(tmdb_id))
+            self._stats["hits"] += 1
+            metrics.CACHE_REQUESTS.inc(cache="bm25", result="hit")
+            return entry
+
+    def put(self, tmdb_id, entry: CorpusIndex) -> None:
+        key = int(tmdb_id)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            # Always keep the newest entry, even if it alone exceeds the budget
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._stats["evictions"] += 1
+
+    def invalidate(self, tmdb_id) -> None:
+        with self._lock:
+            old = self._entries.pop(int(tmdb_id), None)
+            if old is not None:
+                self._bytes -= old.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def shrink(self, fraction: float) -> None:
+        """Evicts least recently used movies until the cache holds (1 - fraction) of its bytes."""
+        with self._lock:
+            target = self._bytes * (1 - fraction)
+            while self._entries and self._bytes > target:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._stats["evictions"] += 1
+
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "movies": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+bm25_cache = BM25Cache(int(BM25_CACHE_MAX_MB * 1024 * 1024))
+memory.register("bm25_corpus_cache", bm25_cache.total_bytes, bm25_cache.stats, shrink=bm25_cache.shrink, priority=10)
+
+
+def load_corpus(tmdb_id) -> Optional[CorpusIndex]:
+    """Cached corpus + BM25 index for a movie; None when the movie has no chunks. Blocking."""
+    entry = bm25_cache.get(tmdb_id)
+    if entry is not None:
+        return entry
+    from rank_bm25 import BM25Okapi
+    from src.core import vector_db
+    from src.core.rag_chat import tokenize
+    docs = vector_db.get_movie_data(tmdb_id)
+    if not docs:
+        return None
+    tokenized = [tokenize(doc["text"].lower()) for doc in docs]
+    entry = CorpusIndex(docs=docs, bm25=BM25Okapi(tokenized), nbytes=estimate_bytes(docs, tokenized))
+    bm25_cache.put(tmdb_id, entry)
+    return entry
+
+
+# --- Penalty maps (movie_id -> {chunk_id: penalty}) ---
+
+_penalties: Dict[int, tuple] = {}  # movie_id -> (expires_at, penalties)
+_penalty_lock = threading.Lock()
+
+
+async def get_penalties(db, movie_id: int) -> Dict[str, float]:
+    now = time.monotonic()
+    with _penalty_lock:
+        cached = _penalties.get(movie_id)
+    if cached is not None and cached[0] > now:
+        metrics.CACHE_REQUESTS.inc(cache="penalties", result="hit")
+        return cached[1]
+    metrics.CACHE_REQUESTS.inc(cache="penalties", result="miss")
+    from src.core.active_learning import get_discredited_chunks
+    penalties = await get_discredited_chunks(db, movie_id)
+    with _penalty_lock:
+        _penalties[movie_id] = (now + PENALTY_CACHE_TTL_SECONDS, penalties)
+    return penalties
+
+
+def invalidate_penalties(movie_id: int) -> None:
+    with _penalty_lock:
+        _penalties.pop(movie_id, None)
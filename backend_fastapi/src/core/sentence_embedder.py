@@ -0,0 +1,18 @@
+from typing import List, Union
+import numpy as np
+from src.core.embedder_base import BaseEmbedder
+
+class SentenceTransformerEmbedder(BaseEmbedder):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        # Imported here so the hash backend never pays for torch
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               show_progress_bar: bool = False, convert_to_tensor: bool = False) -> np.ndarray:
+        return self.model.encode(sentences, batch_size=batch_size, show_progress_bar=show_progress_bar,
+                                 convert_to_tensor=convert_to_tensor)
+
+    def memory_bytes(self) -> int:
+        return sum(p.numel() * p.element_size() for p in self.model.parameters())
@@ -1,39 +1,90 @@
-from src.core.chroma_store import ChromaVectorStore
+from src.core import answer_cache
+from src.core.retrieval_cache import bm25_cache
+from src.utils import memory
+from src.utils.tracing import traced
+from src.core.vector_store_base import BaseVectorStore
 import numpy as np
+import threading
 from typing import List, Dict, Optional, Union
 
 # Factory for the vector store implementation
 # For now, default to ChromaDB (8GB RAM optimization)
-store = ChromaVectorStore()
+# Opened on first use (or by the startup warm-up) so importing the app never touches disk
+_store: Optional[BaseVectorStore] = None
+_store_lock = threading.Lock()
 
+def get_store() -> BaseVectorStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from src.core.chroma_store import ChromaVectorStore
+                _store = ChromaVectorStore()
+    return _store
+
+# Only measured once opened; estimating must never open the store
+memory.register("vector_index", lambda: _store.memory_bytes() if _store is not None else 0)
+
+def __getattr__(name):
+    # Backwards compatibility for `vector_db.store`
+    if name == "store":
+        return get_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# tmdb_id -> index epoch, refreshed whenever this process re-indexes or deletes a movie
+_INDEX_EPOCHS: Dict[int, int] = {}
+
+@traced("vector.add")
 def add_movie_vectors(tmdb_id: Union[int, str], movie_name: str, chunks: List[str], vectors: np.ndarray) -> None:
     """Proxy to store.add_vectors"""
-    store.add_vectors(tmdb_id, movie_name, chunks, vectors)
+    get_store().add_vectors(tmdb_id, movie_name, chunks, vectors)
+    _INDEX_EPOCHS.pop(int(tmdb_id), None)
+    bm25_cache.invalidate(tmdb_id)
+    answer_cache.invalidate_movie(tmdb_id)
 
+@traced("vector.search")
 def search_movie(tmdb_id: Union[int, str], query_vector: np.ndarray, n_results: int = 3) -> List[Dict]:
     """Proxy to store.search"""
-    return store.search(tmdb_id, query_vector, n_results=n_results)
+    return get_store().search(tmdb_id, query_vector, n_results=n_results)
 
+@traced("vector.has_movie")
 def has_movie(tmdb_id: Union[int, str]) -> bool:
     """Proxy to store.has_movie"""
-    return store.has_movie(tmdb_id)
+    return get_store().has_movie(tmdb_id)
 
 def get_movie_documents(tmdb_id: Union[int, str]) -> List[str]:
     """Proxy to store.get_movie_documents for backwards compatibility"""
-    return store.get_movie_documents(tmdb_id)
+    return get_store().get_movie_documents(tmdb_id)
 
+@traced("vector.get_movie_data")
 def get_movie_data(tmdb_id: Union[int, str]) -> List[Dict]:
     """Proxy to store.get_movie_data"""
-    return store.get_movie_data(tmdb_id)
+    return get_store().get_movie_data(tmdb_id)
+
+@traced("vector.get_chunks")
+def get_chunks_by_ids(chunk_ids: List[str]) -> List[Dict]:
+    """Proxy to store.get_chunks_by_ids (resolves stored citation ids to chunk text)"""
+    return get_store().get_chunks_by_ids(chunk_ids)
 
+@traced("vector.delete")
 def delete_movie(tmdb_id: Union[int, str]) -> None:
     """Proxy to store.delete_movie"""
-    store.delete_movie(tmdb_id)
+    get_store().delete_movie(tmdb_id)
+    _INDEX_EPOCHS.pop(int(tmdb_id), None)
+    bm25_cache.invalidate(tmdb_id)
+    answer_cache.invalidate_movie(tmdb_id)
+
+def index_epoch(tmdb_id: Union[int, str]) -> int:
+    """Cached proxy to store.get_index_epoch"""
+    key = int(tmdb_id)
+    if key not in _INDEX_EPOCHS:
+        _INDEX_EPOCHS[key] = get_store().get_index_epoch(key)
+    return _INDEX_EPOCHS[key]
 
 def add_movie_summary_vector(tmdb_id: Union[int, str], movie_name: str, summary_text: str, vector: np.ndarray) -> None:
     """Proxy to store.add_movie_summary_vector"""
-    store.add_movie_summary_vector(tmdb_id, movie_name, summary_text, vector)
+    get_store().add_movie_summary_vector(tmdb_id, movie_name, summary_text, vector)
 
 def get_similar_movies(tmdb_id: Union[int, str], n_results: int = 5) -> List[Dict]:
     """Proxy to store.get_similar_movies"""
-    return store.get_similar_movies(tmdb_id, n_results=n_results)
+    return get_store().get_similar_movies(tmdb_id, n_results=n_results)
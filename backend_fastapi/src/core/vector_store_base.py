@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 import numpy as np
 
 class BaseVectorStore(ABC):
@@ -23,6 +23,20 @@ class BaseVectorStore(ABC):
         """Retrieve all chunks with IDs for a specific movie."""
         pass
 
+    @abstractmethod
+    def get_chunks_by_ids(self, chunk_ids: List[str]) -> List[Dict]:
+        """Retrieve {"id", "text", "tmdb_id", "epoch"} chunks by id, in the requested order; unknown ids are skipped."""
+        pass
+
+    def memory_bytes(self) -> int:
+        """Approximate in-memory size of the loaded indexes."""
+        return 0
+
+    @abstractmethod
+    def get_index_epoch(self, tmdb_id: Union[int, str]) -> int:
+        """Version of a movie's current chunk set (0 if unknown); changes whenever it is re-indexed."""
+        pass
+
     @abstractmethod
     def delete_movie(self, movie_name: str) -> None:
         """Delete a movie and its vectors from the store."""
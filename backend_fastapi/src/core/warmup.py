@@ -0,0 +1,112 @@
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Background warm-up launched from the startup hook. Heavy resources are lazy singletons
+# (get_llm / get_embedder / get_store / load_punkt); this loads them off the request path
+# and records per-stage progress for /readyz. Stages run in order; blocking loaders run in a
+# worker thread. Readiness waits for every stage to finish, and for required ones to succeed;
+# a required stage that fails (say the DB or Chroma wasn't reachable yet at boot) is retried
+# with exponential backoff, so /readyz recovers without a restart.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() not in ("0", "false", "no")
+NLTK_DOWNLOAD = os.getenv("NLTK_DOWNLOAD", "true").lower() not in ("0", "false", "no")
+WARMUP_RETRY_INITIAL_SECONDS = float(os.getenv("WARMUP_RETRY_INITIAL_SECONDS", "1"))
+WARMUP_RETRY_MAX_SECONDS = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", "60"))
+
+
+def _database():
+    from sqlalchemy import text
+    from src.db.database import engine
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def _vector_store():
+    from src.core.vector_db import get_store
+    get_store()
+
+
+def _embedder():
+    from src.core.embeddings import get_embedder
+    # One encode pays for lazy weight init / kernel selection before the first real query
+    get_embedder().encode(["warm-up"], convert_to_tensor=False)
+
+
+def _llm():
+    from src.core.llm_model import get_llm
+    get_llm()
+
+
+def _tokenizer():
+    from src.core.rag_chat import load_punkt
+    load_punkt(download=NLTK_DOWNLOAD)
+
+
+async def _hot_set():
+    from src.core import hot_set
+    await hot_set.preload()
+
+
+# (name, loader, required to succeed) - the tokenizer has a regex fallback and the hot set
+# is an optimisation, so their failures don't keep the instance out of rotation
+STAGES: List[Tuple[str, Callable[[], None], bool]] = [
+    ("database", _database, True),
+    ("vector_store", _vector_store, True),
+    ("embedder", _embedder, True),
+    ("llm", _llm, True),
+    ("tokenizer", _tokenizer, False),
+    ("hot_set", _hot_set, False),
+]
+
+_status: Dict[str, dict] = {name: {"status": "pending"} for name, _, _ in STAGES}
+
+
+async def _run_stage(name: str, loader: Callable[[], None]) -> None:
+    from src.utils.logger import logger
+    attempts = _status[name].get("attempts", 0) + 1
+    _status[name] = {"status": "running", "attempts": attempts}
+    start = time.perf_counter()
+    try:
+        if asyncio.iscoroutinefunction(loader):
+            await loader()
+        else:
+            await asyncio.to_thread(loader)
+        _status[name] = {"status": "ready", "seconds": round(time.perf_counter() - start, 3), "attempts": attempts}
+        logger.worker(f"Warm-up: {name} ready in {_status[name]['seconds']}s")
+    except Exception as e:
+        _status[name] = {"status": "failed", "seconds": round(time.perf_counter() - start, 3), "attempts": attempts,
+                         "error": str(e)[:200]}
+        logger.error(f"Warm-up: {name} failed (attempt {attempts}): {e}")
+
+
+async def run_warmup() -> Dict[str, dict]:
+    for name, loader, _ in STAGES:
+        await _run_stage(name, loader)
+    delay = WARMUP_RETRY_INITIAL_SECONDS
+    while True:
+        failed = [(name, loader) for name, loader, required in STAGES if required and _status[name]["status"] == "failed"]
+        if not failed:
+            return stages()
+        await asyncio.sleep(delay)
+        for name, loader in failed:
+            await _run_stage(name, loader)
+        delay = min(delay * 2, WARMUP_RETRY_MAX_SECONDS)
+
+
+def stages() -> Dict[str, dict]:
+    from src.core import hot_set
+    result = {name: dict(info) for name, info in _status.items()}
+    if "hot_set" in result:
+        result["hot_set"]["progress"] = hot_set.progress()
+    return result
+
+
+def is_ready() -> bool:
+    if not WARMUP_ENABLED:
+        return True
+    for name, _, required in STAGES:
+        status = _status[name]["status"]
+        if status in ("pending", "running") or (required and status != "ready"):
+            return False
+    return True
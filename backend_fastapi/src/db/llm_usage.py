@@ -0,0 +1,244 @@
+import asyncio
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, List, Optional, Sequence
+
+from sqlalchemy import case, func, insert, select
+
+from src.db.database import SessionLocal
+from src.models import sql_models
+from src.utils import metrics
+from src.utils.tracing import current_request_id
+
+# Per-call LLM token accounting. Every call site records prompt/completion tokens, taken
+# from the provider's usage metadata when present and estimated otherwise. Rows are
+# buffered in memory and bulk-inserted into llm_usage by a background flush, so recording
+# never touches the database on the request path. Outer layers (summary endpoints, the
+# RAG stream) attach the film, persona, user and thread with usage_scope().
+LLM_USAGE_ENABLED = os.getenv("LLM_USAGE_ENABLED", "true").lower() not in ("0", "false", "no")
+LLM_USAGE_FLUSH_SECONDS = float(os.getenv("LLM_USAGE_FLUSH_SECONDS", "5"))
+LLM_USAGE_MAX_PENDING = int(os.getenv("LLM_USAGE_MAX_PENDING", "10000"))
+# USD per million tokens, applied at record time so price changes don't rewrite history
+LLM_PRICE_PROMPT_PER_MTOK = float(os.getenv("LLM_PRICE_PROMPT_PER_MTOK", "0"))
+LLM_PRICE_COMPLETION_PER_MTOK = float(os.getenv("LLM_PRICE_COMPLETION_PER_MTOK", "0"))
+
+SCOPE_FIELDS = ("persona", "tmdb_id", "user_id", "thread_id")
+_scope: ContextVar[dict] = ContextVar("llm_usage_scope", default={})
+
+
+@contextmanager
+def usage_scope(**attributes):
+    """Attributes (persona, tmdb_id, user_id, thread_id) for LLM calls made inside the block."""
+    previous = _scope.get()
+    token = _scope.set({**previous, **{k: v for k, v in attributes.items() if v is not None}})
+    try:
+        yield
+    finally:
+        try:
+            _scope.reset(token)
+        except ValueError:
+            # Exited from a different context (e.g. an async generator resumed elsewhere)
+            _scope.set(previous)
+
+
+async def scoped_stream(stream: AsyncIterator, **attributes) -> AsyncIterator:
+    """Iterates stream inside usage_scope(**attributes), e.g. a StreamingResponse generator."""
+    with usage_scope(**attributes):
+        async for item in stream:
+            yield item
+
+
+def llm_model_name(llm) -> Optional[str]:
+    """Model name recorded for an LLM client (model_name, or model on some providers)."""
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+    return str(model) if model is not None else None
+
+
+# --- Token counting ---
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Local token count: tiktoken's cl100k_base when installed, else ~4 characters per token."""
+    global _encoding
+    if not text:
+        return 0
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return len(_encoding.encode(text, disallowed_special=())) if _encoding else metrics.estimate_tokens(text)
+
+
+def count_message_tokens(messages: Sequence) -> int:
+    # ~4 tokens of chat-format overhead per message
+    return sum(count_tokens(str(m.content)) + 4 for m in messages)
+
+
+def usage_from_metadata(usage) -> Optional[tuple]:
+    """(prompt, completion) from a LangChain usage_metadata dict, None when absent."""
+    if not usage:
+        return None
+    return int(usage.get("input_tokens") or 0), int(usage.get("output_tokens") or 0)
+
+
+def cost_usd(prompt_tokens: int, completion_tokens: int) -> float:
+    return (prompt_tokens * LLM_PRICE_PROMPT_PER_MTOK + completion_tokens * LLM_PRICE_COMPLETION_PER_MTOK) / 1e6
+
+
+# --- Recording ---
+
+class UsageRecorder:
+    def __init__(self, session_factory: Callable = SessionLocal, max_pending: int = LLM_USAGE_MAX_PENDING):
+        self.session_factory = session_factory
+        self.max_pending = max_pending
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"recorded": 0, "written": 0, "dropped": 0, "failures": 0}
+
+    def record(self, call_site: str, prompt_tokens: int, completion_tokens: int, model: Optional[str] = None,
+               estimated: bool = False, cached: bool = False, **attributes) -> None:
+        """Queues one usage row; thread-safe and never blocks on the database."""
+        if not LLM_USAGE_ENABLED:
+            return
+        scope = _scope.get()
+        row = {
+            "created_at": datetime.now(timezone.utc),
+            "request_id": current_request_id.get(),
+            "call_site": call_site,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "estimated": estimated,
+            "cached": cached,
+            "cost_usd": 0.0 if cached else cost_usd(prompt_tokens, completion_tokens),
+        }
+        for field in SCOPE_FIELDS:
+            row[field] = attributes.get(field, scope.get(field))
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                del self._pending[0]
+                self.stats["dropped"] += 1
+            self._pending.append(row)
+            self.stats["recorded"] += 1
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Bulk-inserts queued rows. Blocking; rows are re-queued if the insert fails."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        try:
+            with self.session_factory() as db:
+                db.execute(insert(sql_models.LLMUsage), batch)
+                db.commit()
+        except Exception as e:
+            from src.utils.logger import logger
+            self.stats["failures"] += 1
+            logger.error(f"LLM usage flush failed ({len(batch)} rows re-queued): {e}")
+            with self._lock:
+                self._pending[:0] = batch[-self.max_pending:]
+            return 0
+        self.stats["written"] += len(batch)
+        return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(LLM_USAGE_FLUSH_SECONDS)
+            await asyncio.to_thread(self.flush)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+
+usage_recorder = UsageRecorder()
+metrics.QUEUE_DEPTH.set_function(usage_recorder.pending, queue="llm_usage")
+
+
+def record_llm_call(call_site: str, messages: Sequence, completion: str, usage=None, model: Optional[str] = None,
+                    cached: bool = False, **attributes) -> None:
+    """Records one call: provider usage when given, otherwise local counts of prompt and completion."""
+    reported = usage_from_metadata(usage)
+    if reported is not None:
+        prompt_tokens, completion_tokens = reported
+    else:
+        prompt_tokens, completion_tokens = count_message_tokens(messages), count_tokens(completion)
+    if not cached:
+        labels = {"endpoint": metrics.endpoint_label.get(),
+                  "persona": attributes.get("persona") or _scope.get().get("persona") or ""}
+        metrics.LLM_TOKENS.inc(prompt_tokens, direction="in", **labels)
+        metrics.LLM_TOKENS.inc(completion_tokens, direction="out", **labels)
+    usage_recorder.record(call_site, prompt_tokens, completion_tokens, model=model,
+                          estimated=reported is None, cached=cached, **attributes)
+
+
+# --- Aggregates ---
+
+GROUP_COLUMNS = {
+    "call_site": sql_models.LLMUsage.call_site,
+    "persona": sql_models.LLMUsage.persona,
+    "tmdb_id": sql_models.LLMUsage.tmdb_id,
+    "user_id": sql_models.LLMUsage.user_id,
+    "model": sql_models.LLMUsage.model,
+    "day": func.date(sql_models.LLMUsage.created_at),
+}
+ORDER_COLUMNS = ("total_tokens", "prompt_tokens", "avg_prompt_tokens", "cost_usd", "calls")
+
+
+def summarize(db, group_by: Sequence[str], since_hours: float, include_cached: bool = False,
+              order_by: str = "total_tokens", limit: int = 50) -> List[dict]:
+    """Token and cost totals grouped by any of GROUP_COLUMNS over the last since_hours."""
+    u = sql_models.LLMUsage
+    keys = [GROUP_COLUMNS[g].label(g) for g in group_by]
+    prompt = func.sum(u.prompt_tokens)
+    completion = func.sum(u.completion_tokens)
+    aggregates = {
+        "calls": func.count(u.id),
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": prompt + completion,
+        "avg_prompt_tokens": func.avg(u.prompt_tokens),
+        "cost_usd": func.sum(u.cost_usd),
+        "estimated_calls": func.sum(case((u.estimated, 1), else_=0)),
+    }
+    stmt = select(*keys, *(col.label(name) for name, col in aggregates.items()))
+    stmt = stmt.where(u.created_at >= datetime.now(timezone.utc) - timedelta(hours=since_hours))
+    if not include_cached:
+        stmt = stmt.where(u.cached.is_(False))
+    stmt = stmt.group_by(*keys).order_by(aggregates[order_by].desc()).limit(limit)
+    rows = db.execute(stmt).mappings().all()
+    return [
+        {**row, "avg_prompt_tokens": round(float(row["avg_prompt_tokens"] or 0), 1), "cost_usd": round(row["cost_usd"] or 0.0, 6)}
+        for row in rows
+    ]
+
+
+def request_usage(db, request_id: str) -> List[dict]:
+    u = sql_models.LLMUsage
+    rows = db.execute(select(u).where(u.request_id == request_id).order_by(u.id)).scalars().all()
+    return [
+        {c: getattr(r, c) for c in ("created_at", "call_site", "model", "persona", "tmdb_id", "user_id", "thread_id",
+                                    "prompt_tokens", "completion_tokens", "estimated", "cached", "cost_usd")}
+        for r in rows
+    ]
@@ -0,0 +1,50 @@
+import importlib
+import pkgutil
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# Minimal versioned migrations. Each module in this package named mNNNN_<name>.py
+# defines upgrade(conn); modules run in version order, each in its own transaction,
+# and applied versions are recorded in schema_migrations.
+# create_all still creates fresh tables; migrations bring existing databases in line.
+
+
+def discover() -> List[Tuple[str, str, object]]:
+    """Returns (version, name, module) for every migration module, ordered by version."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        if not info.name.startswith("m") or "_" not in info.name:
+            continue
+        version, _, name = info.name[1:].partition("_")
+        if version.isdigit():
+            found.append((version, name, importlib.import_module(f"{__name__}.{info.name}")))
+    return sorted(found, key=lambda m: m[0])
+
+
+def applied_versions(conn) -> set:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR(16) PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Applies pending migrations. Returns the versions applied by this call."""
+    from src.utils.logger import logger
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for version, name, module in discover():
+        if version in done:
+            continue
+        logger.db(f"Applying migration {version}_{name}")
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)"), {"v": version, "n": name})
+        applied.append(version)
+    return applied
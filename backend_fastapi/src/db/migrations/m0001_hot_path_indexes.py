@@ -0,0 +1,27 @@
+from sqlalchemy import text
+
+# Composite indexes for the hot lookups, unique where the data model allows one row per key.
+# Duplicates that would violate the new unique indexes are removed first (latest row wins).
+DEDUPE = [
+    ("summary_cache", "movie_id, summary_type"),
+    ("user_movie_engagements", "user_id, movie_id, engagement_type"),
+    ("user_hidden_movies", "user_id, movie_id"),
+]
+
+INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_summary_cache_movie_type ON summary_cache (movie_id, summary_type)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_movie_engagement ON user_movie_engagements (user_id, movie_id, engagement_type)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_hidden_movie ON user_hidden_movies (user_id, movie_id)",
+    "CREATE INDEX IF NOT EXISTS ix_chat_history_thread_user_id ON chat_history (thread_id, user_id, id)",
+    "CREATE INDEX IF NOT EXISTS ix_chat_history_user_id_id ON chat_history (user_id, id)",
+    "CREATE INDEX IF NOT EXISTS ix_feedback_movie_downvote_rating ON feedback (movie_id, downvote, rating)",
+]
+
+
+def upgrade(conn) -> None:
+    for table, columns in DEDUPE:
+        conn.execute(text(
+            f"DELETE FROM {table} WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY {columns})"
+        ))
+    for statement in INDEXES:
+        conn.execute(text(statement))
@@ -0,0 +1,55 @@
+import json
+from typing import List, Optional
+
+from sqlalchemy import text
+
+# Moves cited chunks out of the chat_history.citations JSON blobs (which held full
+# chunk text) into message_citations(chat_id, rank, chunk_id), then clears the blobs.
+BATCH_SIZE = 500
+
+CREATE = [
+    "CREATE TABLE IF NOT EXISTS message_citations ("
+    "chat_id INTEGER NOT NULL REFERENCES chat_history (id) ON DELETE CASCADE, "
+    "rank INTEGER NOT NULL, chunk_id VARCHAR NOT NULL, PRIMARY KEY (chat_id, rank))",
+    "CREATE INDEX IF NOT EXISTS ix_message_citations_chunk_id ON message_citations (chunk_id)",
+]
+
+
+def legacy_citation_ids(blob: Optional[str]) -> List[str]:
+    """Chunk ids from a legacy citations blob: a JSON list of {"id", "text"} dicts or bare ids."""
+    if not blob:
+        return []
+    try:
+        items = json.loads(blob)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(items, list):
+        return []
+    ids = [item.get("id") if isinstance(item, dict) else item for item in items]
+    return [str(cid) for cid in ids if cid is not None]
+
+
+def upgrade(conn) -> None:
+    for statement in CREATE:
+        conn.execute(text(statement))
+
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, citations FROM chat_history WHERE citations IS NOT NULL AND id > :last ORDER BY id LIMIT :n"
+        ), {"last": last_id, "n": BATCH_SIZE}).all()
+        if not rows:
+            break
+        links = [
+            {"chat_id": chat_id, "rank": rank, "chunk_id": chunk_id}
+            for chat_id, blob in rows
+            for rank, chunk_id in enumerate(legacy_citation_ids(blob))
+        ]
+        if links:
+            conn.execute(text(
+                "INSERT INTO message_citations (chat_id, rank, chunk_id) VALUES (:chat_id, :rank, :chunk_id) "
+                "ON CONFLICT DO NOTHING"
+            ), links)
+        last_id = rows[-1][0]
+
+    conn.execute(text("UPDATE chat_history SET citations = NULL WHERE citations IS NOT NULL"))
@@ -0,0 +1,25 @@
+from sqlalchemy import text
+
+# Per-call LLM token and cost accounting (src/db/llm_usage.py).
+CREATE = [
+    "CREATE TABLE IF NOT EXISTS llm_usage ("
+    "id {id_type}, created_at {timestamp_type} DEFAULT CURRENT_TIMESTAMP, "
+    "request_id VARCHAR, call_site VARCHAR NOT NULL, model VARCHAR, persona VARCHAR, tmdb_id INTEGER, "
+    "user_id INTEGER REFERENCES users (id), thread_id VARCHAR, "
+    "prompt_tokens INTEGER NOT NULL DEFAULT 0, completion_tokens INTEGER NOT NULL DEFAULT 0, "
+    "estimated BOOLEAN NOT NULL DEFAULT FALSE, cached BOOLEAN NOT NULL DEFAULT FALSE, "
+    "cost_usd FLOAT NOT NULL DEFAULT 0)",
+    "CREATE INDEX IF NOT EXISTS ix_llm_usage_created_at ON llm_usage (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_llm_usage_tmdb_id_created_at ON llm_usage (tmdb_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_llm_usage_user_id_created_at ON llm_usage (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_llm_usage_request_id ON llm_usage (request_id)",
+]
+
+
+def upgrade(conn) -> None:
+    postgres = conn.dialect.name == "postgresql"
+    id_type = "SERIAL PRIMARY KEY" if postgres else "INTEGER NOT NULL PRIMARY KEY"
+    # Same types create_all emits for DateTime(timezone=True)
+    timestamp_type = "TIMESTAMP WITH TIME ZONE" if postgres else "DATETIME"
+    for statement in CREATE:
+        conn.execute(text(statement.format(id_type=id_type, timestamp_type=timestamp_type)))
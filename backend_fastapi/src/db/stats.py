@@ -0,0 +1,319 @@
+import os
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, event, exists, func, literal_column, or_, select, union, union_all, update
+from sqlalchemy.engine import Connection
+
+from src.db.database import dialect_insert
+from src.models import sql_models
+
+# Denormalized engagement counters (movie_stats / user_movie_stats).
+# ORM inserts and deletes adjust the counters inside the same flush through mapper
+# events; bulk paths (chat write-behind, bulk deletes, thread claims) call
+# record_chat_rows / reconcile explicitly. reconcile() also repairs any drift; the
+# background pass only recounts movies whose counters changed since the previous pass.
+STATS_RECONCILE_INTERVAL_SECONDS = int(os.getenv("STATS_RECONCILE_INTERVAL_SECONDS", "3600"))
+
+MovieStats = sql_models.MovieStats
+UserMovieStats = sql_models.UserMovieStats
+MOVIE_COUNTERS = ("summary_count", "chat_message_count", "chat_thread_count", "post_count", "reply_count", "engagement_count")
+USER_COUNTERS = ("chat_message_count", "chat_thread_count", "post_count", "reply_count", "engagement_count",
+                 "summary_engagements", "deep_dive_engagements")
+
+
+def _bump(conn: Connection, model, keys: dict, deltas: dict) -> None:
+    """Adds deltas to one counter row, creating it on first use (single upsert)."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas or any(v is None for v in keys.values()):
+        return
+    table = model.__table__
+    insert = dialect_insert(conn)
+    if insert is not None:
+        stmt = insert(table).values(**keys, **{k: max(v, 0) for k, v in deltas.items()})
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={**{k: table.c[k] + v for k, v in deltas.items()}, "updated_at": func.now()},
+        )
+        conn.execute(stmt)
+        return
+    # Generic fallback for other dialects
+    where = and_(*[table.c[k] == v for k, v in keys.items()])
+    result = conn.execute(update(table).where(where).values(**{k: table.c[k] + v for k, v in deltas.items()}))
+    if result.rowcount == 0:
+        conn.execute(table.insert().values(**keys, **{k: max(v, 0) for k, v in deltas.items()}))
+
+
+def bump_movie(conn: Connection, movie_id: Optional[int], **deltas) -> None:
+    _bump(conn, MovieStats, {"movie_id": movie_id}, deltas)
+
+
+def bump_user_movie(conn: Connection, user_id: Optional[int], movie_id: Optional[int], **deltas) -> None:
+    _bump(conn, UserMovieStats, {"user_id": user_id, "movie_id": movie_id}, deltas)
+
+
+# --- Chat threads ---
+
+def _thread_rows(conn: Connection, thread_id: str, movie_id: int, user_id: Optional[int] = None) -> int:
+    ch = sql_models.ChatHistory.__table__
+    where = [ch.c.thread_id == thread_id, ch.c.movie_id == movie_id]
+    if user_id is not None:
+        where.append(ch.c.user_id == user_id)
+    return conn.execute(select(func.count()).select_from(ch).where(*where)).scalar_one()
+
+
+def record_chat_rows(conn: Connection, rows: List[dict]) -> None:
+    """Counter updates for ChatHistory rows that were just bulk-inserted on this connection."""
+    per_movie: Dict[Tuple[str, int], int] = defaultdict(int)
+    per_user: Dict[Tuple[str, int, int], int] = defaultdict(int)
+    for row in rows:
+        per_movie[(row["thread_id"], row["movie_id"])] += 1
+        if row.get("user_id") is not None:
+            per_user[(row["thread_id"], row["movie_id"], row["user_id"])] += 1
+
+    for (thread_id, movie_id), n in per_movie.items():
+        # A thread is new when every row it has arrived in this batch
+        new_thread = _thread_rows(conn, thread_id, movie_id) == n
+        bump_movie(conn, movie_id, chat_message_count=n, chat_thread_count=int(new_thread))
+    for (thread_id, movie_id, user_id), n in per_user.items():
+        new_thread = _thread_rows(conn, thread_id, movie_id, user_id) == n
+        bump_user_movie(conn, user_id, movie_id, chat_message_count=n, chat_thread_count=int(new_thread))
+
+
+def _is_first_in_thread(conn: Connection, target, by_user: bool) -> bool:
+    ch = sql_models.ChatHistory.__table__
+    where = [ch.c.thread_id == target.thread_id, ch.c.movie_id == target.movie_id, ch.c.id < target.id]
+    if by_user:
+        where.append(ch.c.user_id == target.user_id)
+    return conn.execute(select(ch.c.id).where(*where).limit(1)).first() is None
+
+
+@event.listens_for(sql_models.ChatHistory, "after_insert")
+def _chat_inserted(mapper, conn, target):
+    bump_movie(conn, target.movie_id, chat_message_count=1,
+               chat_thread_count=int(_is_first_in_thread(conn, target, by_user=False)))
+    if target.user_id is not None:
+        bump_user_movie(conn, target.user_id, target.movie_id, chat_message_count=1,
+                        chat_thread_count=int(_is_first_in_thread(conn, target, by_user=True)))
+
+
+@event.listens_for(sql_models.ChatHistory, "after_delete")
+def _chat_deleted(mapper, conn, target):
+    bump_movie(conn, target.movie_id, chat_message_count=-1,
+               chat_thread_count=-int(_thread_rows(conn, target.thread_id, target.movie_id) == 0))
+    if target.user_id is not None:
+        bump_user_movie(conn, target.user_id, target.movie_id, chat_message_count=-1,
+                        chat_thread_count=-int(_thread_rows(conn, target.thread_id, target.movie_id, target.user_id) == 0))
+
+
+# --- Summaries, posts, replies, engagements ---
+
+@event.listens_for(sql_models.SummaryCache, "after_insert")
+def _summary_inserted(mapper, conn, target):
+    bump_movie(conn, target.movie_id, summary_count=1)
+
+
+@event.listens_for(sql_models.SummaryCache, "after_delete")
+def _summary_deleted(mapper, conn, target):
+    bump_movie(conn, target.movie_id, summary_count=-1)
+
+
+@event.listens_for(sql_models.ForumPost, "after_insert")
+def _post_inserted(mapper, conn, target):
+    bump_movie(conn, target.movie_id, post_count=1)
+    bump_user_movie(conn, target.user_id, target.movie_id, post_count=1)
+
+
+@event.listens_for(sql_models.ForumPost, "after_delete")
+def _post_deleted(mapper, conn, target):
+    bump_movie(conn, target.movie_id, post_count=-1)
+    bump_user_movie(conn, target.user_id, target.movie_id, post_count=-1)
+
+
+def _reply_movie_id(conn: Connection, post_id: int) -> Optional[int]:
+    posts = sql_models.ForumPost.__table__
+    return conn.execute(select(posts.c.movie_id).where(posts.c.id == post_id)).scalar()
+
+
+@event.listens_for(sql_models.ForumReply, "after_insert")
+def _reply_inserted(mapper, conn, target):
+    movie_id = _reply_movie_id(conn, target.post_id)
+    bump_movie(conn, movie_id, reply_count=1)
+    bump_user_movie(conn, target.user_id, movie_id, reply_count=1)
+
+
+@event.listens_for(sql_models.ForumReply, "after_delete")
+def _reply_deleted(mapper, conn, target):
+    movie_id = _reply_movie_id(conn, target.post_id)
+    bump_movie(conn, movie_id, reply_count=-1)
+    bump_user_movie(conn, target.user_id, movie_id, reply_count=-1)
+
+
+def _engagement_deltas(target, sign: int) -> dict:
+    kind = sql_models.EngagementType(target.engagement_type) if target.engagement_type else sql_models.EngagementType.SEEN
+    return {
+        "engagement_count": sign,
+        "summary_engagements": sign if kind == sql_models.EngagementType.SUMMARY else 0,
+        "deep_dive_engagements": sign if kind == sql_models.EngagementType.DEEP_DIVE else 0,
+    }
+
+
+@event.listens_for(sql_models.UserMovieEngagement, "after_insert")
+def _engagement_inserted(mapper, conn, target):
+    bump_movie(conn, target.movie_id, engagement_count=1)
+    bump_user_movie(conn, target.user_id, target.movie_id, **_engagement_deltas(target, 1))
+
+
+@event.listens_for(sql_models.UserMovieEngagement, "after_delete")
+def _engagement_deleted(mapper, conn, target):
+    bump_movie(conn, target.movie_id, engagement_count=-1)
+    bump_user_movie(conn, target.user_id, target.movie_id, **_engagement_deltas(target, -1))
+
+
+# --- Reconciliation ---
+
+def _count_parts(movie_ids: Optional[List[int]], user_id: Optional[int], per_user: bool) -> list:
+    """One grouped SELECT per source table, each yielding the key columns plus every counter
+    (0 for the ones that source doesn't feed), optionally scoped."""
+    ch = sql_models.ChatHistory.__table__
+    sc = sql_models.SummaryCache.__table__
+    fp = sql_models.ForumPost.__table__
+    fr = sql_models.ForumReply.__table__
+    ue = sql_models.UserMovieEngagement.__table__
+    counters = USER_COUNTERS if per_user else MOVIE_COUNTERS
+    replies = fr.join(fp, fr.c.post_id == fp.c.id)
+
+    def part(source, movie_col, user_col, **values):
+        keys = [user_col.label("user_id"), movie_col.label("movie_id")] if per_user else [movie_col.label("movie_id")]
+        stmt = select(*keys, *[values.get(c, literal_column("0")).label(c) for c in counters]).select_from(source)
+        if movie_ids is not None:
+            stmt = stmt.where(movie_col.in_(movie_ids))
+        if per_user:
+            stmt = stmt.where(user_col.isnot(None))
+            if user_id is not None:
+                stmt = stmt.where(user_col == user_id)
+        return stmt.group_by(*[k.element for k in keys])
+
+    chats = dict(chat_message_count=func.count(), chat_thread_count=func.count(ch.c.thread_id.distinct()))
+    if not per_user:
+        return [
+            part(sc, sc.c.movie_id, None, summary_count=func.count()),
+            part(ch, ch.c.movie_id, None, **chats),
+            part(fp, fp.c.movie_id, None, post_count=func.count()),
+            part(replies, fp.c.movie_id, None, reply_count=func.count()),
+            part(ue, ue.c.movie_id, None, engagement_count=func.count()),
+        ]
+    return [
+        part(ch, ch.c.movie_id, ch.c.user_id, **chats),
+        part(fp, fp.c.movie_id, fp.c.user_id, post_count=func.count()),
+        part(replies, fp.c.movie_id, fr.c.user_id, reply_count=func.count()),
+        part(ue, ue.c.movie_id, ue.c.user_id, engagement_count=func.count(),
+             summary_engagements=func.sum(case((ue.c.engagement_type == sql_models.EngagementType.SUMMARY, 1), else_=0)),
+             deep_dive_engagements=func.sum(case((ue.c.engagement_type == sql_models.EngagementType.DEEP_DIVE, 1), else_=0))),
+    ]
+
+
+def _sync_table(conn: Connection, model, key_cols: Tuple[str, ...], counters: Tuple[str, ...],
+                parts: list, scope_where: list) -> int:
+    """Rewrites counter rows that differ from the recount and deletes rows whose source data is gone."""
+    table = model.__table__
+    counted = union_all(*parts).subquery()
+    truth = (
+        select(*[counted.c[k] for k in key_cols], *[func.sum(counted.c[c]).label(c) for c in counters])
+        .where(*[counted.c[k].isnot(None) for k in key_cols])
+        .group_by(*[counted.c[k] for k in key_cols])
+    )
+    insert = dialect_insert(conn)
+    repaired = 0
+    if insert is not None:
+        # Recount and write in one statement, so a concurrent bump isn't lost between a read and a write
+        stmt = insert(table).from_select([*key_cols, *counters], truth)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_cols),
+            set_={**{c: stmt.excluded[c] for c in counters}, "updated_at": func.now()},
+            where=or_(*[table.c[c] != stmt.excluded[c] for c in counters]),
+        )
+        repaired += conn.execute(stmt).rowcount
+    else:
+        # Generic fallback for other dialects
+        for row in conn.execute(truth):
+            keys = {k: row._mapping[k] for k in key_cols}
+            values = {c: row._mapping[c] for c in counters}
+            where = and_(*[table.c[k] == v for k, v in keys.items()])
+            changed = or_(*[table.c[c] != v for c, v in values.items()])
+            if conn.execute(update(table).where(where, changed).values(**values, updated_at=func.now())).rowcount:
+                repaired += 1
+            elif conn.execute(select(func.count()).select_from(table).where(where)).scalar_one() == 0:
+                conn.execute(table.insert().values(**keys, **values))
+                repaired += 1
+    # Rows whose source data is gone entirely
+    truth = truth.subquery()
+    gone = ~exists().where(*[truth.c[k] == table.c[k] for k in key_cols])
+    repaired += conn.execute(delete(table).where(*scope_where, gone, or_(*[table.c[c] != 0 for c in counters]))).rowcount
+    return repaired
+
+
+def reconcile(conn: Connection, movie_ids: Optional[Iterable[int]] = None, user_id: Optional[int] = None) -> int:
+    """
+    Rewrites counters that drifted from the source tables. Scoped to movie_ids
+    (and user_id for per-user rows) when given. Returns the number of rows repaired.
+    """
+    movie_ids = list(movie_ids) if movie_ids is not None else None
+
+    movie_scope, user_scope = [], []
+    if movie_ids is not None:
+        movie_scope.append(MovieStats.__table__.c.movie_id.in_(movie_ids))
+        user_scope.append(UserMovieStats.__table__.c.movie_id.in_(movie_ids))
+    if user_id is not None:
+        user_scope.append(UserMovieStats.__table__.c.user_id == user_id)
+    user_parts = _count_parts(movie_ids, user_id, per_user=True)
+    if user_id is not None and movie_ids is None:
+        # Movie-level rows are only touched when explicitly scoped by movie
+        return _sync_table(conn, UserMovieStats, ("user_id", "movie_id"), USER_COUNTERS, user_parts, user_scope)
+
+    repaired = _sync_table(conn, MovieStats, ("movie_id",), MOVIE_COUNTERS, _count_parts(movie_ids, None, per_user=False), movie_scope)
+    repaired += _sync_table(conn, UserMovieStats, ("user_id", "movie_id"), USER_COUNTERS, user_parts, user_scope)
+    return repaired
+
+
+def changed_movie_ids(conn: Connection, since) -> List[int]:
+    """Movies whose counters were bumped (or repaired) at or after since."""
+    ms, ums = MovieStats.__table__, UserMovieStats.__table__
+    changed = union(select(ms.c.movie_id).where(ms.c.updated_at >= since),
+                    select(ums.c.movie_id).where(ums.c.updated_at >= since))
+    return [movie_id for (movie_id,) in conn.execute(changed)]
+
+
+def reconcile_all() -> int:
+    """Full repair pass in its own transaction (scripts/reconcile_stats.py)."""
+    from src.db.database import engine
+    from src.utils.logger import logger
+    with engine.begin() as conn:
+        repaired = reconcile(conn)
+    if repaired:
+        logger.db(f"Stats reconciliation repaired {repaired} counter rows")
+    return repaired
+
+
+def reconcile_pass(since=None) -> Tuple[int, object]:
+    """
+    Background repair pass; returns (rows repaired, database time this pass started).
+    With since=None (first pass after startup) it only backfills when movie_stats is empty,
+    e.g. right after the counters were introduced; later passes recount the movies that
+    changed since the previous pass instead of every table.
+    """
+    from src.db.database import engine
+    from src.utils.logger import logger
+    with engine.begin() as conn:
+        # One second of overlap: SQLite's CURRENT_TIMESTAMP has second resolution
+        started = conn.execute(select(func.now())).scalar_one() - timedelta(seconds=1)
+        if since is None:
+            empty = conn.execute(select(MovieStats.movie_id).limit(1)).first() is None
+            repaired = reconcile(conn) if empty else 0
+        else:
+            movie_ids = changed_movie_ids(conn, since)
+            repaired = reconcile(conn, movie_ids) if movie_ids else 0
+    if repaired:
+        logger.db(f"Stats reconciliation repaired {repaired} counter rows")
+    return repaired, started
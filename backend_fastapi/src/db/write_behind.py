@@ -0,0 +1,240 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy import insert
+
+from src.db import stats
+from src.db.database import AsyncSessionLocal
+from src.models import sql_models
+from src.utils import metrics
+
+# Write-behind queue for ChatHistory rows. Streams enqueue their user/assistant
+# messages and return immediately; a single background task inserts them in
+# batches, so a long generation never holds a pooled DB connection.
+# Citations are stored as chunk ids in message_citations, never as chunk text.
+# A batch that exhausts its attempts is spooled and replayed on the next start; after
+# CHAT_WRITE_MAX_SPOOLS such rounds its rows go to a dead-letter file instead.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_SPOOL_PATH = os.path.join(BASE_DIR, "data", "chat_spool.jsonl")
+DEFAULT_DEAD_LETTER_PATH = os.path.join(BASE_DIR, "data", "chat_dead_letter.jsonl")
+
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "50"))
+CHAT_WRITE_FLUSH_MS = int(os.getenv("CHAT_WRITE_FLUSH_MS", "250"))
+CHAT_WRITE_MAX_ATTEMPTS = int(os.getenv("CHAT_WRITE_MAX_ATTEMPTS", "5"))
+CHAT_WRITE_MAX_SPOOLS = int(os.getenv("CHAT_WRITE_MAX_SPOOLS", "3"))
+CHAT_WRITE_SPOOL_PATH = os.getenv("CHAT_WRITE_SPOOL_PATH", DEFAULT_SPOOL_PATH)
+CHAT_WRITE_DEAD_LETTER_PATH = os.getenv("CHAT_WRITE_DEAD_LETTER_PATH", DEFAULT_DEAD_LETTER_PATH)
+
+CHAT_COLUMNS = ("thread_id", "user_id", "movie_id", "role", "message", "persona", "created_at")
+
+
+class ChatWriteBehind:
+    def __init__(self, session_factory: Callable = AsyncSessionLocal, batch_size: int = CHAT_WRITE_BATCH_SIZE,
+                 flush_interval: float = CHAT_WRITE_FLUSH_MS / 1000, max_attempts: int = CHAT_WRITE_MAX_ATTEMPTS,
+                 spool_path: str = CHAT_WRITE_SPOOL_PATH, max_spools: int = CHAT_WRITE_MAX_SPOOLS,
+                 dead_letter_path: str = CHAT_WRITE_DEAD_LETTER_PATH):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.spool_path = spool_path
+        self.max_spools = max_spools
+        self.dead_letter_path = dead_letter_path
+        self._pending: List[dict] = []
+        self._attempts = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "failures": 0, "spooled": 0, "replayed": 0,
+                      "dead_lettered": 0}
+
+    # --- Producer side ---
+
+    def enqueue(self, thread_id: str, user_id: Optional[int], movie_id: Optional[int], role: str,
+                message: str, persona: Optional[str] = None, citation_ids: Optional[List[str]] = None) -> None:
+        """Queues a ChatHistory row and its cited chunk ids (in rank order). Must be called from the event loop."""
+        self._pending.append({
+            "thread_id": thread_id,
+            "user_id": user_id,
+            "movie_id": movie_id,
+            "role": role,
+            "message": message,
+            "persona": persona,
+            "citation_ids": [str(cid) for cid in citation_ids or []],
+            # Stamped now so batching never reorders a thread's messages
+            "created_at": datetime.now(timezone.utc),
+        })
+        self.stats["enqueued"] += 1
+        self._ensure_started()
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    # --- Consumer side ---
+
+    def _ensure_started(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._wake = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def start(self) -> None:
+        """Replays rows spooled by a previous run, then starts the flush loop."""
+        self._ensure_started()
+        replayed = self._read_spool()
+        if replayed:
+            from src.utils.logger import logger
+            logger.db(f"Replaying {len(replayed)} spooled chat messages")
+            self._pending[:0] = replayed
+            self.stats["replayed"] += len(replayed)
+            await self.flush()
+
+    async def stop(self) -> None:
+        """Final flush; anything that still cannot be written is spooled to disk."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pending:
+            await self.flush()
+        if self._pending:
+            self._spool(self._pending)
+            self._pending = []
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._pending:
+                await self.flush()
+                if self._pending and self._attempts:
+                    # Back off before retrying a failed batch
+                    await asyncio.sleep(min(self.flush_interval * (2 ** self._attempts), 10))
+
+    async def flush(self) -> int:
+        """Writes every queued row. Returns the number of rows written."""
+        if self._lock is None:
+            self._ensure_started()
+        written = 0
+        async with self._lock:
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                try:
+                    await self._write(batch)
+                except Exception as e:
+                    from src.utils.logger import logger
+                    self._attempts += 1
+                    self.stats["failures"] += 1
+                    logger.error(f"Chat write-behind batch failed (attempt {self._attempts}): {e}")
+                    if self._attempts >= self.max_attempts:
+                        # One bad row fails the whole transaction: retry row by row and give up only on those
+                        failed = await self._write_rows(batch) if len(batch) > 1 else batch
+                        if failed:
+                            self._give_up(failed)
+                        del self._pending[:len(batch)]
+                        self._attempts = 0
+                        written += len(batch) - len(failed)
+                        continue
+                    break
+                del self._pending[:len(batch)]
+                self._attempts = 0
+                written += len(batch)
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+        return written
+
+    async def _write(self, batch: List[dict]) -> None:
+        """Inserts the rows, their citations and counter bumps in one transaction."""
+        async with self.session_factory() as db:
+            chat_ids = (await db.execute(
+                insert(sql_models.ChatHistory).returning(sql_models.ChatHistory.id, sort_by_parameter_order=True),
+                [{c: row.get(c) for c in CHAT_COLUMNS} for row in batch],
+            )).scalars().all()
+            links = [
+                {"chat_id": chat_id, "rank": rank, "chunk_id": chunk_id}
+                for chat_id, row in zip(chat_ids, batch)
+                for rank, chunk_id in enumerate(row.get("citation_ids") or [])
+            ]
+            if links:
+                await db.execute(insert(sql_models.MessageCitation), links)
+            # Bulk inserts skip mapper events, so counters are updated here in the same transaction
+            await db.run_sync(lambda s: stats.record_chat_rows(s.connection(), batch))
+            await db.commit()
+
+    async def _write_rows(self, batch: List[dict]) -> List[dict]:
+        """Writes each row in its own transaction, in order. Returns the rows that still fail."""
+        failed = []
+        for row in batch:
+            try:
+                await self._write([row])
+            except Exception:
+                failed.append(row)
+                continue
+            self.stats["written"] += 1
+        if failed:
+            from src.utils.logger import logger
+            logger.error(f"Chat write-behind: {len(failed)} of {len(batch)} rows failed on their own")
+        return failed
+
+    # --- Durable spool ---
+
+    def _give_up(self, batch: List[dict]) -> None:
+        """Spools a batch that exhausted its attempts; rows that already failed max_spools runs are dead-lettered."""
+        for row in batch:
+            row["failed_runs"] = row.get("failed_runs", 0) + 1
+        retry = [row for row in batch if row["failed_runs"] < self.max_spools]
+        dead = [row for row in batch if row["failed_runs"] >= self.max_spools]
+        if retry:
+            self._spool(retry)
+        if dead:
+            from src.utils.logger import logger
+            self._append_jsonl(self.dead_letter_path, dead)
+            self.stats["dead_lettered"] += len(dead)
+            logger.error(f"Dead-lettered {len(dead)} chat messages to {self.dead_letter_path} after "
+                         f"{self.max_spools} failed runs", threads=sorted({row["thread_id"] for row in dead}))
+
+    def _spool(self, rows: List[dict]) -> None:
+        from src.utils.logger import logger
+        self._append_jsonl(self.spool_path, rows)
+        self.stats["spooled"] += len(rows)
+        logger.error(f"Spooled {len(rows)} chat messages to {self.spool_path}")
+
+    @staticmethod
+    def _append_jsonl(path: str, rows: List[dict]) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({**row, "created_at": row["created_at"].isoformat()}) + "\n")
+
+    def _read_spool(self) -> List[dict]:
+        if not os.path.exists(self.spool_path):
+            return []
+        rows = []
+        with open(self.spool_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    row["created_at"] = datetime.fromisoformat(row["created_at"])
+                    if "citations" in row:
+                        # Spooled before citations were normalized
+                        from src.db.migrations.m0002_message_citations import legacy_citation_ids
+                        row["citation_ids"] = legacy_citation_ids(row.pop("citations"))
+                    rows.append(row)
+        os.remove(self.spool_path)
+        return rows
+
+
+chat_writer = ChatWriteBehind()
+metrics.QUEUE_DEPTH.set_function(chat_writer.pending, queue="chat_write_behind")
@@ -9,6 +9,11 @@ from src.api.endpoints import auth
 from src.api.endpoints import history
 from src.api.endpoints import movies
 from src.api.endpoints import discussions
+from src.api.endpoints import chunks
+from src.api.endpoints import debug
+from src.api.endpoints import usage
+from src.utils import metrics, tracing
+from src.utils.logger import logger
 import time
 
 app = FastAPI(title="FilmSumaRAG API", version="1.0.0")
@@ -20,18 +25,61 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Request-ID"],
 )
 
+def _endpoint_label(path: str) -> str:
+    # First path segment of a known route, so arbitrary URLs can't explode label cardinality
+    if not hasattr(app.state, "route_prefixes"):
+        app.state.route_prefixes = {r.path.strip("/").split("/")[0] for r in app.routes if hasattr(r, "path")}
+    head = path.strip("/").split("/")[0]
+    if not head:
+        return "root"
+    return head if head in app.state.route_prefixes else "other"
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    print(f"DEBUG: {request.method} {request.url}")
+    endpoint = _endpoint_label(request.url.path)
+    metrics.endpoint_label.set(endpoint)
+    request_id = tracing.new_request_id(request.headers.get("x-request-id"))
+    root, trace_tokens = tracing.begin_request(request_id, "http.request", method=request.method,
+                                               path=request.url.path, endpoint=endpoint)
+    start = time.perf_counter()
+    status = 500
     try:
         response = await call_next(request)
-        print(f"DEBUG: Response status: {response.status_code}")
-        return response
+        status = response.status_code
     except Exception as e:
-        print(f"DEBUG: Error processing request: {e}")
+        logger.error(f"Error processing {request.method} {request.url.path}: {e}", exc_info=e)
+        tracing.finish_request(root, e, status=status)
         raise
+    finally:
+        elapsed = time.perf_counter() - start
+        logger.http(f"{request.method} {request.url.path} {status}", method=request.method, path=request.url.path,
+                    status=status, duration_ms=round(elapsed * 1000, 2))
+        tracing.reset_request(trace_tokens)
+        metrics.HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=status)
+        metrics.HTTP_REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method)
+
+    response.headers["X-Request-ID"] = request_id
+    # The root span closes once the body has been sent, so SSE streams are traced end to end
+    body = response.body_iterator
+
+    async def traced_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        except BaseException as e:
+            # Includes client disconnects (GeneratorExit); no awaiting past this point
+            tracing.finish_request(root, e, status=status)
+            raise
+        tracing.finish_request(root, status=status)
+        if tracing.TRACE_EXPORT_PATH and root is not None:
+            import asyncio
+            await asyncio.to_thread(tracing.export_trace, request_id)
+
+    response.body_iterator = traced_body()
+    return response
 
 # Include routers
 app.include_router(summary.router, tags=["Summary"])
@@ -43,17 +91,130 @@ app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(history.router, prefix="/history", tags=["History"])
 app.include_router(movies.router, prefix="/movies", tags=["Movies"])
 app.include_router(discussions.router, prefix="/discussions", tags=["Discussions"])
+app.include_router(chunks.router, tags=["Chunks"])
+app.include_router(debug.router, prefix="/debug", tags=["Debug"])
+app.include_router(usage.router, prefix="/usage", tags=["Usage"])
 
 @app.get("/", tags=["Health"])
 async def root():
     return {"status": "ok", "message": "API is running"}
 
+@app.get("/metrics", tags=["Health"])
+async def metrics_endpoint():
+    # Prometheus text exposition of this worker's in-process registry
+    from fastapi.responses import PlainTextResponse
+    if not metrics.METRICS_ENABLED:
+        return PlainTextResponse("metrics disabled\n", status_code=404)
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/healthz", tags=["Health"])
+async def healthz():
+    # Liveness: the process is up and serving; never touches the DB or models
+    return {"status": "ok"}
+
+@app.get("/readyz", tags=["Health"])
+async def readyz():
+    # Readiness: warm-up stages (DB, vector index, embedder, LLM client) have loaded
+    from fastapi.responses import JSONResponse
+    from src.core import warmup
+    ready = warmup.is_ready()
+    body = {"status": "ready" if ready else "starting", "warmup_enabled": warmup.WARMUP_ENABLED, "stages": warmup.stages()}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
 @app.on_event("startup")
 def startup_event():
     # Create tables if they don't exist
     from src.db.database import Base, engine
     from src.models import sql_models
     Base.metadata.create_all(bind=engine)
+    # Bring existing databases up to date (indexes, constraints)
+    from src.db.migrations import run_migrations
+    run_migrations(engine)
+
+@app.on_event("startup")
+async def start_warmup():
+    # Loads the heavy singletons in the background; /readyz reports progress
+    import asyncio
+    from src.core import warmup
+    if warmup.WARMUP_ENABLED:
+        app.state.warmup = asyncio.create_task(warmup.run_warmup())
+
+@app.on_event("shutdown")
+async def stop_warmup():
+    # Required stages retry until they load; don't leave that loop running past shutdown
+    task = getattr(app.state, "warmup", None)
+    if task is not None:
+        task.cancel()
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    # Event-loop lag metric plus stack sampling of blocking calls (/debug/blockers)
+    from src.utils.loop_monitor import LOOP_MONITOR_ENABLED, loop_monitor
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    from src.utils.loop_monitor import loop_monitor
+    await loop_monitor.stop()
+
+@app.on_event("startup")
+async def start_memory_governor():
+    # Sheds caches and gates ingestion when RSS crosses the soft/hard watermarks
+    from src.core.memory_governor import MEMORY_GOVERNOR_ENABLED, get_governor
+    if MEMORY_GOVERNOR_ENABLED:
+        get_governor().start()
+
+@app.on_event("shutdown")
+async def stop_memory_governor():
+    from src.core.memory_governor import get_governor
+    await get_governor().stop()
+
+@app.on_event("startup")
+async def start_chat_writer():
+    # Replays spooled chat messages and starts the batched ChatHistory writer
+    from src.db.write_behind import chat_writer
+    await chat_writer.start()
+
+@app.on_event("shutdown")
+async def stop_chat_writer():
+    from src.db.write_behind import chat_writer
+    await chat_writer.stop()
+
+@app.on_event("startup")
+async def start_usage_recorder():
+    # LLM token accounting rows are flushed in the background as well
+    from src.db.llm_usage import usage_recorder
+    usage_recorder.start()
+
+@app.on_event("shutdown")
+async def stop_usage_recorder():
+    from src.db.llm_usage import usage_recorder
+    await usage_recorder.stop()
+
+@app.on_event("startup")
+async def start_stats_reconciler():
+    # Backfills empty engagement counters (upgraded databases), then periodically repairs
+    # drift for the movies that changed since the previous pass; never blocks startup
+    import asyncio
+    from src.db import stats
+
+    async def reconcile_loop():
+        since = None
+        while True:
+            try:
+                _, since = await asyncio.to_thread(stats.reconcile_pass, since)
+            except Exception as e:
+                logger.error(f"Stats reconciliation failed: {e}")
+            await asyncio.sleep(stats.STATS_RECONCILE_INTERVAL_SECONDS)
+
+    app.state.stats_reconciler = asyncio.create_task(reconcile_loop())
+
+@app.on_event("shutdown")
+async def stop_stats_reconciler():
+    task = getattr(app.state, "stats_reconciler", None)
+    if task is not None:
+        task.cancel()
 
 if __name__ == "__main__":
     import uvicorn
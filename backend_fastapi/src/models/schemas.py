@@ -41,10 +41,24 @@ class ChatHistoryResponse(ChatHistoryBase):
     id: int
     created_at: datetime
     tmdb_id: Optional[int] = None
+    citation_ids: List[str] = [] # Resolve text via the vector store on demand
     
     class Config:
         from_attributes = True
 
+class ThreadSummaryResponse(BaseModel):
+    thread_id: str
+    message_count: int
+    started_at: Optional[datetime] = None
+    last_message_id: int
+    last_message: str
+    last_role: str
+    last_message_at: Optional[datetime] = None
+    persona: Optional[str] = None
+    movie_id: Optional[int] = None
+    tmdb_id: Optional[int] = None
+    movie_title: Optional[str] = None
+
 class FeedbackRate(BaseModel):
     clerk_id: str
     tmdb_id: int
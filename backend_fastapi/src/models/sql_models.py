@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Text, Boolean, Index, Float
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from src.db.database import Base
@@ -32,6 +32,9 @@ class User(Base):
 
 class UserHiddenMovie(Base):
     __tablename__ = "user_hidden_movies"
+    __table_args__ = (
+        Index("uq_user_hidden_movie", "user_id", "movie_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -43,6 +46,9 @@ class UserHiddenMovie(Base):
 
 class UserMovieEngagement(Base):
     __tablename__ = "user_movie_engagements"
+    __table_args__ = (
+        Index("uq_user_movie_engagement", "user_id", "movie_id", "engagement_type", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -83,6 +89,10 @@ class SummaryType(str, enum.Enum):
 
 class SummaryCache(Base):
     __tablename__ = "summary_cache"
+    __table_args__ = (
+        # One cached summary per movie and type
+        Index("uq_summary_cache_movie_type", "movie_id", "summary_type", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     movie_id = Column(Integer, ForeignKey("movies.id"))
@@ -94,6 +104,10 @@ class SummaryCache(Base):
 
 class ChatHistory(Base):
     __tablename__ = "chat_history"
+    __table_args__ = (
+        Index("ix_chat_history_thread_user_id", "thread_id", "user_id", "id"),
+        Index("ix_chat_history_user_id_id", "user_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     thread_id = Column(String, index=True) # LangGraph/LangChain thread UUID
@@ -101,19 +115,63 @@ class ChatHistory(Base):
     movie_id = Column(Integer, ForeignKey("movies.id"))
     role = Column(String) # "user" or "assistant"
     message = Column(Text)
-    citations = Column(Text, nullable=True) # JSON list of chunk IDs used
+    citations = Column(Text, nullable=True) # Legacy JSON blob; cited chunks now live in message_citations
     persona = Column(String, default="critic") # "critic", "philosopher", etc.
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", back_populates="chats")
     movie = relationship("Movie", back_populates="chats")
+    citation_links = relationship("MessageCitation", order_by="MessageCitation.rank", cascade="all, delete-orphan")
 
     @property
     def tmdb_id(self):
         return self.movie.tmdb_id if self.movie else None
 
+    @property
+    def citation_ids(self):
+        return [c.chunk_id for c in self.citation_links]
+
+class MessageCitation(Base):
+    """One cited vector-store chunk per row; the chunk text stays in the vector store."""
+    __tablename__ = "message_citations"
+    __table_args__ = (
+        Index("ix_message_citations_chunk_id", "chunk_id"),
+    )
+
+    chat_id = Column(Integer, ForeignKey("chat_history.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, primary_key=True) # Position in the cited sources, 0 = top
+    chunk_id = Column(String, nullable=False) # Vector store id, "<tmdb_id>_<chunk_index>"
+
+class LLMUsage(Base):
+    """One row per LLM call: token counts (reported by the provider or estimated) and cost."""
+    __tablename__ = "llm_usage"
+    __table_args__ = (
+        Index("ix_llm_usage_created_at", "created_at"),
+        Index("ix_llm_usage_tmdb_id_created_at", "tmdb_id", "created_at"),
+        Index("ix_llm_usage_user_id_created_at", "user_id", "created_at"),
+        Index("ix_llm_usage_request_id", "request_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    request_id = Column(String, nullable=True) # Trace id of the HTTP/WS request that made the call
+    call_site = Column(String, nullable=False) # "rag_generate", "summary_chunk", "research_search", ...
+    model = Column(String, nullable=True)
+    persona = Column(String, nullable=True)
+    tmdb_id = Column(Integer, nullable=True) # Primary film; calls are recorded off the request path, so no movies FK lookup
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    thread_id = Column(String, nullable=True)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    estimated = Column(Boolean, nullable=False, default=False) # True when the provider reported no usage
+    cached = Column(Boolean, nullable=False, default=False) # Served by the completion cache, nothing billed
+    cost_usd = Column(Float, nullable=False, default=0.0)
+
 class Feedback(Base):
     __tablename__ = "feedback"
+    __table_args__ = (
+        Index("ix_feedback_movie_downvote_rating", "movie_id", "downvote", "rating"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -156,3 +214,36 @@ class ForumReply(Base):
 
     post = relationship("ForumPost", back_populates="replies")
     user = relationship("User", back_populates="replies")
+
+class MovieStats(Base):
+    """Denormalized per-movie counters, maintained on write by src.db.stats."""
+    __tablename__ = "movie_stats"
+
+    movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
+    summary_count = Column(Integer, nullable=False, default=0)
+    chat_message_count = Column(Integer, nullable=False, default=0)
+    chat_thread_count = Column(Integer, nullable=False, default=0)
+    post_count = Column(Integer, nullable=False, default=0)
+    reply_count = Column(Integer, nullable=False, default=0)
+    engagement_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    movie = relationship("Movie")
+
+class UserMovieStats(Base):
+    """Denormalized per-(user, movie) counters, maintained on write by src.db.stats."""
+    __tablename__ = "user_movie_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
+    chat_message_count = Column(Integer, nullable=False, default=0)
+    chat_thread_count = Column(Integer, nullable=False, default=0)
+    post_count = Column(Integer, nullable=False, default=0)
+    reply_count = Column(Integer, nullable=False, default=0)
+    engagement_count = Column(Integer, nullable=False, default=0)
+    summary_engagements = Column(Integer, nullable=False, default=0)
+    deep_dive_engagements = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# Registers the counter-maintenance mapper events (needs the classes above)
+from src.db import stats  # noqa: E402,F401
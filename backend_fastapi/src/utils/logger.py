@@ -1,36 +1,126 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+import time
+import zlib
 import colorama
 from colorama import Fore, Style
 
+from src.utils.tracing import current_request_id
+
 # Initialize colorama for Windows terminal support
 colorama.init()
 
+# Records are queued by the caller and written to stdout by a QueueListener thread, so the
+# event loop never blocks on the terminal. LOG_FORMAT=json (default) emits one JSON object
+# per line; LOG_FORMAT=dev keeps the colorized "[TAG] message" output.
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+# Fraction of requests whose DEBUG records are kept (decided per request id, so a sampled
+# request keeps its whole retrieval trail). INFO and above are never sampled.
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "tag": getattr(record, "tag", record.name),
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            payload["request_id"] = record.request_id
+        payload.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class DevFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        color = getattr(record, "color", Fore.WHITE)
+        label = getattr(record, "label", record.name)
+        fields = getattr(record, "fields", None) or {}
+        extras = " ".join(f"{k}={v}" for k, v in fields.items())
+        line = f"{Style.BRIGHT}{color}[{label}]{Style.RESET_ALL} {record.getMessage()}"
+        if extras:
+            line += f" {Style.DIM}{extras}{Style.RESET_ALL}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: records are dropped (and counted) when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread; records only carry plain values
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def debug_sampled(rate: float = None) -> bool:
+    rate = LOG_DEBUG_SAMPLE_RATE if rate is None else rate
+    if rate >= 1:
+        return True
+    if rate <= 0:
+        return False
+    request_id = current_request_id.get()
+    if request_id is None:
+        return random.random() < rate
+    return (zlib.crc32(request_id.encode("utf-8")) % 10000) < rate * 10000
+
+
 class ArchiveLogger:
     def __init__(self):
         self.logger = logging.getLogger("FilmSuma")
-        self.logger.setLevel(logging.DEBUG)
-        
-        # Format: [TAG] Message
-        formatter = logging.Formatter('%(message)s')
-        
-        # Console Handler
-        ch = logging.StreamHandler(sys.stdout)
-        ch.setFormatter(formatter)
-        self.logger.addHandler(ch)
-
-    def log(self, tag, message, color=Fore.WHITE):
-        """Standardized tagged logging"""
-        formatted_msg = f"{Style.BRIGHT}{color}[{tag}]{Style.RESET_ALL} {message}"
-        self.logger.info(formatted_msg)
+        self.logger.setLevel(LOG_LEVEL)
+        self.logger.propagate = False
+
+        # Console handler, driven by the listener thread
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(DevFormatter() if LOG_FORMAT == "dev" else JsonFormatter())
+        self.queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        self.logger.addHandler(self.queue_handler)
+        self.listener = logging.handlers.QueueListener(self.queue_handler.queue, console)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def log(self, tag, message, color=Fore.WHITE, level=logging.INFO, label=None, exc_info=None, **fields):
+        """Standardized tagged logging; keyword arguments become structured fields."""
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < logging.INFO and not debug_sampled():
+            return
+        self.logger.log(level, message, exc_info=exc_info, extra={
+            "tag": tag, "label": label or tag, "color": color,
+            "request_id": current_request_id.get(), "fields": fields,
+        })
 
     # Specific helper tags
-    def rag(self, message): self.log("🔍 RAG::RETRIEVE", message, Fore.CYAN)
-    def active_learning(self, message): self.log("⚖️ RAG::PENALTY", message, Fore.YELLOW)
-    def agent(self, message): self.log("🧠 AGENTS::THINK", message, Fore.MAGENTA)
-    def db(self, message): self.log("💾 DB::ARCHIVE", message, Fore.GREEN)
-    def error(self, message): self.log("🚨 SYSTEM::ERROR", message, Fore.RED)
-    def worker(self, message): self.log("👷 WORKER::TASK", message, Fore.BLUE)
-    def fetch(self, message): self.log("📥 FETCH::DATA", message, Fore.WHITE)
+    def rag(self, message, **kw): self.log("rag", message, Fore.CYAN, label="🔍 RAG::RETRIEVE", **kw)
+    def active_learning(self, message, **kw): self.log("penalty", message, Fore.YELLOW, label="⚖️ RAG::PENALTY", **kw)
+    def agent(self, message, **kw): self.log("agent", message, Fore.MAGENTA, label="🧠 AGENTS::THINK", **kw)
+    def db(self, message, **kw): self.log("db", message, Fore.GREEN, label="💾 DB::ARCHIVE", **kw)
+    def error(self, message, **kw): self.log("error", message, Fore.RED, level=logging.ERROR, label="🚨 SYSTEM::ERROR", **kw)
+    def worker(self, message, **kw): self.log("worker", message, Fore.BLUE, label="👷 WORKER::TASK", **kw)
+    def fetch(self, message, **kw): self.log("fetch", message, Fore.WHITE, label="📥 FETCH::DATA", **kw)
+    def http(self, message, **kw): self.log("http", message, Fore.WHITE, label="🌐 HTTP::ACCESS", **kw)
 
 logger = ArchiveLogger()
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional
+
+from src.utils import metrics
+
+# Event-loop watchdog. A heartbeat coroutine wakes every LOOP_LAG_INTERVAL_MS and records
+# how late it was (filmsuma_event_loop_lag_seconds). A sampling thread checks the heartbeat;
+# once it is overdue by LOOP_BLOCK_THRESHOLD_MS it snapshots the loop thread's stack and
+# charges the blocked time to the innermost application frame, giving a ranked list of
+# blocking call sites at GET /debug/blockers.
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() not in ("0", "false", "no")
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+LOOP_BLOCKERS_MAX = int(os.getenv("LOOP_BLOCKERS_MAX", "200"))
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_THIS_FILE = os.path.abspath(__file__)
+
+EVENT_LOOP_LAG_SECONDS = metrics.registry.register(metrics.Histogram(
+    "filmsuma_event_loop_lag_seconds", "How late the event-loop heartbeat woke up.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)))
+EVENT_LOOP_BLOCKS = metrics.registry.register(metrics.Counter(
+    "filmsuma_event_loop_blocks_total", "Episodes where the event loop was blocked past the threshold."))
+EVENT_LOOP_BLOCKED_SECONDS = metrics.registry.register(metrics.Counter(
+    "filmsuma_event_loop_blocked_seconds_total", "Sampled time the event loop spent blocked past the threshold."))
+
+
+def _is_app_frame(filename: str) -> bool:
+    path = os.path.abspath(filename)
+    return path.startswith(_APP_ROOT) and path != _THIS_FILE and "site-packages" not in path
+
+
+def call_site(frames: List[traceback.FrameSummary]) -> str:
+    """Innermost frame in our own code (falls back to the innermost frame overall)."""
+    for frame in reversed(frames):
+        if _is_app_frame(frame.filename):
+            return f"{os.path.relpath(frame.filename, _APP_ROOT)}:{frame.lineno} ({frame.name})"
+    if frames:
+        return f"{frames[-1].filename}:{frames[-1].lineno} ({frames[-1].name})"
+    return "<unknown>"
+
+
+class LoopMonitor:
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS, threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS,
+                 max_sites: int = LOOP_BLOCKERS_MAX):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.max_sites = max_sites
+        self._blockers: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._last_beat = 0.0
+        self._loop_thread: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.max_lag = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._heartbeat is not None and not self._heartbeat.done()
+
+    def start(self) -> None:
+        """Must be called from the event loop being watched."""
+        if self.running:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop.clear()
+        self._heartbeat = asyncio.get_running_loop().create_task(self._beat())
+        self._sampler = threading.Thread(target=self._sample, name="loop-monitor", daemon=True)
+        self._sampler.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+        if self._sampler is not None:
+            await asyncio.to_thread(self._sampler.join, 1.0)
+            self._sampler = None
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            self.max_lag = max(self.max_lag, lag)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+
+    def _sample(self) -> None:
+        # Poll at a fraction of the threshold; one episode = one stretch without a heartbeat
+        poll = max(0.005, self.threshold / 4)
+        episode_beat = None
+        last_sample = time.perf_counter()
+        while not self._stop.wait(poll):
+            now = time.perf_counter()
+            elapsed, last_sample = now - last_sample, now
+            overdue = now - self._last_beat - self.interval
+            if overdue < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            frames = traceback.extract_stack(frame)
+            new_episode = episode_beat != self._last_beat
+            episode_beat = self._last_beat
+            self._record(frames, overdue, min(elapsed, overdue) if not new_episode else overdue, new_episode)
+
+    def _record(self, frames: List[traceback.FrameSummary], overdue: float, charged: float, new_episode: bool) -> None:
+        site = call_site(frames)
+        with self._lock:
+            entry = self._blockers.get(site)
+            if entry is None:
+                if len(self._blockers) >= self.max_sites:
+                    # Evict the least significant site to keep memory bounded
+                    del self._blockers[min(self._blockers, key=lambda k: self._blockers[k]["blocked_seconds"])]
+                entry = self._blockers[site] = {"site": site, "episodes": 0, "samples": 0, "blocked_seconds": 0.0, "max_blocked_ms": 0.0}
+            entry["samples"] += 1
+            entry["episodes"] += 1 if new_episode else 0
+            entry["blocked_seconds"] += charged
+            entry["max_blocked_ms"] = max(entry["max_blocked_ms"], overdue * 1000)
+            entry["last_seen"] = time.time()
+            entry["stack"] = [f"{os.path.relpath(f.filename, _APP_ROOT) if _is_app_frame(f.filename) else f.filename}:{f.lineno} in {f.name}"
+                              for f in frames[-12:]]
+        EVENT_LOOP_BLOCKED_SECONDS.inc(charged)
+        if new_episode:
+            EVENT_LOOP_BLOCKS.inc()
+            from src.utils.logger import logger
+            logger.log("loop", f"Event loop blocked for {overdue * 1000:.0f}ms at {site}", level=logging.WARNING,
+                       label="⏱️ LOOP::BLOCKED", site=site, blocked_ms=round(overdue * 1000, 1))
+
+    def top_blockers(self, limit: int = 20) -> List[dict]:
+        with self._lock:
+            entries = [dict(e, blocked_seconds=round(e["blocked_seconds"], 4)) for e in self._blockers.values()]
+        return sorted(entries, key=lambda e: e["blocked_seconds"], reverse=True)[:limit]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._blockers.clear()
+        self.max_lag = 0.0
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,151 @@
+import os
+import threading
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from src.utils import metrics
+
+# Memory accounting. Caches, indexes and models register an estimator returning their
+# approximate footprint in bytes (plus optional details); GET /debug/memory reports them
+# next to the process RSS. Estimators must be cheap and must not load anything lazy.
+# tracemalloc snapshots are opt-in (TRACEMALLOC_ENABLED or the debug endpoint) because
+# tracing every allocation costs CPU and memory.
+TRACEMALLOC_ENABLED = os.getenv("TRACEMALLOC_ENABLED", "false").lower() in ("1", "true", "yes")
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "1"))
+
+MEMORY_BYTES = metrics.registry.register(metrics.Gauge(
+    "filmsuma_memory_bytes", "Estimated bytes held per component; component=\"rss\" is the process RSS.", ("component",)))
+
+
+class _Component:
+    def __init__(self, name: str, estimate: Callable[[], int], details: Optional[Callable[[], dict]],
+                 shrink: Optional[Callable[[float], None]], priority: int):
+        self.name = name
+        self.estimate = estimate
+        self.details = details
+        self.shrink = shrink
+        self.priority = priority
+
+
+_components: Dict[str, _Component] = {}
+_lock = threading.Lock()
+
+
+def register(name: str, estimate: Callable[[], int], details: Optional[Callable[[], dict]] = None,
+             shrink: Optional[Callable[[float], None]] = None, priority: int = 100) -> None:
+    """Adds (or replaces) a component; estimate() returns its approximate size in bytes.
+    Caches also pass shrink(fraction), which drops that share of their entries (1.0 = clear);
+    the memory governor calls them in ascending priority under pressure."""
+    with _lock:
+        _components[name] = _Component(name, estimate, details, shrink, priority)
+    MEMORY_BYTES.set_function(lambda: float(estimate()), component=name)
+
+
+def unregister(name: str) -> None:
+    with _lock:
+        _components.pop(name, None)
+    MEMORY_BYTES.remove(component=name)
+
+
+def shrinkable() -> List[_Component]:
+    with _lock:
+        return sorted((c for c in _components.values() if c.shrink is not None), key=lambda c: c.priority)
+
+
+def rss_bytes() -> int:
+    import psutil
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+def components() -> List[dict]:
+    with _lock:
+        registered = list(_components.values())
+    report = []
+    for component in registered:
+        item = {"name": component.name, "shrinkable": component.shrink is not None}
+        try:
+            item["bytes"] = int(component.estimate())
+            if component.details is not None:
+                item["details"] = component.details()
+        except Exception as e:
+            item["bytes"] = 0
+            item["error"] = f"{type(e).__name__}: {e}"
+        report.append(item)
+    return sorted(report, key=lambda c: c["bytes"], reverse=True)
+
+
+def report() -> dict:
+    rss = rss_bytes()
+    items = components()
+    tracked = sum(c["bytes"] for c in items)
+    return {
+        "rss_bytes": rss,
+        "tracked_bytes": tracked,
+        "untracked_bytes": max(0, rss - tracked),  # interpreter, libraries, allocator slack
+        "components": items,
+        "tracemalloc": tracemalloc_status(),
+    }
+
+
+MEMORY_BYTES.set_function(lambda: float(rss_bytes()), component="rss")
+
+
+# --- tracemalloc ---
+
+_baseline: Optional[tracemalloc.Snapshot] = None
+
+
+def tracemalloc_status() -> dict:
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    current, peak = tracemalloc.get_traced_memory()
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit(), "traced_bytes": current,
+            "peak_bytes": peak, "overhead_bytes": tracemalloc.get_tracemalloc_memory()}
+
+
+def start_tracemalloc(frames: int = TRACEMALLOC_FRAMES) -> None:
+    global _baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        _baseline = None
+
+
+def stop_tracemalloc() -> None:
+    global _baseline
+    tracemalloc.stop()
+    _baseline = None
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+def _stat_dict(stat) -> dict:
+    item = {"location": [f"{f.filename}:{f.lineno}" for f in stat.traceback], "bytes": stat.size, "count": stat.count}
+    if hasattr(stat, "size_diff"):
+        item.update(bytes_diff=stat.size_diff, count_diff=stat.count_diff)
+    return item
+
+
+def top_allocations(limit: int = 20, group_by: str = "lineno", diff: bool = False) -> dict:
+    """Top allocation sites; with diff=True, growth since the previous call (which becomes the new baseline)."""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running")
+    snapshot = _snapshot()
+    if diff and _baseline is not None:
+        stats = snapshot.compare_to(_baseline, group_by)
+        result = {"mode": "diff", "stats": [_stat_dict(s) for s in stats[:limit]]}
+    else:
+        stats = snapshot.statistics(group_by)
+        result = {"mode": "snapshot", "stats": [_stat_dict(s) for s in stats[:limit]]}
+    _baseline = snapshot
+    return result
+
+
+if TRACEMALLOC_ENABLED:
+    start_tracemalloc()
@@ -0,0 +1,29 @@
+from typing import Callable, List, Optional
+
+from fastapi import Response
+
+# Keyset (cursor) pagination shared by the listing endpoints.
+# The cursor is the last seen id; the next one is returned in the X-Next-Cursor header
+# so response bodies stay plain lists.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def keyset_page(query, column, cursor: Optional[int], limit: Optional[int], response: Response,
+                descending: bool = False, key: Optional[Callable] = None) -> List:
+    """
+    Applies `column > cursor` (or `<` when descending), orders by column and fetches
+    limit + 1 rows to learn whether another page exists.
+    `key` extracts the cursor value from a result row (defaults to row.id).
+    """
+    if cursor is not None:
+        query = query.filter(column < cursor if descending else column > cursor)
+    query = query.order_by(column.desc() if descending else column.asc())
+    if not limit:
+        return query.all()
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = str(key(last) if key else last.id)
+    return rows
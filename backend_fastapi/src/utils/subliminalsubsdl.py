@@ -1,5 +1,3 @@
-from subliminal import download_best_subtitles, Video
-from babelfish import Language
 from pathlib import Path
 import pysubs2
 import io
@@ -28,6 +26,9 @@ def extract_text_from_bytes(subtitle_bytes: bytes, encoding='utf-8'):
     return [clean_text(event.text) for event in subs if event.text.strip()]
 
 def download_subs_lines(moviename):
+    # subliminal pulls in its provider plugins on import; only pay for it when subtitles are needed
+    from subliminal import download_best_subtitles, Video
+    from babelfish import Language
     vidfile = moviename + ".mp4"
     video = Video.fromname(Path(vidfile).name)
     subs = download_best_subtitles([video], {Language('eng')})
@@ -0,0 +1,308 @@
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.utils import memory
+
+# Lightweight request tracing. The HTTP middleware starts a trace per request (id taken
+# from X-Request-ID or generated); contextvars carry it into LangGraph nodes, vector
+# store calls, SQLAlchemy cursor events and LLM calls, which record spans. Finished
+# traces live in an in-memory ring buffer (GET /debug/traces/{id}) and can also be
+# appended to a file as OTLP/JSON, one ExportTraceServiceRequest per line.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() not in ("0", "false", "no")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "256"))
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "500"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "filmsuma-api")
+
+# Rough CPython cost of one buffered Span with its attribute dict (estimate)
+_SPAN_BYTES = 600
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, object] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_unix_ms": self.start_ns / 1e6,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+current_request_id: ContextVar[Optional[str]] = ContextVar("current_request_id", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class TraceBuffer:
+    """Keeps the spans of the most recent traces; the oldest trace is dropped first."""
+
+    def __init__(self, max_traces: int, max_spans: int):
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            if len(spans) < self.max_spans:
+                spans.append(span)
+
+    def get(self, trace_id: str) -> Optional[List[Span]]:
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return list(spans) if spans is not None else None
+
+    def recent(self, limit: int = 50) -> List[str]:
+        with self._lock:
+            return list(self._traces)[-limit:][::-1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+    def shrink(self, fraction: float) -> None:
+        with self._lock:
+            for _ in range(int(len(self._traces) * fraction + 0.999)):
+                self._traces.popitem(last=False)
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(len(spans) for spans in self._traces.values()) * _SPAN_BYTES
+
+
+trace_buffer = TraceBuffer(TRACE_BUFFER_SIZE, TRACE_MAX_SPANS)
+memory.register("trace_buffer", trace_buffer.nbytes, lambda: {"traces": len(trace_buffer.recent(TRACE_BUFFER_SIZE))},
+                shrink=trace_buffer.shrink, priority=40)
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Reuses a well-formed incoming X-Request-ID, otherwise generates one."""
+    if incoming and _REQUEST_ID_RE.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+def _span_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """Opens a child of the current span; None when no trace is active. Pair with end_span()."""
+    request_id = current_request_id.get()
+    if not TRACING_ENABLED or request_id is None:
+        return None
+    parent = _current_span.get()
+    return Span(trace_id=request_id, span_id=_span_id(), parent_id=parent.span_id if parent else None,
+                name=name, start_ns=time.time_ns(), attributes=attributes)
+
+
+def end_span(span: Optional[Span], error: Optional[BaseException] = None) -> None:
+    if span is None:
+        return
+    span.end_ns = time.time_ns()
+    if error is not None:
+        span.error = f"{type(error).__name__}: {str(error)[:200]}"
+    trace_buffer.add(span)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Records a span around the block; a no-op outside a traced request."""
+    current = start_span(name, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        end_span(current, e)
+        raise
+    else:
+        end_span(current)
+    finally:
+        _current_span.reset(token)
+
+
+def traced(name: str):
+    """Decorator form of span() for plain (blocking) functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def begin_request(request_id: str, name: str, **attributes):
+    """Opens the root span of a request and makes it current. Returns (root, tokens); the root
+    is ended separately with finish_request() because streamed bodies outlive the handler."""
+    id_token = current_request_id.set(request_id)
+    root = start_span(name, **attributes)
+    return root, (id_token, _current_span.set(root))
+
+
+def reset_request(tokens) -> None:
+    id_token, span_token = tokens
+    _current_span.reset(span_token)
+    current_request_id.reset(id_token)
+
+
+def finish_request(root: Optional[Span], error: Optional[BaseException] = None, **attributes) -> None:
+    if root is None:
+        return
+    root.attributes.update(attributes)
+    end_span(root, error)
+
+
+@contextmanager
+def request_trace(request_id: str, name: str, **attributes):
+    """Root span for non-HTTP units of work (e.g. one WebSocket question)."""
+    root, tokens = begin_request(request_id, name, **attributes)
+    try:
+        yield root
+    except BaseException as e:
+        finish_request(root, e)
+        raise
+    else:
+        finish_request(root)
+    finally:
+        reset_request(tokens)
+
+
+def get_trace(request_id: str) -> Optional[dict]:
+    spans = trace_buffer.get(request_id)
+    if spans is None:
+        return None
+    spans.sort(key=lambda s: s.start_ns)
+    start = spans[0].start_ns
+    end = max((s.end_ns or s.start_ns) for s in spans)
+    return {"request_id": request_id, "duration_ms": (end - start) / 1e6, "spans": [s.to_dict() for s in spans]}
+
+
+# --- OTLP/JSON export ---
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_trace_id(request_id: str) -> str:
+    # OTLP trace ids are 16 bytes; generated request ids already are, client-supplied ones are hashed
+    if re.fullmatch(r"[0-9a-f]{32}", request_id):
+        return request_id
+    return hashlib.md5(request_id.encode("utf-8")).hexdigest()
+
+
+def to_otlp(request_id: str) -> Optional[dict]:
+    spans = trace_buffer.get(request_id)
+    if spans is None:
+        return None
+    trace_id = _otlp_trace_id(request_id)
+    otlp_spans = []
+    for s in spans:
+        item = {
+            "traceId": trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 2 if s.parent_id is None else 1,  # SERVER for the root, INTERNAL otherwise
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns or s.start_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in {**s.attributes, "request.id": request_id}.items()],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            item["parentSpanId"] = s.parent_id
+        otlp_spans.append(item)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "filmsuma.tracing"}, "spans": otlp_spans}],
+    }]}
+
+
+_export_lock = threading.Lock()
+
+
+def export_trace(request_id: str, path: str = "") -> bool:
+    """Appends the trace as one OTLP/JSON line to TRACE_EXPORT_PATH (no-op when unset)."""
+    path = path or TRACE_EXPORT_PATH
+    if not path:
+        return False
+    payload = to_otlp(request_id)
+    if payload is None:
+        return False
+    with _export_lock:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload) + "\n")
+    return True
+
+
+# --- SQLAlchemy cursor events (every engine, sync and async) ---
+
+def _install_sqlalchemy_hooks() -> None:
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        current = start_span("db.query", statement=" ".join(statement.split())[:300], executemany=executemany)
+        if current is not None:
+            conn.info.setdefault("trace_spans", []).append(current)
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            end_span(spans.pop())
+
+    @event.listens_for(Engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            end_span(spans.pop(), exception_context.original_exception)
+
+
+_install_sqlalchemy_hooks()
@@ -0,0 +1,93 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from src.core.answer_cache import SemanticAnswerCache
+
+
+def _cache():
+    return SemanticAnswerCache(threshold=0.9, ttl_seconds=3600, max_entries=10, max_keys=10)
+
+
+def test_hit_for_similar_question_and_same_persona():
+    cache = _cache()
+    v = np.array([1.0, 0.0, 0.0])
+    cache.store([603, 27205], "critic", "What is the Matrix?", v, "ANSWER: a prison", [{"id": "603_1", "text": "..."}], 2.5)
+
+    hit = cache.lookup([27205, 603], "Critic", np.array([0.99, 0.05, 0.0]))
+    assert hit is not None and hit["answer"] == "ANSWER: a prison"
+    assert cache.lookup([603, 27205], "philosopher", v) is None
+    assert cache.lookup([603, 27205], "critic", np.array([0.0, 1.0, 0.0])) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["latency_saved_seconds"] == 2.5
+
+
+def test_invalidation_drops_answers_for_movie():
+    cache = _cache()
+    v = np.array([0.0, 1.0])
+    cache.store([603], "critic", "q", v, "a", [], 1.0)
+    cache.store([27205], "critic", "q", v, "b", [], 1.0)
+    cache.invalidate(603)
+    assert cache.lookup([603], "critic", v) is None
+    assert cache.lookup([27205], "critic", v)["answer"] == "b"
+
+
+def test_expired_best_match_does_not_hide_a_fresh_one(monkeypatch):
+    import src.core.answer_cache as answer_cache
+    cache = _cache()
+    clock = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: clock[0])
+    cache.store([603], "critic", "what is the matrix?", np.array([1.0, 0.0]), "old", [], 1.0)
+    clock[0] += 3000
+    cache.store([603], "critic", "what's the matrix?", np.array([0.95, 0.31]), "fresh", [], 1.0)
+    clock[0] += 1000  # the first answer is now past its TTL
+
+    assert cache.lookup([603], "critic", np.array([1.0, 0.0]))["answer"] == "fresh"
+    assert cache.stats()["entries"] == 1
+
+
+def test_follow_ups_bypass_the_cache(tmp_path, monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+    import src.core.identity_cache as identity_cache
+    from src.core import rag_chat
+    from src.core.answer_cache import SemanticAnswerCache
+    from src.core.fake_llm import FakeChatModel
+
+    cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=8, max_keys=8)
+    llm = FakeChatModel(ttft_ms=0, tokens_per_sec=0)
+
+    async def retrieve(state):
+        return {"context": "ctx", "relevant_ids": [], "relevant_sources": [], "degradations": []}
+
+    async def resolve(db, tmdb_id=None, **kw):
+        return SimpleNamespace(id=1, title="Heat")
+
+    monkeypatch.setattr(rag_chat, "DB_PATH", str(tmp_path / "checkpoints.db"))
+    monkeypatch.setattr(rag_chat, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(rag_chat, "answer_cache", cache)
+    monkeypatch.setattr(rag_chat, "embed_query", lambda text: np.array([1.0, 0.0, 0.0]))
+    monkeypatch.setattr(rag_chat, "_retrieve_context", retrieve)
+    monkeypatch.setattr(rag_chat, "get_llm", lambda: llm)
+    monkeypatch.setattr(rag_chat.vector_db, "has_movie", lambda tid: True)
+    monkeypatch.setattr(identity_cache, "resolve_movie_async", resolve)
+    from src.db import llm_usage
+    recorded = []
+    monkeypatch.setattr(llm_usage, "record_llm_call", lambda call_site, *a, cached=False, **kw: recorded.append(cached))
+
+    def ask(thread_id, question):
+        async def run():
+            return [e async for e in rag_chat._answer_question_stream(949, question, "critic", thread_id)]
+        asyncio.run(run())
+
+    ask("a", "why did he do that?")  # opening question: stored
+    ask("b", "why did he do that?")  # opening question in another thread: hit
+    assert cache.stats()["hits"] == 1 and cache.stats()["entries"] == 1
+    assert recorded == [False, True]  # the hit still gets a usage row
+    ask("a", "why did he do that?")  # follow-up: neither looked up nor stored
+    assert cache.stats()["hits"] == 1 and cache.stats()["lookups"] == 2 and cache.stats()["stores"] == 1
@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.endpoints import chunks
+from src.core import vector_db
+from src.core.citations import citations_event
+
+TMDB_ID = 990001
+
+
+@pytest.fixture(autouse=True)
+def _chroma(tmp_path, monkeypatch):
+    # A fresh store under tmp_path; the module-level store (if any) is restored afterwards
+    monkeypatch.setenv("CHROMA_PATH", str(tmp_path / "chroma"))
+    monkeypatch.setattr(vector_db, "_store", None)
+    monkeypatch.setattr(vector_db, "_INDEX_EPOCHS", {})
+
+
+def _client():
+    texts = [f"Line {i}: " + "dialogue " * 60 for i in range(3)]
+    vector_db.add_movie_vectors(TMDB_ID, "Chunk Test", texts, np.random.rand(3, 8).astype("float32"))
+    app = FastAPI()
+    app.include_router(chunks.router)
+    return TestClient(app), texts
+
+
+def test_chunk_is_cacheable_and_revalidates():
+    client, texts = _client()
+    epoch = vector_db.index_epoch(TMDB_ID)
+    first = client.get(f"/chunks/{TMDB_ID}_1", params={"epoch": epoch})
+    assert first.status_code == 200 and first.json()["text"] == texts[1]
+    assert "immutable" in first.headers["cache-control"]
+
+    unversioned = client.get(f"/chunks/{TMDB_ID}_1")
+    assert unversioned.headers["cache-control"] == "public, no-cache"
+    assert unversioned.headers["etag"] == first.headers["etag"]
+    assert client.get(f"/chunks/{TMDB_ID}_1", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    assert client.get(f"/chunks/{TMDB_ID}_99").status_code == 404
+
+
+def test_batch_keeps_order_and_reports_missing():
+    client, texts = _client()
+    body = client.get("/chunks", params={"ids": [f"{TMDB_ID}_2", "nope_0", f"{TMDB_ID}_0"]}).json()
+    assert [c["text"] for c in body["chunks"]] == [texts[2], texts[0]]
+    assert body["missing"] == ["nope_0"]
+
+
+def test_citation_modes_shrink_repeat_payloads():
+    _client()
+    sources = vector_db.get_chunks_by_ids([f"{TMDB_ID}_0", f"{TMDB_ID}_1"])
+    sources = [{"id": s["id"], "text": s["text"]} for s in sources]
+    assert citations_event(sources) == {"type": "citations", "sources": sources}
+
+    ids_event = citations_event(sources, "ids")
+    assert ids_event["ids"] == [s["id"] for s in sources]
+    assert all("text" not in s and len(s["preview"]) <= 161 for s in ids_event["sources"])
+    assert ids_event["sources"][0]["href"] == f"/chunks/{TMDB_ID}_0?epoch={vector_db.index_epoch(TMDB_ID)}"
+
+    seen = set()
+    assert citations_event(sources[:1], "delta", seen)["sources"] == sources[:1]
+    repeat = citations_event(sources, "delta", seen)["sources"]
+    assert "text" not in repeat[0] and repeat[1] == sources[1]
@@ -0,0 +1,52 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.core.active_learning import get_discredited_chunks
+from src.db.database import Base
+from src.db.migrations import run_migrations
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'citations.db'}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def test_legacy_blobs_are_backfilled_and_cleared(tmp_path):
+    engine = _engine(tmp_path)
+    blob = json.dumps([{"id": "27205_3", "text": "long chunk text " * 50}, {"id": "27205_9", "text": "more"}])
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO chat_history (thread_id, movie_id, role, message, citations) VALUES "
+                          "('t', 1, 'assistant', 'a', :blob), ('t', 1, 'assistant', 'b', '[\"27205_1\"]'), "
+                          "('t', 1, 'user', 'q', NULL), ('t', 1, 'assistant', 'c', 'not json')"), {"blob": blob})
+    run_migrations(engine)
+    with engine.connect() as conn:
+        links = conn.execute(text("SELECT chat_id, rank, chunk_id FROM message_citations ORDER BY chat_id, rank")).all()
+        blobs = conn.execute(text("SELECT citations FROM chat_history WHERE citations IS NOT NULL")).all()
+    assert [tuple(r) for r in links] == [(1, 0, "27205_3"), (1, 1, "27205_9"), (2, 0, "27205_1")]
+    assert blobs == []
+
+
+def test_penalties_count_downvoted_citations(tmp_path):
+    engine = _engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO chat_history (id, thread_id, movie_id, role, message) VALUES "
+                          "(1, 't', 1, 'assistant', 'a'), (2, 't', 1, 'assistant', 'b'), (3, 't', 2, 'assistant', 'c')"))
+        conn.execute(text("INSERT INTO message_citations (chat_id, rank, chunk_id) VALUES "
+                          "(1, 0, 'x'), (1, 1, 'y'), (2, 0, 'x'), (3, 0, 'y')"))
+        conn.execute(text("INSERT INTO feedback (movie_id, chat_id, rating, downvote) VALUES "
+                          "(1, 1, 1, 1), (1, 2, 1, 0), (1, 2, 5, 0), (2, 3, 1, 1)"))
+
+    async def run():
+        factory = async_sessionmaker(bind=create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'citations.db'}"))
+        async with factory() as db:
+            return await get_discredited_chunks(db, 1)
+
+    assert asyncio.run(run()) == {"x": 0.4, "y": 0.2}
@@ -0,0 +1,81 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from fastapi import Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.api.endpoints.movies import get_collection
+from src.core.identity_cache import identity_cache
+from src.db.database import Base
+from src.models import sql_models
+
+
+def _session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'collection.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = sql_models.User(clerk_id="u1", email="u1@example.com", username="u1")
+    db.add(user)
+    movies = [sql_models.Movie(title=f"Film {i}", tmdb_id=i) for i in range(1, 6)]
+    db.add_all(movies)
+    db.flush()
+    # 1: summary only, 2: user chats in two threads, 3: user post, 4: hidden + seen, 5: nothing
+    db.add(sql_models.SummaryCache(movie_id=movies[0].id, summary_type="general", content="s"))
+    for thread in ("a", "b"):
+        for role in ("user", "assistant"):
+            db.add(sql_models.ChatHistory(thread_id=thread, user_id=user.id, movie_id=movies[1].id, role=role, message="m"))
+    db.add(sql_models.ForumPost(post_number="No.1", movie_id=movies[2].id, user_id=user.id, title="t", content="c"))
+    db.add(sql_models.UserMovieEngagement(user_id=user.id, movie_id=movies[3].id, engagement_type=sql_models.EngagementType.SUMMARY))
+    db.add(sql_models.UserHiddenMovie(user_id=user.id, movie_id=movies[3].id))
+    identity_cache.clear()
+    db.commit()
+    return db
+
+
+def _collection(db, response=None, clerk_id=None, show_hidden=False, cursor=None, limit=None):
+    # Called directly, so Query() defaults have to be passed explicitly
+    return get_collection(response or Response(), clerk_id=clerk_id, show_hidden=show_hidden, cursor=cursor, limit=limit, db=db)
+
+
+def test_global_collection_counts(tmp_path):
+    db = _session(tmp_path)
+    items = {i["tmdb_id"]: i for i in _collection(db)}
+    assert sorted(items) == [1, 2, 3]
+    assert items[1]["has_summary"] and items[1]["summary_count"] == 1
+    assert items[2]["deep_dive_threads"] == 2 and items[2]["has_deep_dive"]
+    assert items[3]["discussion_posts"] == 1
+
+
+def test_user_scope_and_hidden_filter(tmp_path):
+    db = _session(tmp_path)
+    visible = {i["tmdb_id"]: i for i in _collection(db, clerk_id="u1")}
+    assert sorted(visible) == [2, 3]
+    assert not visible[2]["has_summary"] and visible[2]["has_deep_dive"]
+
+    hidden = _collection(db, clerk_id="u1", show_hidden=True)
+    assert [i["tmdb_id"] for i in hidden] == [4]
+    assert hidden[0]["is_hidden"] and hidden[0]["has_summary"]
+
+
+def test_keyset_pagination(tmp_path):
+    db = _session(tmp_path)
+    response = Response()
+    first = _collection(db, response, limit=2)
+    assert [i["tmdb_id"] for i in first] == [1, 2]
+    cursor = int(response.headers["X-Next-Cursor"])
+
+    response = Response()
+    second = _collection(db, response, cursor=cursor, limit=2)
+    assert [i["tmdb_id"] for i in second] == [3]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_benchmark_query_count_constant_across_sizes():
+    import subprocess
+    result = subprocess.run([sys.executable, os.path.join(os.path.dirname(__file__), "..", "scripts", "benchmark_collection.py"), "--sizes", "20,60", "--repeats", "2"],
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout + result.stderr
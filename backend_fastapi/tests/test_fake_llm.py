@@ -0,0 +1,36 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+from langchain_core.messages import HumanMessage
+from src.core.fake_llm import FakeChatModel
+
+
+def test_answer_protocol_is_deterministic():
+    llm = FakeChatModel(ttft_ms=0, tokens_per_sec=0)
+    messages = [HumanMessage(content="context...\n\nQUESTION: why?\nANSWER:")]
+    first = llm.invoke(messages).content
+    assert first == llm.invoke(messages).content
+    assert first.startswith("[INCIDENT_LOG]:") and "\nANSWER: " in first
+
+
+def test_stream_honours_ttft_and_rejoins_exactly():
+    llm = FakeChatModel(ttft_ms=100, tokens_per_sec=1000, output_tokens=20, template="summary")
+    messages = [HumanMessage(content="narrate this movie part")]
+
+    async def run():
+        start = time.perf_counter()
+        chunks = []
+        first_at = None
+        async for chunk in llm.astream(messages):
+            if chunk.content and first_at is None:
+                first_at = time.perf_counter() - start
+            chunks.append(chunk.content)
+        return first_at, "".join(chunks)
+
+    first_at, text = asyncio.run(run())
+    assert first_at >= 0.1
+    assert text == llm.invoke(messages).content
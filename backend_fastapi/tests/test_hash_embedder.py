@@ -0,0 +1,33 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from src.core.hash_embedder import HashEmbedder
+
+
+def test_shapes_and_normalization():
+    embedder = HashEmbedder()
+    single = embedder.encode("Neo: What is the Matrix?")
+    batch = embedder.encode(["Neo: What is the Matrix?", "Morpheus: It is all around us."], batch_size=256)
+    assert single.shape == (384,)
+    assert batch.shape == (2, 384)
+    assert np.allclose(np.linalg.norm(batch, axis=1), 1.0, atol=1e-5)
+    assert np.array_equal(single, batch[0])
+
+
+def test_shared_vocabulary_ranks_higher():
+    embedder = HashEmbedder()
+    query = embedder.encode("what did morpheus say about the matrix")
+    related = embedder.encode("Morpheus: The Matrix is everywhere.")
+    unrelated = embedder.encode("Cobb: Dreams feel real while we're in them.")
+    assert query @ related > query @ unrelated
+
+
+def test_word_feature_cache_is_per_instance():
+    # A class-level lru_cache would share one maxsize across instances and keep them all alive
+    first, second = HashEmbedder(), HashEmbedder()
+    first.encode("the matrix has you")
+    assert first.memory_bytes() > 0 and second.memory_bytes() == 0
@@ -0,0 +1,90 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from fastapi import Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.api.endpoints.discussions import get_movie_posts
+from src.api.endpoints.history import get_thread_history, get_thread_summaries, get_user_chat_history
+from src.core.identity_cache import identity_cache
+from src.db.database import Base
+from src.models import schemas, sql_models
+
+
+def _setup(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(sql_models.User(clerk_id="u1", email="u1@example.com", username="u1"))
+    db.add_all([sql_models.Movie(title=f"Film {i}", tmdb_id=100 + i) for i in range(1, 4)])
+    db.flush()
+    # Three threads, one per movie, with 2, 4 and 6 messages
+    for movie_id in (1, 2, 3):
+        for n in range(2 * movie_id):
+            db.add(sql_models.ChatHistory(thread_id=f"t{movie_id}", user_id=1, movie_id=movie_id,
+                                          role="user" if n % 2 == 0 else "assistant", message=f"m{movie_id}-{n}"))
+    for n in range(5):
+        post = sql_models.ForumPost(post_number=f"No.{n}", movie_id=1, title=f"p{n}", content="c")
+        db.add(post)
+        db.flush()
+        db.add(sql_models.ForumReply(reply_number=f"No.r{n}", post_id=post.id, content="r"))
+    db.commit()
+    identity_cache.clear()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return db, statements
+
+
+def test_user_history_pages_without_n_plus_one(tmp_path):
+    db, statements = _setup(tmp_path)
+    response = Response()
+    page = get_user_chat_history("u1", response, cursor=None, limit=8, db=db)
+    rendered = [schemas.ChatHistoryResponse.model_validate(m) for m in page]
+    assert [m.message for m in rendered][:2] == ["m3-5", "m3-4"]
+    assert {m.tmdb_id for m in rendered} == {103, 102}
+    assert rendered[0].citation_ids == []
+    # user lookup + page + one selectin each for movies and citations, independent of page size
+    assert len(statements) == 4
+
+    rest = get_user_chat_history("u1", Response(), cursor=int(response.headers["X-Next-Cursor"]), limit=100, db=db)
+    assert len(page) + len(rest) == 12
+
+
+def test_thread_history_ascending_with_cursor(tmp_path):
+    db, _ = _setup(tmp_path)
+    response = Response()
+    first = get_thread_history("t3", response, clerk_id="u1", cursor=None, limit=4, db=db)
+    second = get_thread_history("t3", Response(), clerk_id="u1", cursor=int(response.headers["X-Next-Cursor"]), limit=4, db=db)
+    assert [m.message for m in first + second] == [f"m3-{n}" for n in range(6)]
+
+
+def test_thread_summaries(tmp_path):
+    db, statements = _setup(tmp_path)
+    summaries = get_thread_summaries(Response(), clerk_id="u1", cursor=None, limit=10, db=db)
+    assert [s["thread_id"] for s in summaries] == ["t3", "t2", "t1"]
+    assert summaries[0]["message_count"] == 6 and summaries[0]["last_message"] == "m3-5"
+    assert summaries[0]["tmdb_id"] == 103
+    assert len(statements) == 2
+
+
+def test_posts_are_paginated_with_replies_loaded(tmp_path):
+    db, statements = _setup(tmp_path)
+    response = Response()
+    posts = get_movie_posts(1, response, cursor=None, limit=3, db=db)
+    rendered = [schemas.ForumPostResponse.model_validate(p) for p in posts]
+    assert [p.title for p in rendered] == ["p0", "p1", "p2"]
+    assert all(len(p.replies) == 1 for p in rendered)
+    assert response.headers["X-Next-Cursor"] == str(posts[-1].id)
+    assert len(statements) == 2
+
+
+def test_listings_without_limit_return_everything(tmp_path):
+    db, _ = _setup(tmp_path)
+    response = Response()
+    assert len(get_user_chat_history("u1", response, cursor=None, limit=None, db=db)) == 12
+    assert len(get_thread_history("t3", response, clerk_id="u1", cursor=None, limit=None, db=db)) == 6
+    assert len(get_movie_posts(1, response, cursor=None, limit=None, db=db)) == 5
+    assert "X-Next-Cursor" not in response.headers
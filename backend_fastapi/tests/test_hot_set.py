@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core import hot_set, retrieval_cache
+from src.core.retrieval_cache import BM25Cache, CorpusIndex, bm25_cache
+from src.db.database import Base
+from src.models import sql_models
+
+
+def _session_factory(tmp_path):
+    db_path = tmp_path / "hot.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([sql_models.Movie(title=f"Film {i}", tmdb_id=500 + i) for i in range(1, 5)])
+    db.flush()
+    # Film 3 is the busiest, then Film 1 (chat + summary), then Film 2; Film 4 is idle
+    for movie_id, n in ((3, 5), (1, 2), (2, 1)):
+        for i in range(n):
+            db.add(sql_models.ChatHistory(thread_id=f"t{movie_id}", movie_id=movie_id, role="user", message="q"))
+    db.add(sql_models.SummaryCache(movie_id=1, summary_type=sql_models.SummaryType.GENERAL, content="s"))
+    db.commit()
+    return async_sessionmaker(bind=create_async_engine(f"sqlite+aiosqlite:///{db_path}"))
+
+
+def test_plan_ranks_recent_activity(tmp_path):
+    factory = _session_factory(tmp_path)
+
+    async def run():
+        async with factory() as db:
+            return await hot_set.plan_hot_set(db, limit=10)
+
+    plan = asyncio.run(run())
+    assert [(p["tmdb_id"], p["score"]) for p in plan] == [(503, 5), (501, 3), (502, 1)]
+
+
+def test_preload_stops_at_memory_budget(tmp_path, monkeypatch):
+    factory = _session_factory(tmp_path)
+    loaded = []
+
+    def fake_load(tmdb_id):
+        loaded.append(tmdb_id)
+        entry = CorpusIndex(docs=[{"id": f"{tmdb_id}_0", "text": "x"}], bm25=None, nbytes=600 * 1024)
+        bm25_cache.put(tmdb_id, entry)
+        return entry
+
+    monkeypatch.setattr(retrieval_cache, "load_corpus", fake_load)
+    monkeypatch.setattr(hot_set, "_warm_vectors", lambda tmdb_id, title: None)
+    bm25_cache.clear()
+    progress = asyncio.run(hot_set.preload(factory, limit=10, budget_mb=1))
+    bm25_cache.clear()
+    assert loaded == [503, 501]
+    assert progress["planned"] == 3 and progress["loaded"] == 2 and progress["skipped"] == 1
+
+
+def test_bm25_cache_evicts_least_recent_by_bytes():
+    cache = BM25Cache(max_bytes=250)
+    for tmdb_id in (1, 2):
+        cache.put(tmdb_id, CorpusIndex(docs=[], bm25=None, nbytes=100))
+    cache.get(1)
+    cache.put(3, CorpusIndex(docs=[], bm25=None, nbytes=100))
+    assert 2 not in cache and 1 in cache and 3 in cache
+    assert cache.stats()["bytes"] == 200 and cache.stats()["evictions"] == 1
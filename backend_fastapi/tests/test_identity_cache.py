@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.core import identity_cache as ic
+from src.db.database import Base
+from src.models import sql_models
+
+
+def _session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'identity.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(sql_models.Movie(title="Inception", tmdb_id=27205, status=sql_models.JobStatus.PENDING))
+    db.add(sql_models.User(clerk_id="u1", email="u1@example.com", username="u1"))
+    db.commit()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    ic.identity_cache.clear()
+    return db, statements
+
+
+def test_read_through_and_shared_keys(tmp_path):
+    db, statements = _session(tmp_path)
+    first = ic.resolve_movie(db, tmdb_id=27205)
+    assert first.title == "Inception" and first.status == "pending"
+    assert ic.resolve_movie(db, tmdb_id=27205) is first
+    assert ic.resolve_movie(db, title="Inception") is first
+    assert ic.resolve_user(db, "u1").id == ic.resolve_user(db, "u1").id
+    assert ic.resolve_movie(db, tmdb_id=1) is None
+    # One query each for the movie, the user and the unknown tmdb_id
+    assert len(statements) == 3
+
+
+def test_orm_write_invalidates(tmp_path):
+    db, _ = _session(tmp_path)
+    assert ic.resolve_movie(db, tmdb_id=27205).status == "pending"
+    movie = db.query(sql_models.Movie).filter(sql_models.Movie.tmdb_id == 27205).one()
+    movie.status = sql_models.JobStatus.COMPLETED
+    db.commit()
+    assert ic.resolve_movie(db, tmdb_id=27205).status == "completed"
+
+
+def test_entries_expire():
+    cache = ic.IdentityCache(ttl_seconds=0, max_entries=10)
+    cache.put(("user_clerk", "u1"), ic.UserIdentity(id=1, clerk_id="u1"))
+    assert cache.get(("user_clerk", "u1")) is None
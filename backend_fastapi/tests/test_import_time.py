@@ -0,0 +1,58 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+sys.path.append(os.getcwd())
+
+from src.core import warmup
+
+# Importing the app must stay cheap: no model weights, vector store, LLM client or network
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "6"))
+HEAVY_MODULES = ["torch", "sentence_transformers", "chromadb", "langchain_groq", "subliminal", "nltk"]
+
+PROFILE = """
+import json, sys, time
+start = time.perf_counter()
+import src.main
+print(json.dumps({"seconds": time.perf_counter() - start, "loaded": [m for m in %r if m in sys.modules]}))
+""" % HEAVY_MODULES
+
+
+def test_app_import_is_lazy_and_within_budget(tmp_path):
+    env = {**os.environ, "CHROMA_PATH": str(tmp_path / "chroma"), "EMBEDDER_BACKEND": "sentence-transformers", "LLM_PROVIDER": "groq"}
+    out = subprocess.run([sys.executable, "-c", PROFILE], cwd=os.getcwd(), env=env, capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    profile = json.loads(out.stdout.strip().splitlines()[-1])
+    assert profile["loaded"] == []
+    assert profile["seconds"] < IMPORT_BUDGET_SECONDS, profile
+    assert not (tmp_path / "chroma").exists()
+
+
+def test_readiness_waits_for_required_stages(monkeypatch):
+    def broken():
+        raise RuntimeError("no model")
+
+    monkeypatch.setattr(warmup, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(warmup, "STAGES", [("database", lambda: None, True), ("tokenizer", broken, False)])
+    monkeypatch.setattr(warmup, "_status", {"database": {"status": "pending"}, "tokenizer": {"status": "pending"}})
+    assert not warmup.is_ready()
+    stages = asyncio.run(warmup.run_warmup())
+    assert stages["database"]["status"] == "ready" and stages["tokenizer"]["status"] == "failed"
+    assert warmup.is_ready()
+
+    # A failed required stage keeps readiness down while it waits to be retried
+    monkeypatch.setattr(warmup, "STAGES", [("embedder", broken, True)])
+    monkeypatch.setattr(warmup, "_status", {"embedder": {"status": "pending"}})
+    monkeypatch.setattr(warmup, "WARMUP_RETRY_INITIAL_SECONDS", 60)
+
+    async def first_pass():
+        task = asyncio.create_task(warmup.run_warmup())
+        while warmup._status["embedder"]["status"] != "failed":
+            await asyncio.sleep(0.01)
+        ready = warmup.is_ready()
+        task.cancel()
+        return ready
+
+    assert asyncio.run(first_pass()) is False
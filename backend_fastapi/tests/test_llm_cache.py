@@ -0,0 +1,130 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from src.core import llm_cache
+from src.core.llm_cache import CompletionCache
+
+
+class CountingLLM:
+    model_name = "test-model"
+    temperature = 0.6
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return AIMessage(content="narration")
+
+    async def astream(self, messages):
+        self.calls += 1
+        for token in ["The ", "monolith ", "hums."]:
+            yield AIMessageChunk(content=token)
+
+
+def test_stream_is_replayed_token_by_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "completion_cache", CompletionCache(str(tmp_path / "cache.db"), 3600, 1024 * 1024))
+    llm = CountingLLM()
+    messages = [HumanMessage(content="narrate this movie part")]
+
+    async def collect():
+        return [t async for t in llm_cache.cached_astream(llm, messages)]
+
+    first = asyncio.run(collect())
+    second = asyncio.run(collect())
+    assert first == second == ["The ", "monolith ", "hums."]
+    assert llm.calls == 1
+
+
+def test_key_depends_on_model_and_temperature():
+    messages = [HumanMessage(content="same prompt")]
+    assert CompletionCache.make_key(messages, "a", 0.6) != CompletionCache.make_key(messages, "b", 0.6)
+    assert CompletionCache.make_key(messages, "a", 0.6) != CompletionCache.make_key(messages, "a", 0.0)
+
+
+def test_ttl_and_size_eviction(tmp_path):
+    cache = CompletionCache(str(tmp_path / "cache.db"), ttl_seconds=3600, max_bytes=400)
+    for i in range(40):
+        cache.put(f"k{i}", "m", 0.6, [f"summary {i} " * 10])
+    total = cache._connect().execute("SELECT SUM(size) FROM llm_completions").fetchone()[0]
+    assert total <= 400
+    assert cache.get("k39") is not None
+    assert cache.get("k0") is None
+
+    expired = CompletionCache(str(tmp_path / "expired.db"), ttl_seconds=-1, max_bytes=400)
+    expired.put("k", "m", 0.6, ["stale"])
+    assert expired.get("k") is None
+
+
+def test_empty_and_invalid_completions_are_not_cached(tmp_path, monkeypatch):
+    from src.agents import research_agent
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "completion_cache", CompletionCache(str(tmp_path / "cache.db"), 3600, 1024 * 1024))
+
+    class ReplyLLM(CountingLLM):
+        def __init__(self, reply):
+            super().__init__()
+            self.reply = reply
+
+        def invoke(self, messages):
+            self.calls += 1
+            return AIMessage(content=self.reply)
+
+        async def astream(self, messages):
+            self.calls += 1
+            for token in self.reply.split():
+                yield AIMessageChunk(content=token)
+
+    async def stream_twice(llm):
+        for _ in range(2):
+            [t async for t in llm_cache.cached_astream(llm, [HumanMessage(content="chunk")])]
+
+    empty = ReplyLLM("")
+    asyncio.run(stream_twice(empty))
+    assert empty.calls == 2
+
+    garbled = ReplyLLM("Sorry, I can't browse the web.")
+    monkeypatch.setattr(research_agent, "get_llm", lambda: garbled)
+    assert research_agent.ResearchAgent.search_video_essays("Heat") == []
+    assert research_agent.ResearchAgent.search_video_essays("Heat") == []
+    assert garbled.calls == 2
+
+    valid = ReplyLLM('```json\n[{"title": "Heat at 25", "description": "diner scene"}]\n```')
+    monkeypatch.setattr(research_agent, "get_llm", lambda: valid)
+    assert research_agent.ResearchAgent.search_video_essays("Heat")[0]["title"] == "Heat at 25"
+    research_agent.ResearchAgent.search_video_essays("Heat")
+    assert valid.calls == 1
+
+
+def test_failed_and_abandoned_streams_still_end_their_span(tmp_path, monkeypatch):
+    from src.utils import tracing
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "completion_cache", CompletionCache(str(tmp_path / "cache.db"), 3600, 1024 * 1024))
+
+    class BrokenLLM(CountingLLM):
+        async def astream(self, messages):
+            yield AIMessageChunk(content="The ")
+            raise ConnectionError("provider hung up")
+
+    async def fail():
+        with tracing.request_trace("req-stream-error", "test"):
+            try:
+                [t async for t in llm_cache.cached_astream(BrokenLLM(), [HumanMessage(content="a")])]
+            except ConnectionError:
+                pass
+
+    async def abandon():
+        with tracing.request_trace("req-stream-closed", "test"):
+            stream = llm_cache.cached_astream(CountingLLM(), [HumanMessage(content="b")])
+            await stream.__anext__()
+            await stream.aclose()
+
+    asyncio.run(fail())
+    asyncio.run(abandon())
+    for request_id, error in (("req-stream-error", "ConnectionError"), ("req-stream-closed", "GeneratorExit")):
+        spans = {s["name"]: s for s in tracing.get_trace(request_id)["spans"]}
+        assert spans["llm.stream"]["error"].startswith(error)
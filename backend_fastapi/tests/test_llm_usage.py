@@ -0,0 +1,82 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from langchain_core.messages import AIMessage, HumanMessage
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core import llm_cache
+from src.core.llm_cache import CompletionCache
+from src.db import llm_usage
+from src.db.database import Base
+from src.db.migrations import run_migrations
+from src.models import sql_models
+from src.utils import tracing
+
+
+class MeteredLLM:
+    model_name = "test-model"
+    temperature = 0.6
+
+    async def ainvoke(self, messages):
+        return AIMessage(content="narration", usage_metadata={"input_tokens": 1200, "output_tokens": 300, "total_tokens": 1500})
+
+
+def _recorder(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'usage.db'}")
+    Base.metadata.create_all(bind=engine)
+    recorder = llm_usage.UsageRecorder(session_factory=sessionmaker(bind=engine))
+    monkeypatch.setattr(llm_usage, "usage_recorder", recorder)
+    return recorder, sessionmaker(bind=engine)
+
+
+def test_calls_are_recorded_with_scope_request_and_cache_flag(tmp_path, monkeypatch):
+    recorder, Session = _recorder(tmp_path, monkeypatch)
+    monkeypatch.setattr(llm_cache, "completion_cache", CompletionCache(str(tmp_path / "cache.db"), 3600, 1024 * 1024))
+    monkeypatch.setattr(llm_usage, "LLM_PRICE_PROMPT_PER_MTOK", 0.5)
+    monkeypatch.setattr(llm_usage, "LLM_PRICE_COMPLETION_PER_MTOK", 1.5)
+    messages = [HumanMessage(content="narrate this movie part")]
+
+    async def summarize_twice():
+        with tracing.request_trace("req-usage", "test"), llm_usage.usage_scope(tmdb_id=27205, user_id=None):
+            await llm_cache.cached_ainvoke(MeteredLLM(), messages, call_site="summary_chunk")
+            await llm_cache.cached_ainvoke(MeteredLLM(), messages, call_site="summary_chunk")
+
+    asyncio.run(summarize_twice())
+    # Outside the scope: estimated locally, no film
+    llm_usage.record_llm_call("video_essay", messages, "Every Frame a Painting " * 10)
+    assert recorder.flush() == 3
+
+    with Session() as db:
+        rows = llm_usage.request_usage(db, "req-usage")
+        assert [(r["call_site"], r["tmdb_id"], r["cached"]) for r in rows] == [("summary_chunk", 27205, False), ("summary_chunk", 27205, True)]
+        assert rows[0]["prompt_tokens"] == 1200 and not rows[0]["estimated"]
+        assert rows[0]["cost_usd"] == (1200 * 0.5 + 300 * 1.5) / 1e6 and rows[1]["cost_usd"] == 0
+
+        by_site = {r["call_site"]: r for r in llm_usage.summarize(db, ["call_site"], since_hours=1)}
+        assert by_site["summary_chunk"]["calls"] == 1  # the cache hit is excluded by default
+        assert by_site["video_essay"]["estimated_calls"] == 1 and by_site["video_essay"]["completion_tokens"] > 0
+        with_cached = llm_usage.summarize(db, ["call_site", "tmdb_id"], since_hours=1, include_cached=True)
+        assert {(r["call_site"], r["tmdb_id"], r["calls"]) for r in with_cached} == {("summary_chunk", 27205, 2), ("video_essay", None, 1)}
+
+
+def test_failed_flush_requeues_rows(tmp_path):
+    recorder = llm_usage.UsageRecorder(session_factory=lambda: (_ for _ in ()).throw(RuntimeError("db down")))
+    recorder.record("rag_generate", 10, 5)
+    assert recorder.flush() == 0 and recorder.pending() == 1
+
+
+def test_migration_creates_usage_table_on_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    legacy = [t for name, t in Base.metadata.tables.items() if name != "llm_usage"]
+    Base.metadata.create_all(bind=engine, tables=legacy)
+    assert "0003" in run_migrations(engine)
+    from sqlalchemy import inspect
+    created_at = next(c for c in inspect(engine).get_columns("llm_usage") if c["name"] == "created_at")
+    assert str(created_at["type"]) == str(sql_models.LLMUsage.__table__.c.created_at.type.compile(dialect=engine.dialect))
+    with sessionmaker(bind=engine)() as db:
+        db.add(sql_models.LLMUsage(call_site="rag_generate", prompt_tokens=1, completion_tokens=1))
+        db.commit()
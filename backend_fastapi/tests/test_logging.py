@@ -0,0 +1,53 @@
+import json
+import logging
+import os
+import queue
+import sys
+
+sys.path.append(os.getcwd())
+
+from src.utils import logger as log_module
+from src.utils import tracing
+
+
+def _record(**extra):
+    record = logging.LogRecord("FilmSuma", logging.INFO, __file__, 1, "Vector search finished", None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_records_carry_tag_request_id_and_fields():
+    line = log_module.JsonFormatter().format(_record(tag="rag", request_id="req-1", fields={"duration_ms": 12.5, "chunks": 20}))
+    payload = json.loads(line)
+    assert payload["tag"] == "rag" and payload["request_id"] == "req-1" and payload["level"] == "info"
+    assert payload["msg"] == "Vector search finished"
+    assert payload["duration_ms"] == 12.5 and payload["chunks"] == 20
+
+    dev = log_module.DevFormatter().format(_record(label="🔍 RAG::RETRIEVE", fields={"chunks": 20}))
+    assert "[🔍 RAG::RETRIEVE]" in dev and "chunks=20" in dev
+
+
+def test_debug_sampling_is_consistent_within_a_request():
+    with tracing.request_trace("sampled-request", "test"):
+        decisions = {log_module.debug_sampled(0.5) for _ in range(20)}
+    assert len(decisions) == 1
+    assert log_module.debug_sampled(1.0) and not log_module.debug_sampled(0.0)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = log_module.DroppingQueueHandler(queue.Queue(maxsize=2))
+    for _ in range(5):
+        handler.emit(_record())
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+
+
+def test_helpers_enqueue_structured_records(monkeypatch):
+    captured = []
+    archive = log_module.logger
+    monkeypatch.setattr(archive.queue_handler, "enqueue", captured.append)
+    monkeypatch.setattr(log_module, "LOG_DEBUG_SAMPLE_RATE", 0.0)
+    archive.rag("Context assembly complete", duration_ms=3.2)
+    archive.rag("BM25 ranker finished", level=logging.DEBUG)  # sampled out
+    archive.log("INPUT", "Question: hi")
+    assert [r.getMessage() for r in captured] == ["Context assembly complete", "Question: hi"]
+    assert captured[0].tag == "rag" and captured[0].fields == {"duration_ms": 3.2}
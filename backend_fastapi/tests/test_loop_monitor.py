@@ -0,0 +1,42 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+
+from src.utils.loop_monitor import LoopMonitor
+
+
+def _blocking_call():
+    time.sleep(0.3)
+
+
+def test_blocking_call_site_is_ranked_first():
+    monitor = LoopMonitor(interval_ms=20, threshold_ms=50)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        _blocking_call()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+    top = monitor.top_blockers()[0]
+    assert "tests/test_loop_monitor.py" in top["site"] and "_blocking_call" in top["site"]
+    assert top["episodes"] == 1 and top["max_blocked_ms"] >= 150
+    assert 0.1 < top["blocked_seconds"] < 0.4
+    assert monitor.max_lag >= 0.2
+
+
+def test_blockers_endpoint_requires_admin_token(monkeypatch):
+    from src.api.endpoints import debug
+    from src.main import app
+    client = TestClient(app)
+    assert client.get("/debug/blockers").status_code == 404
+    monkeypatch.setattr(debug, "DEBUG_ADMIN_TOKEN", "s3cret")
+    body = client.get("/debug/blockers", headers={"X-Admin-Token": "s3cret"}).json()
+    assert set(body) == {"monitor_running", "threshold_ms", "max_lag_ms", "blockers"}
@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from src.core.answer_cache import SemanticAnswerCache
+from src.utils import memory
+
+
+def test_components_report_estimates_and_survive_errors():
+    cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=10, max_keys=10)
+    memory.register("test_answers", cache.nbytes, cache.stats)
+    memory.register("test_broken", lambda: 1 // 0)
+    empty = {c["name"]: c for c in memory.components()}["test_answers"]["bytes"]
+    cache.store([1], "critic", "why?", np.ones(384), "because " * 100, [{"id": "1_0", "text": "x" * 500}], 1.0)
+
+    report = memory.report()
+    memory.unregister("test_answers")
+    memory.unregister("test_broken")
+    items = {c["name"]: c for c in report["components"]}
+    assert items["test_answers"]["bytes"] - empty >= 384 * 4 + 800 + 500
+    assert items["test_answers"]["details"]["entries"] == 1
+    assert items["test_broken"]["bytes"] == 0 and "ZeroDivisionError" in items["test_broken"]["error"]
+    assert report["rss_bytes"] > report["tracked_bytes"] > 0
+
+
+def test_tracemalloc_snapshot_and_diff():
+    memory.start_tracemalloc(1)
+    try:
+        memory.top_allocations(5)
+        hoard = [bytearray(1024) for _ in range(2000)]
+        growth = memory.top_allocations(5, diff=True)
+        assert growth["mode"] == "diff"
+        assert any("test_memory.py" in s["location"][0] and s["bytes_diff"] >= 2000 * 1024 for s in growth["stats"])
+        del hoard
+    finally:
+        memory.stop_tracemalloc()
+
+
+def test_memory_endpoints_behind_admin_token(monkeypatch):
+    from src.api.endpoints import debug
+    from src.main import app
+    client = TestClient(app)
+    assert client.get("/debug/memory").status_code == 404
+    monkeypatch.setattr(debug, "DEBUG_ADMIN_TOKEN", "s3cret")
+    headers = {"X-Admin-Token": "s3cret"}
+    names = {c["name"] for c in client.get("/debug/memory", headers=headers).json()["components"]}
+    assert {"bm25_corpus_cache", "answer_cache", "identity_cache", "embedder", "vector_index"} <= names
+    assert client.get("/debug/memory/allocations", headers=headers).status_code == 409
+    assert 'filmsuma_memory_bytes{component="rss"}' in client.get("/metrics").text
+
+
+def test_vector_index_estimate_never_queries_chroma(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHROMA_PATH", str(tmp_path / "chroma"))
+    from src.core.chroma_store import ChromaVectorStore
+    store = ChromaVectorStore(collection_name="memory_test")
+    assert store.memory_bytes() == 0
+    store.add_vectors(1, "Heat", ["a", "b", "c"], np.ones((3, 8), dtype=np.float32))
+
+    def no_queries(*args, **kwargs):
+        raise AssertionError("memory_bytes must not query Chroma")
+    monkeypatch.setattr(store.collection, "count", no_queries)
+    monkeypatch.setattr(store.collection, "get", no_queries)
+    assert store.memory_bytes() == 3 * (8 * 4 + 32 * 4 + 64)
@@ -0,0 +1,112 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+
+from src.core import memory_governor
+from src.core.memory_governor import MemoryGovernor
+from src.core.retrieval_cache import BM25Cache, CorpusIndex
+from src.utils import memory
+
+MB = 1024 * 1024
+
+
+def _governor(monkeypatch, readings, cooldown_seconds=0):
+    # register() also installs /metrics gauge functions; keep the fakes out of the global registry
+    monkeypatch.setattr(memory, "_components", {})
+    monkeypatch.setattr(memory.MEMORY_BYTES, "_functions", dict(memory.MEMORY_BYTES._functions))
+    bm25 = BM25Cache(max_bytes=100 * MB)
+    for tmdb_id in range(4):
+        bm25.put(tmdb_id, CorpusIndex(docs=[], bm25=None, nbytes=10 * MB))
+    answers = list(range(10))
+
+    def shrink_answers(fraction):
+        del answers[:int(len(answers) * fraction + 0.999)]
+
+    memory.register("bm25", bm25.total_bytes, shrink=bm25.shrink, priority=10)
+    memory.register("answers", lambda: len(answers) * MB, shrink=shrink_answers, priority=30)
+    memory.register("embedder", lambda: 500 * MB)  # not shrinkable
+    governor = MemoryGovernor(1000 * MB, soft=0.75, hard=0.9, resume=0.65, cooldown_seconds=cooldown_seconds,
+                              rss=lambda: readings.pop(0) * MB)
+    return governor, bm25, answers
+
+
+def test_soft_sheds_in_priority_order_and_pauses_ingestion(monkeypatch):
+    governor, bm25, answers = _governor(monkeypatch, [800, 800, 500])
+    before = memory_governor.MEMORY_SHED_EVENTS.value(component="bm25", level="soft")
+
+    assert governor.check() == "soft"
+    assert bm25.total_bytes() == 20 * MB and len(answers) == 10
+    assert not governor.wait_for_ingestion(timeout=0.01) and governor.accepting_ingestion()
+    assert governor.check() == "soft"
+    assert len(answers) == 5
+    assert memory_governor.MEMORY_SHED_EVENTS.value(component="bm25", level="soft") == before + 1
+
+    assert governor.check() == "ok"
+    assert governor.wait_for_ingestion(timeout=0.01) and governor.status()["ingestion_paused"] is False
+
+
+def test_each_cache_shrinks_once_per_episode_with_hysteresis(monkeypatch):
+    # RSS stays above soft (freed memory isn't returned), then hovers between resume and soft
+    governor, bm25, answers = _governor(monkeypatch, [800, 800, 800, 800, 700, 600, 800])
+
+    governor.check()
+    governor.check()
+    assert bm25.total_bytes() == 20 * MB and len(answers) == 5
+    # Everything has been shed once: no further thrashing, and ingestion is no longer held back
+    governor.check()
+    assert bm25.total_bytes() == 20 * MB and len(answers) == 5
+    assert governor.wait_for_ingestion(timeout=0.01) and governor.status()["shrunk_this_episode"] == ["answers", "bm25"]
+
+    assert governor.check() == "soft"
+    assert governor.check() == "soft"  # 700 MB: below soft but above the resume watermark
+    assert governor.check() == "ok"    # 600 MB ends the episode
+    assert governor.check() == "soft"  # a new episode may shrink again
+    assert bm25.total_bytes() == 10 * MB
+
+
+def test_soft_shrinks_respect_cooldown(monkeypatch):
+    governor, bm25, answers = _governor(monkeypatch, [800, 800], cooldown_seconds=60)
+    governor.check()
+    governor.check()
+    assert bm25.total_bytes() == 20 * MB and len(answers) == 10
+    assert not governor.wait_for_ingestion(timeout=0.01)
+
+
+def test_events_count_transitions_not_ticks(monkeypatch):
+    governor, _, _ = _governor(monkeypatch, [800, 800, 950, 950, 800, 700, 500, 800])
+
+    for _ in range(8):
+        governor.check()
+    # ok -> soft, soft -> hard, ok -> soft; easing hard -> soft is the same episode
+    assert governor.status()["soft_events"] == 2 and governor.status()["hard_events"] == 1
+
+
+def test_hard_clears_caches_and_rejects_ingestion(monkeypatch):
+    governor, bm25, answers = _governor(monkeypatch, [950, 400])
+    rejected = memory_governor.INGESTION_REJECTED.value()
+
+    assert governor.check() == "hard"
+    assert bm25.total_bytes() == 0 and answers == []
+    assert not governor.accepting_ingestion()
+    assert memory_governor.INGESTION_REJECTED.value() == rejected + 1
+
+    # A paused worker resumes as soon as pressure clears
+    resumed = []
+    worker = threading.Thread(target=lambda: resumed.append(governor.wait_for_ingestion(timeout=5)))
+    worker.start()
+    assert governor.check() == "ok"
+    worker.join(5)
+    assert resumed == [True] and governor.accepting_ingestion()
+
+
+def test_generate_embeddings_returns_503_above_hard_watermark(monkeypatch):
+    governor = MemoryGovernor(1000 * MB, rss=lambda: 0)
+    governor.level = "hard"
+    monkeypatch.setattr(memory_governor, "_governor", governor)
+    from src.main import app
+    response = TestClient(app).post("/generate_embeddings", json={"movie": "Inception", "tmdb_id": 27205})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "30"
@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+
+from src.utils.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_text_exposition_format():
+    registry = Registry()
+    requests = registry.register(Counter("demo_requests_total", "Requests.", ("endpoint",)))
+    depth = registry.register(Gauge("demo_queue_depth", "Depth.", ("queue",)))
+    latency = registry.register(Histogram("demo_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0)))
+    requests.inc(endpoint="deep_dive")
+    requests.inc(2, endpoint="deep_dive")
+    depth.set_function(lambda: 7, queue="chat")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, stage="bm25")
+
+    text = registry.render()
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{endpoint="deep_dive"} 3' in text
+    assert 'demo_queue_depth{queue="chat"} 7' in text
+    assert 'demo_seconds_bucket{stage="bm25",le="0.1"} 2' in text
+    assert 'demo_seconds_bucket{stage="bm25",le="1"} 3' in text
+    assert 'demo_seconds_bucket{stage="bm25",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{stage="bm25"} 4' in text
+    assert 'demo_seconds_sum{stage="bm25"} 3.65' in text
+
+
+def test_metrics_endpoint_counts_requests_by_route():
+    from src.main import app
+    client = TestClient(app)
+    client.get("/healthz")
+    client.get("/no/such/route")
+    body = client.get("/metrics").text
+    assert 'filmsuma_http_requests_total{endpoint="healthz",method="GET",status="200"}' in body
+    assert 'filmsuma_http_requests_total{endpoint="other",method="GET",status="404"}' in body
+    assert "# TYPE filmsuma_ttft_seconds histogram" in body
+    assert 'filmsuma_queue_depth{queue="chat_write_behind"} 0' in body
@@ -0,0 +1,72 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.dialects import sqlite
+
+from src.db.database import Base
+from src.db.migrations import discover, run_migrations
+from src.models import sql_models
+
+ch = sql_models.ChatHistory
+fb = sql_models.Feedback
+mc = sql_models.MessageCitation
+
+# (expected index, hot query as used by the endpoints)
+HOT_QUERIES = [
+    ("ix_feedback_movie_downvote_rating",
+     select(mc.chunk_id).join(fb, fb.chat_id == mc.chat_id).where(fb.movie_id == 1, (fb.downvote == True) | (fb.rating <= 2))),
+    ("ix_message_citations_chunk_id",
+     select(mc.chat_id).where(mc.chunk_id == "27205_3")),
+    ("ix_chat_history_thread_user_id",
+     select(ch).where(ch.thread_id == "t", ch.user_id == 1).order_by(ch.id)),
+    ("ix_chat_history_user_id_id",
+     select(ch).where(ch.user_id == 1, ch.id < 100).order_by(ch.id.desc())),
+    ("uq_summary_cache_movie_type",
+     select(sql_models.SummaryCache).where(sql_models.SummaryCache.movie_id == 1, sql_models.SummaryCache.summary_type == "general")),
+    ("uq_user_movie_engagement",
+     select(sql_models.UserMovieEngagement).where(
+         sql_models.UserMovieEngagement.user_id == 1,
+         sql_models.UserMovieEngagement.movie_id == 1,
+         sql_models.UserMovieEngagement.engagement_type == sql_models.EngagementType.SUMMARY)),
+    ("uq_user_hidden_movie",
+     select(sql_models.UserHiddenMovie).where(sql_models.UserHiddenMovie.user_id == 1, sql_models.UserHiddenMovie.movie_id == 1)),
+]
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def _plan(conn, stmt) -> str:
+    sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    return "\n".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    engine = _engine(tmp_path)
+    run_migrations(engine)
+    with engine.connect() as conn:
+        for index_name, stmt in HOT_QUERIES:
+            plan = _plan(conn, stmt)
+            assert index_name in plan, f"{index_name} not used:\n{plan}"
+
+
+def test_migrations_dedupe_legacy_rows_and_are_idempotent(tmp_path):
+    engine = _engine(tmp_path)
+    with engine.begin() as conn:
+        # Simulate a database created before the unique index existed
+        conn.execute(text("DROP INDEX uq_summary_cache_movie_type"))
+        for content in ("old", "new"):
+            conn.execute(text("INSERT INTO summary_cache (movie_id, summary_type, content) VALUES (1, 'general', :c)"), {"c": content})
+
+    assert run_migrations(engine) == [version for version, _, _ in discover()]
+    assert run_migrations(engine) == []
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT content FROM summary_cache")).scalars().all() == ["new"]
+        indexes = {row[1] for row in conn.execute(text("PRAGMA index_list('summary_cache')"))}
+    assert "uq_summary_cache_movie_type" in indexes
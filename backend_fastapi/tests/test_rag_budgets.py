@@ -0,0 +1,150 @@
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.getcwd())
+
+from src.core import rag_chat, retrieval_budget
+
+VECTOR = [{"id": "v1", "text": "vector one"}, {"id": "v2", "text": "vector two"}]
+LEXICAL = [{"id": "b1", "text": "lexical one"}]
+
+
+def _budgets(monkeypatch, **budgets_ms):
+    monkeypatch.setattr(retrieval_budget, "RAG_BUDGETS_ENABLED", True)
+    for stage, budget in budgets_ms.items():
+        monkeypatch.setitem(retrieval_budget.BUDGETS_MS, stage, budget)
+
+
+def _stages(monkeypatch, slow=(), corpus=True):
+    """Stubs every retrieval stage; the ones named in slow take 300ms."""
+    import src.core.identity_cache as identity_cache
+
+    async def resolve(db, tmdb_id=None, **kw):
+        return SimpleNamespace(id=1, title="Heat")
+
+    def vector_search(tid, query_vector, n_results, labels):
+        if "vector_search" in slow:
+            time.sleep(0.3)
+        return VECTOR
+
+    def bm25_search(tid, question, n_results, labels):
+        if "bm25" in slow:
+            time.sleep(0.3)
+        return LEXICAL if corpus else None
+
+    async def load_penalties(movie_id, labels):
+        if "penalties" in slow:
+            await asyncio.sleep(0.3)
+        return {"v1": 1.0}  # discredited: dropped from the results
+
+    async def load_research(movie_id, labels):
+        if "research" in slow:
+            await asyncio.sleep(0.3)
+        return SimpleNamespace(content="dossier")
+
+    monkeypatch.setattr(identity_cache, "resolve_movie_async", resolve)
+    monkeypatch.setattr(rag_chat, "embed_query", lambda text: [0.0])
+    monkeypatch.setattr(rag_chat, "_vector_search", vector_search)
+    monkeypatch.setattr(rag_chat, "_bm25_search", bm25_search)
+    monkeypatch.setattr(rag_chat, "_load_penalties", load_penalties)
+    monkeypatch.setattr(rag_chat, "_load_research", load_research)
+
+
+def _retrieve():
+    """(result, seconds) timed inside the loop; asyncio.run also waits for late worker threads."""
+    async def run():
+        start = time.perf_counter()
+        result = await rag_chat._retrieve_context({"tmdb_ids": [949], "question": "why the diner scene?", "messages": []})
+        return result, time.perf_counter() - start
+    return asyncio.run(run())
+
+
+def test_within_budget_returns_result_or_gives_up(monkeypatch):
+    _budgets(monkeypatch, bm25=50)
+
+    async def run(delay):
+        async def work():
+            await asyncio.sleep(delay)
+            return "done"
+        return await retrieval_budget.within_budget("bm25", work())
+
+    assert asyncio.run(run(0)) == (True, "done")
+    start = time.perf_counter()
+    assert asyncio.run(run(0.5)) == (False, None)
+    assert time.perf_counter() - start < 0.4
+
+
+def test_zero_budget_waits(monkeypatch):
+    _budgets(monkeypatch, research=0)
+
+    async def run():
+        async def work():
+            await asyncio.sleep(0.05)
+            return 1
+        return await retrieval_budget.within_budget("research", work())
+
+    assert asyncio.run(run()) == (True, 1)
+
+
+def test_all_stages_within_budget(monkeypatch):
+    _budgets(monkeypatch, vector_search=1000, bm25=1000, penalties=1000, research=1000)
+    _stages(monkeypatch)
+    result, _ = _retrieve()
+    assert result["degradations"] == []
+    assert {s["id"] for s in result["relevant_sources"]} == {"v2", "b1"}
+    assert "dossier" in result["context"]
+
+
+def test_slow_bm25_falls_back_to_vector_only(monkeypatch):
+    _budgets(monkeypatch, vector_search=1000, bm25=50, penalties=1000, research=1000)
+    _stages(monkeypatch, slow=("bm25",))
+    before = retrieval_budget.RAG_DEGRADATIONS.value(stage="bm25", reason="timeout", endpoint="background")
+    result, seconds = _retrieve()
+    assert seconds < 0.25
+    assert [s["id"] for s in result["relevant_sources"]] == ["v2"]
+    assert result["degradations"] == [{"stage": "bm25", "tmdb_id": 949, "reason": "timeout", "budget_ms": 50,
+                                       "fallback": "vector_only"}]
+    assert retrieval_budget.RAG_DEGRADATIONS.value(stage="bm25", reason="timeout", endpoint="background") == before + 1
+
+
+def test_slow_penalties_and_research_are_skipped(monkeypatch):
+    _budgets(monkeypatch, vector_search=1000, bm25=1000, penalties=50, research=50)
+    _stages(monkeypatch, slow=("penalties", "research"))
+    result, _ = _retrieve()
+    assert [d["fallback"] for d in result["degradations"]] == ["no_penalties", "no_research"]
+    assert "v1" in {s["id"] for s in result["relevant_sources"]}
+    assert "dossier" not in result["context"]
+
+
+def test_late_vector_search_without_corpus_is_reported_as_no_context(monkeypatch):
+    _budgets(monkeypatch, vector_search=50, bm25=1000, penalties=1000, research=1000)
+    _stages(monkeypatch, slow=("vector_search",), corpus=False)
+    result, _ = _retrieve()
+    assert result["context"] == "" and result["relevant_sources"] == []
+    assert [(d["stage"], d["fallback"]) for d in result["degradations"]] == [("vector_search", "no_context")]
+
+
+def test_saturated_stage_pool_skips_blocking_stages(monkeypatch):
+    _budgets(monkeypatch, vector_search=1000, bm25=1000, penalties=1000, research=1000)
+    _stages(monkeypatch, slow=("vector_search",))  # 300ms, within its budget
+    monkeypatch.setattr(rag_chat, "stage_pool", retrieval_budget.StagePool(workers=1))
+    result, _ = _retrieve()
+    # The vector search takes the only worker; BM25 is refused instead of queueing behind it
+    assert [(d["stage"], d["reason"]) for d in result["degradations"]] == [("bm25", "saturated")]
+    assert {s["id"] for s in result["relevant_sources"]} == {"v2"}
+
+
+def test_stage_pool_counts_abandoned_work_until_it_finishes():
+    pool = retrieval_budget.StagePool(workers=1)
+
+    async def run():
+        job = pool.submit(time.sleep, 0.2)
+        ok, _ = await retrieval_budget.within_budget("bm25", job, budget_ms=20)
+        refused = pool.submit(time.sleep, 0)
+        await asyncio.sleep(0.3)
+        return ok, refused, pool.in_flight()
+
+    assert asyncio.run(run()) == (False, None, 0)
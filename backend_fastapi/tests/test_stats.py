@@ -0,0 +1,123 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import sessionmaker
+
+from src.db import stats
+from src.db.database import Base
+from src.models import sql_models
+
+
+def _session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(sql_models.User(clerk_id="u1", email="u1@example.com", username="u1"))
+    db.add(sql_models.Movie(title="Film", tmdb_id=1))
+    db.commit()
+    return db
+
+
+def _movie_stats(db):
+    db.expire_all()
+    return db.get(sql_models.MovieStats, 1)
+
+
+def test_orm_writes_maintain_counters(tmp_path):
+    db = _session(tmp_path)
+    db.add(sql_models.SummaryCache(movie_id=1, summary_type="general", content="s"))
+    for thread in ("a", "a", "b"):
+        db.add(sql_models.ChatHistory(thread_id=thread, user_id=1, movie_id=1, role="user", message="m"))
+    post = sql_models.ForumPost(post_number="No.1", movie_id=1, user_id=1, title="t", content="c")
+    db.add(post)
+    db.flush()
+    db.add(sql_models.ForumReply(reply_number="No.2", post_id=post.id, user_id=1, content="r"))
+    db.add(sql_models.UserMovieEngagement(user_id=1, movie_id=1, engagement_type="summary"))
+    db.commit()
+
+    ms = _movie_stats(db)
+    assert (ms.summary_count, ms.chat_message_count, ms.chat_thread_count) == (1, 3, 2)
+    assert (ms.post_count, ms.reply_count, ms.engagement_count) == (1, 1, 1)
+    ums = db.get(sql_models.UserMovieStats, (1, 1))
+    assert (ums.chat_thread_count, ums.post_count, ums.reply_count, ums.summary_engagements) == (2, 1, 1, 1)
+
+    db.delete(post.replies[0])
+    db.delete(post)
+    db.commit()
+    ms = _movie_stats(db)
+    assert (ms.post_count, ms.reply_count) == (0, 0)
+    assert stats.reconcile(db.connection()) == 0
+
+
+def test_bulk_chat_rows_and_reconcile_repairs_drift(tmp_path):
+    db = _session(tmp_path)
+    rows = [
+        {"thread_id": "t", "user_id": None, "movie_id": 1, "role": "user", "message": "q"},
+        {"thread_id": "t", "user_id": None, "movie_id": 1, "role": "assistant", "message": "a"},
+    ]
+    db.execute(insert(sql_models.ChatHistory), rows)
+    stats.record_chat_rows(db.connection(), rows)
+    db.commit()
+    ms = _movie_stats(db)
+    assert (ms.chat_message_count, ms.chat_thread_count) == (2, 1)
+
+    db.execute(update(sql_models.MovieStats).values(chat_thread_count=7))
+    db.add(sql_models.UserMovieStats(user_id=1, movie_id=1, post_count=3))
+    db.commit()
+    assert stats.reconcile(db.connection()) == 2
+    db.commit()
+    assert _movie_stats(db).chat_thread_count == 1
+    assert db.get(sql_models.UserMovieStats, (1, 1)) is None
+
+
+def test_summary_upsert_counts_only_inserted_rows(tmp_path):
+    import asyncio
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from src.api.endpoints.summary import _save_summary
+
+    _session(tmp_path).close()
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stats.db'}")
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        for content in ("first", "second"):
+            async with Session() as db:
+                await _save_summary(db, 1, "general", content)
+                await db.commit()
+        async with Session() as db:
+            rows = (await db.execute(select(sql_models.SummaryCache.content))).scalars().all()
+            count = (await db.execute(select(sql_models.MovieStats.summary_count))).scalar()
+        await engine.dispose()
+        return rows, count
+
+    assert asyncio.run(run()) == (["second"], 1)
+
+
+def test_background_pass_backfills_then_recounts_changed_movies(tmp_path, monkeypatch):
+    import src.db.database as database
+    db = _session(tmp_path)
+    monkeypatch.setattr(database, "engine", db.get_bind())
+    db.add(sql_models.Movie(title="Other", tmdb_id=2))
+    rows = [{"thread_id": "t", "user_id": None, "movie_id": m, "role": "user", "message": "q"} for m in (1, 2)]
+    db.execute(insert(sql_models.ChatHistory), rows)  # no bumps: counters missing, as on an upgraded database
+    db.commit()
+
+    repaired, since = stats.reconcile_pass(None)
+    assert repaired == 2 and _movie_stats(db).chat_message_count == 1
+    assert stats.reconcile_pass(None)[0] == 0  # counters exist: no full recount
+
+    # Drift on both movies, but only movie 1 has counter activity since the last pass
+    db.execute(update(sql_models.MovieStats).values(chat_thread_count=5, updated_at=datetime(2000, 1, 1)))
+    db.commit()
+    stats.bump_movie(db.connection(), 1, post_count=1)
+    db.commit()
+    assert stats.changed_movie_ids(db.connection(), since) == [1]
+    assert stats.reconcile_pass(since)[0] == 1
+    db.expire_all()
+    assert (_movie_stats(db).chat_thread_count, _movie_stats(db).post_count) == (1, 0)
+    assert db.get(sql_models.MovieStats, 2).chat_thread_count == 5
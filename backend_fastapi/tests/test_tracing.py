@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from src.utils import tracing
+
+
+def test_spans_nest_under_the_request_root():
+    with tracing.request_trace("req-nesting", "ws.message", persona="critic"):
+        with tracing.span("rag.retrieve"):
+            with tracing.span("vector.search"):
+                pass
+        with tracing.span("rag.generate"):
+            pass
+    with tracing.span("outside"):
+        pass  # no active request: not recorded
+
+    spans = {s["name"]: s for s in tracing.get_trace("req-nesting")["spans"]}
+    assert set(spans) == {"ws.message", "rag.retrieve", "vector.search", "rag.generate"}
+    root = spans["ws.message"]
+    assert root["parent_id"] is None and root["attributes"] == {"persona": "critic"}
+    assert spans["rag.retrieve"]["parent_id"] == root["span_id"]
+    assert spans["vector.search"]["parent_id"] == spans["rag.retrieve"]["span_id"]
+    assert spans["rag.generate"]["parent_id"] == root["span_id"]
+
+
+def test_sqlalchemy_statements_become_db_spans_and_export(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'trace.db'}")
+    with tracing.request_trace("req-db", "GET /history"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1")).scalar()
+            try:
+                conn.execute(text("SELECT * FROM missing_table"))
+            except Exception:
+                pass
+
+    db_spans = [s for s in tracing.get_trace("req-db")["spans"] if s["name"] == "db.query"]
+    assert [s["attributes"]["statement"] for s in db_spans] == ["SELECT 1", "SELECT * FROM missing_table"]
+    assert db_spans[0]["error"] is None and "OperationalError" in db_spans[1]["error"]
+
+    path = tmp_path / "traces.jsonl"
+    assert tracing.export_trace("req-db", str(path))
+    exported = json.loads(path.read_text().splitlines()[0])
+    otlp_spans = exported["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(otlp_spans) == 3 and all(len(s["traceId"]) == 32 for s in otlp_spans)
+    assert sum(1 for s in otlp_spans if "parentSpanId" not in s) == 1
+
+
+def test_request_id_header_and_guarded_debug_endpoint(monkeypatch):
+    from src.api.endpoints import debug
+    from src.main import app
+    client = TestClient(app)
+
+    response = client.get("/healthz", headers={"X-Request-ID": "client-abc.1"})
+    assert response.headers["X-Request-ID"] == "client-abc.1"
+    assert len(client.get("/healthz").headers["X-Request-ID"]) == 32
+
+    assert client.get("/debug/traces/client-abc.1").status_code == 404  # disabled without a token
+    monkeypatch.setattr(debug, "DEBUG_ADMIN_TOKEN", "s3cret")
+    assert client.get("/debug/traces/client-abc.1", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    trace = client.get("/debug/traces/client-abc.1", headers={"X-Admin-Token": "s3cret"}).json()
+    assert trace["spans"][0]["name"] == "http.request"
+    assert client.get("/debug/traces/unknown", headers={"X-Admin-Token": "s3cret"}).status_code == 404
@@ -0,0 +1,30 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from src.core import warmup
+
+
+def test_failed_required_stage_is_retried_until_ready(monkeypatch):
+    calls = []
+
+    def flaky_database():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("database is starting up")
+
+    def broken_tokenizer():
+        raise LookupError("punkt missing")
+
+    monkeypatch.setattr(warmup, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(warmup, "WARMUP_RETRY_INITIAL_SECONDS", 0.01)
+    monkeypatch.setattr(warmup, "STAGES", [("database", flaky_database, True), ("tokenizer", broken_tokenizer, False)])
+    monkeypatch.setattr(warmup, "_status", {"database": {"status": "pending"}, "tokenizer": {"status": "pending"}})
+
+    asyncio.run(warmup.run_warmup())
+    assert warmup._status["database"]["status"] == "ready" and warmup._status["database"]["attempts"] == 3
+    # Optional stages are not retried and don't block readiness
+    assert warmup._status["tokenizer"]["attempts"] == 1
+    assert warmup.is_ready()
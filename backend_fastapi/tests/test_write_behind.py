@@ -0,0 +1,121 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.db.database import Base
+from src.db.write_behind import ChatWriteBehind
+from src.models import sql_models
+
+
+def _session_factory(tmp_path):
+    db_path = tmp_path / "chat.db"
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{db_path}"))
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    return async_sessionmaker(bind=engine, expire_on_commit=False)
+
+
+async def _messages(factory):
+    async with factory() as db:
+        rows = (await db.execute(select(sql_models.ChatHistory).order_by(sql_models.ChatHistory.id))).scalars().all()
+        return [(r.role, r.message) for r in rows]
+
+
+async def _citations(factory):
+    async with factory() as db:
+        rows = (await db.execute(select(sql_models.MessageCitation).order_by(
+            sql_models.MessageCitation.chat_id, sql_models.MessageCitation.rank))).scalars().all()
+        return [(r.chat_id, r.rank, r.chunk_id) for r in rows]
+
+
+def test_rows_are_batched_and_written_in_order(tmp_path):
+    factory = _session_factory(tmp_path)
+
+    async def run():
+        writer = ChatWriteBehind(factory, batch_size=2, flush_interval=10, spool_path=str(tmp_path / "spool.jsonl"))
+        writer.enqueue("t1", None, 1, "user", "q1", persona="critic")
+        writer.enqueue("t1", None, 1, "assistant", "a1", persona="critic", citation_ids=["27205_4", "27205_1"])
+        writer.enqueue("t1", None, 1, "user", "q2", persona="critic")
+        await writer.stop()
+        return writer.stats, await _messages(factory), await _citations(factory)
+
+    stats, messages, citations = asyncio.run(run())
+    assert messages == [("user", "q1"), ("assistant", "a1"), ("user", "q2")]
+    assert citations == [(2, 0, "27205_4"), (2, 1, "27205_1")]
+    assert stats["written"] == 3 and stats["batches"] == 2
+
+
+def test_failed_batches_are_spooled_and_replayed(tmp_path):
+    spool = tmp_path / "spool.jsonl"
+
+    def broken_factory():
+        raise RuntimeError("database unavailable")
+
+    async def fail():
+        writer = ChatWriteBehind(broken_factory, max_attempts=2, flush_interval=10, spool_path=str(spool))
+        writer.enqueue("t1", None, 1, "user", "lost?")
+        await writer.flush()
+        await writer.flush()
+        return writer.stats
+
+    stats = asyncio.run(fail())
+    assert stats["spooled"] == 1 and spool.exists()
+
+    factory = _session_factory(tmp_path)
+
+    async def replay():
+        writer = ChatWriteBehind(factory, flush_interval=10, spool_path=str(spool))
+        await writer.start()
+        await writer.stop()
+        return await _messages(factory)
+
+    assert asyncio.run(replay()) == [("user", "lost?")]
+    assert not spool.exists()
+
+
+def test_batch_failing_every_run_is_dead_lettered(tmp_path):
+    spool, dead_letter = tmp_path / "spool.jsonl", tmp_path / "dead.jsonl"
+
+    def broken_factory():
+        raise RuntimeError("value too long for column")
+
+    async def run_once():
+        writer = ChatWriteBehind(broken_factory, max_attempts=1, max_spools=2, flush_interval=10,
+                                 spool_path=str(spool), dead_letter_path=str(dead_letter))
+        await writer.start()  # replays what the previous run spooled
+        if not writer.pending() and not writer.stats["replayed"]:
+            writer.enqueue("t1", None, 1, "user", "poison")
+            await writer.flush()
+        await writer.stop()
+        return writer.stats
+
+    first = asyncio.run(run_once())
+    assert first["spooled"] == 1 and first["dead_lettered"] == 0
+    second = asyncio.run(run_once())
+    assert second["replayed"] == 1 and second["dead_lettered"] == 1
+    # Nothing is left to replay on the next start
+    assert not spool.exists() and "poison" in dead_letter.read_text()
+
+
+def test_poison_row_is_isolated_from_its_batch(tmp_path):
+    factory = _session_factory(tmp_path)
+    spool = tmp_path / "spool.jsonl"
+
+    async def run():
+        writer = ChatWriteBehind(factory, batch_size=10, max_attempts=1, flush_interval=10, spool_path=str(spool))
+        writer.enqueue("t1", None, 1, "user", "q1")
+        writer.enqueue("t1", None, 1, "assistant", "a1", citation_ids=["949_0"])
+        writer._pending[-1]["citation_ids"] = [None]  # message_citations.chunk_id is NOT NULL
+        writer.enqueue("t2", None, 1, "assistant", "a2")
+        written = await writer.flush()
+        await writer.stop()
+        return written, writer.stats, await _messages(factory)
+
+    written, stats, messages = asyncio.run(run())
+    assert written == 2 and messages == [("user", "q1"), ("assistant", "a2")]
+    assert stats["written"] == 2 and stats["spooled"] == 1
+    assert spool.read_text().count("\n") == 1